@@ -0,0 +1,100 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""Measure the rest service's startup time.
+
+Every run starts a fresh interpreter, which imports the server module (as a
+gunicorn worker does) and then creates the app once more (as the tests do
+for every test case), and reports how long each step took.
+
+Usage (from the rest-service directory):
+
+    python benchmarks/startup_benchmark.py [--runs N]
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+MEASURE_SCRIPT = """
+import json
+import sys
+import time
+
+start = time.time()
+from manager_rest import server
+imported = time.time()
+server.setup_app()
+app_created = time.time()
+
+heavy_modules = ['dsl_parser.parser', 'elasticsearch', 'celery']
+print json.dumps({
+    'import': imported - start,
+    'setup_app': app_created - imported,
+    'loaded_heavy_modules': [m for m in heavy_modules if m in sys.modules]
+})
+"""
+
+
+def _measure(work_dir):
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w') as f:
+        json.dump({
+            'rest_service_log_path': os.path.join(work_dir, 'rest.log'),
+            'rest_service_log_file_size_MB': 1,
+            'rest_service_log_files_backup_count': 1,
+            'rest_service_log_level': 'DEBUG',
+            'file_server_root': work_dir,
+            'maintenance_folder': work_dir
+        }, f)
+    env = dict(os.environ, MANAGER_REST_CONFIG_PATH=config_path)
+    rest_service_dir = os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, '-c', MEASURE_SCRIPT],
+                                     env=env,
+                                     cwd=rest_service_dir)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='rest-startup-benchmark-')
+    try:
+        results = [_measure(work_dir) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(work_dir)
+
+    for step in ('import', 'setup_app'):
+        durations = [result[step] for result in results]
+        print '{0:<10} median {1:.3f}s  min {2:.3f}s  max {3:.3f}s'.format(
+            step, _median(durations), min(durations), max(durations))
+    print 'heavy modules loaded at startup: {0}'.format(
+        ', '.join(results[-1]['loaded_heavy_modules']) or 'none')
+
+
+if __name__ == '__main__':
+    main()
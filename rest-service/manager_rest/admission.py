@@ -0,0 +1,184 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""Admission control for expensive endpoints.
+
+Concurrency limits are configured per resource method, e.g.:
+
+    admission_limits:
+        Search.post:
+            max_concurrent: 4
+            queue_timeout: 10
+            retry_after: 5     # optional, defaults to the queue timeout
+
+No limits are set by default. Note that limiting endpoints used by
+running workflows and agents (e.g. NodeInstances.get) may delay or fail
+deployments' executions, rather than just the clients of the REST API.
+
+A request to a limited resource method waits (up to the queue timeout)
+for one of the limit's slots to be free. If none frees up in time, the
+request is rejected with a 429 response and a Retry-After header.
+
+Slots are exclusive locks on files in the admission locks directory, so
+a limit is shared by all the rest service worker processes on the host,
+and the slots held by a worker are released even if it's killed.
+"""
+
+import os
+import time
+import math
+import errno
+import fcntl
+import random
+import tempfile
+
+from flask import g, jsonify, request
+
+from manager_rest import config
+from manager_rest import metrics
+from manager_rest import utils
+from manager_rest.constants import TOO_MANY_REQUESTS_ERROR_CODE
+
+# polling interval (in seconds) while waiting for a slot, doubled after
+# every attempt up to the maximum
+MIN_POLL_INTERVAL = 0.005
+MAX_POLL_INTERVAL = 0.1
+
+
+class ConcurrencyLimit(object):
+
+    def __init__(self, name, max_concurrent, queue_timeout, locks_dir,
+                 retry_after=None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        if retry_after is None:
+            retry_after = max(1, int(math.ceil(queue_timeout)))
+        self.retry_after = retry_after
+        self._lock_paths = [
+            os.path.join(locks_dir, '{0}.{1}.lock'.format(name, slot))
+            for slot in range(max_concurrent)]
+
+    def _try_acquire_slot(self):
+        # starting at a random slot spreads the requests over the slots'
+        # lock files
+        start = random.randrange(self.max_concurrent)
+        for index in range(self.max_concurrent):
+            lock_path = self._lock_paths[
+                (start + index) % self.max_concurrent]
+            lock_file = open(lock_path, 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return lock_file
+            except IOError, e:
+                lock_file.close()
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+        return None
+
+    def acquire(self):
+        """Wait (up to the queue timeout) for a free slot.
+
+        :return: the acquired slot, to be passed to release, or None if
+         no slot could be acquired in time
+        """
+        deadline = time.time() + self.queue_timeout
+        poll_interval = MIN_POLL_INTERVAL
+        while True:
+            slot = self._try_acquire_slot()
+            if slot is not None:
+                return slot
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            time.sleep(min(poll_interval, remaining))
+            poll_interval = min(poll_interval * 2, MAX_POLL_INTERVAL)
+
+    @staticmethod
+    def release(slot):
+        try:
+            fcntl.flock(slot, fcntl.LOCK_UN)
+        finally:
+            slot.close()
+
+
+def get_locks_dir():
+    return config.instance().admission_locks_dir or os.path.join(
+        tempfile.gettempdir(), 'cloudify-rest-admission')
+
+
+def create_limits(limits_config, locks_dir):
+    limits = {}
+    for name, limit_config in limits_config.iteritems():
+        limits[name] = ConcurrencyLimit(
+            name=name,
+            max_concurrent=limit_config['max_concurrent'],
+            queue_timeout=limit_config.get('queue_timeout', 0),
+            locks_dir=locks_dir,
+            retry_after=limit_config.get('retry_after'))
+    return limits
+
+
+def too_many_requests_error(limit):
+    response = jsonify(
+        {"message":
+            "Request rejected since too many {0} requests are in progress"
+            .format(limit.name),
+         "error_code": TOO_MANY_REQUESTS_ERROR_CODE,
+         "server_traceback": None})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(limit.retry_after)
+    return response
+
+
+def _get_limit_name(app):
+    view = app.view_functions.get(request.endpoint)
+    view_class = getattr(view, 'view_class', None)
+    if view_class is None:
+        return None
+    return '{0}.{1}'.format(view_class.__name__, request.method.lower())
+
+
+def init_app(app):
+    limits = create_limits(config.instance().admission_limits,
+                           get_locks_dir())
+    if not limits:
+        return
+    utils.mkdirs(get_locks_dir())
+
+    def admit_request():
+        limit = limits.get(_get_limit_name(app))
+        if limit is None:
+            return
+        start = time.time()
+        slot = limit.acquire()
+        metrics.registry.observe_admission(limit.name,
+                                           wait=time.time() - start,
+                                           admitted=slot is not None)
+        if slot is None:
+            app.logger.warning('Rejected a {0} request, the limit of {1} '
+                               'concurrent requests is reached'
+                               .format(limit.name, limit.max_concurrent))
+            return too_many_requests_error(limit)
+        g.admission_slot = slot
+
+    def release_slot(exception):
+        slot = getattr(g, 'admission_slot', None)
+        if slot is not None:
+            g.admission_slot = None
+            ConcurrencyLimit.release(slot)
+
+    app.before_request(admit_request)
+    app.teardown_request(release_slot)
@@ -15,8 +15,11 @@
 
 
 import os
+import time
+import zlib
 import tarfile
 import zipfile
+from multiprocessing.pool import ThreadPool
 
 
 TAR_MAGIC_DICT = {
@@ -25,6 +28,10 @@ TAR_MAGIC_DICT = {
     # "\x75\x73\x74\x61\x72": "tar"
 }
 
+# the level zlib.Z_DEFAULT_COMPRESSION stands for, which ZipFile.write uses
+DEFAULT_DEFLATE_LEVEL = 6
+ZIP_BUFFER_SIZE = 64 * 1024
+
 
 def get_archive_type(archive_path):
     if zipfile.is_zipfile(archive_path):
@@ -61,6 +68,99 @@ def make_zipfile(output_filename, source_dir):
         _zipdir(source_dir, zip)
 
 
+def zip_dir(dir_to_zip, target_zip_path, compression_level=6):
+    """Zip the directory at dir_to_zip *including* the directory itself,
+    deflating its files with the given zlib compression level (0 stores
+    them as they are).
+    """
+    if compression_level not in range(-1, 10):
+        raise ValueError('Invalid compression level: {0}'
+                         .format(compression_level))
+    compression = zipfile.ZIP_STORED if compression_level == 0 \
+        else zipfile.ZIP_DEFLATED
+    rootlen = len(dir_to_zip) - len(os.path.basename(dir_to_zip))
+    with zipfile.ZipFile(target_zip_path, 'w', compression,
+                         allowZip64=True) as zipf:
+        for base, dirs, files in os.walk(dir_to_zip):
+            for entry in files:
+                file_path = os.path.join(base, entry)
+                if compression_level in (0, zlib.Z_DEFAULT_COMPRESSION,
+                                         DEFAULT_DEFLATE_LEVEL):
+                    zipf.write(file_path, file_path[rootlen:])
+                else:
+                    _write_deflated(zipf, file_path, file_path[rootlen:],
+                                    compression_level)
+
+
+def zip_dirs(dirs_to_zip, compression_level=6, threads=4):
+    """Zip several directories concurrently, in a pool of threads (zlib
+    releases the GIL while compressing).
+
+    :param dirs_to_zip: a list of (dir_to_zip, target_zip_path) pairs
+    :param compression_level: the zlib compression level (see zip_dir)
+    :param threads: the maximal number of threads to use
+    """
+    jobs = [(dir_to_zip, target_zip_path, compression_level)
+            for dir_to_zip, target_zip_path in dirs_to_zip]
+    threads = min(len(jobs), threads)
+    if threads <= 1:
+        for job in jobs:
+            _zip_dir_job(job)
+        return
+    pool = ThreadPool(threads)
+    try:
+        pool.map(_zip_dir_job, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _zip_dir_job(job):
+    zip_dir(*job)
+
+
+def _write_deflated(zipf, file_path, arcname, compression_level):
+    # python 2.7's ZipFile.write always deflates with zlib's default
+    # compression level, so files compressed with another level are written
+    # the way it writes them: in chunks, followed by their header's CRC and
+    # sizes
+    st = os.stat(file_path)
+    zinfo = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[:6])
+    zinfo.external_attr = (st.st_mode & 0xFFFF) << 16L
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.file_size = st.st_size
+    # the CRC and compressed size are written once they're known
+    zinfo.CRC = zinfo.compress_size = 0
+    zinfo.header_offset = zipf.fp.tell()
+    zipf._writecheck(zinfo)
+    zipf._didModify = True
+
+    zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+    zipf.fp.write(zinfo.FileHeader(zip64))
+    compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -15)
+    crc = file_size = compress_size = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(ZIP_BUFFER_SIZE), ''):
+            file_size += len(chunk)
+            crc = zlib.crc32(chunk, crc) & 0xffffffff
+            chunk = compressor.compress(chunk)
+            compress_size += len(chunk)
+            zipf.fp.write(chunk)
+    chunk = compressor.flush()
+    compress_size += len(chunk)
+    zipf.fp.write(chunk)
+    zinfo.CRC = crc
+    zinfo.file_size = file_size
+    zinfo.compress_size = compress_size
+
+    position = zipf.fp.tell()
+    zipf.fp.seek(zinfo.header_offset)
+    zipf.fp.write(zinfo.FileHeader(zip64))
+    zipf.fp.seek(position)
+    zipf.filelist.append(zinfo)
+    zipf.NameToInfo[zinfo.filename] = zinfo
+
+
 def _make_tarfile(output_filename, source_dir, write_type='w'):
     with tarfile.open(output_filename, write_type) as tar:
         tar.add(source_dir, arcname=os.path.basename(source_dir))
@@ -0,0 +1,191 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""Caching of successful authentications.
+
+Authenticating a request means verifying a password hash or a token
+signature, and loading the user from the userstore. The authentication
+providers are wrapped so that a request carrying credentials which were
+recently verified gets the cached user instead.
+
+A cached authentication is used, without consulting the userstore, only
+if:
+ - it is younger than the cache's TTL, and
+ - the token it was made with (if any) hasn't expired, and
+ - none of the watched files (the userstore file and the roles
+   configuration file, if any) changed since it was cached.
+Changes to users are so noticed when the userstore file changes, or
+otherwise (e.g. for remote userstores) once the TTL has passed.
+Failed authentications are never cached.
+
+Within a request, each provider's result is kept in the request's shared
+state, so that the requests of a batch (which carry the batch request's
+credentials) aren't authenticated again.
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+from manager_rest import utils
+
+TOKEN_HEADER = 'Authentication-Token'
+AUTH_HEADERS = ('Authorization', TOKEN_HEADER)
+
+
+class AuthenticationCache(object):
+    """A bounded, thread-safe LRU cache with a TTL"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (expires at, value), least recently used first
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or time.time() >= entry[0]:
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, expires_at, max_size):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, value)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+cache = AuthenticationCache()
+
+
+class FilesWatcher(object):
+    """Clears the cache when any of the given files changes"""
+
+    def __init__(self, paths):
+        self._paths = [path for path in paths if path]
+        self._signature = self._get_signature()
+
+    def _get_signature(self):
+        signature = []
+        for path in self._paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_ino, stat.st_mtime, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def check(self):
+        if not self._paths:
+            return
+        signature = self._get_signature()
+        if signature != self._signature:
+            self._signature = signature
+            cache.clear()
+
+
+def get_credentials_digest():
+    """A digest of the current request's credentials, or None if it
+    carries no credentials
+    """
+    credentials = [request.headers.get(header) for header in AUTH_HEADERS]
+    if not any(credentials):
+        return None
+    # only a digest of the credentials is kept in memory
+    return hashlib.sha256(repr(credentials)).hexdigest()
+
+
+def get_token_expiration():
+    """The expiration time of the current request's token, or None if it
+    carries no token, or one without an expiration time.
+
+    Tokens are JSON web signatures, with the expiration time (as seconds
+    since the epoch) in their header. The header isn't verified here, as
+    only tokens which the authentication provider accepted are cached.
+    """
+    token = request.headers.get(TOKEN_HEADER)
+    if not token:
+        return None
+    header = token.split('.', 1)[0]
+    try:
+        header = json.loads(base64.urlsafe_b64decode(
+            str(header) + '=' * (-len(header) % 4)))
+        return float(header['exp'])
+    except (TypeError, ValueError, KeyError):
+        return None
+
+
+class CachingAuthenticationProvider(object):
+    """Wraps an authentication provider, caching its successful
+    authentications by the request's credentials.
+    """
+
+    def __init__(self, name, provider, ttl, max_size, watcher=None):
+        self.name = name
+        self.provider = provider
+        self.ttl = ttl
+        self.max_size = max_size
+        self.watcher = watcher
+
+    def authenticate(self, userstore, *args, **kwargs):
+        authentications = utils.get_shared_request_state().setdefault(
+            'authentications', {})
+        if self.name not in authentications:
+            authentications[self.name] = self._authenticate(
+                userstore, *args, **kwargs)
+        return authentications[self.name]
+
+    def _authenticate(self, userstore, *args, **kwargs):
+        credentials_key = get_credentials_digest()
+        if not self.ttl or credentials_key is None:
+            return self.provider.authenticate(userstore, *args, **kwargs)
+
+        if self.watcher:
+            self.watcher.check()
+        key = (self.name, credentials_key)
+        user = cache.get(key)
+        if user is not None:
+            return user
+
+        user = self.provider.authenticate(userstore, *args, **kwargs)
+        if user:
+            expires_at = time.time() + self.ttl
+            token_expiration = get_token_expiration()
+            if token_expiration is not None:
+                expires_at = min(expires_at, token_expiration)
+            cache.put(key, user, expires_at, self.max_size)
+        return user
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
@@ -0,0 +1,88 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""A pool of background threads, running work submitted by requests
+(e.g. asynchronous blueprint uploads) after the request has returned.
+
+Every rest service worker process has its own pool, which is started
+when work is first submitted to it, so that it's started after gunicorn
+forks the worker.
+"""
+
+import os
+import Queue
+import logging
+import threading
+
+from manager_rest import config
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool(object):
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def submit(self, func, *args, **kwargs):
+        self._ensure_started()
+        self._queue.put((func, args, kwargs))
+
+    def join(self):
+        """Wait for all of the submitted work to be done"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # threads don't survive a fork, so a forked process starts a
+            # new pool
+            self._pid = os.getpid()
+            self._queue = Queue.Queue()
+            for i in range(self.size):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(self._queue,),
+                    name='background-worker-{0}'.format(i))
+                thread.daemon = True
+                thread.start()
+
+    @staticmethod
+    def _work(queue):
+        while True:
+            func, args, kwargs = queue.get()
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                logger.exception('Background work {0} failed'.format(func))
+            finally:
+                queue.task_done()
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = WorkerPool(config.instance().background_workers)
+        return _worker_pool
@@ -0,0 +1,236 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""Content addressed storage of the file server's files.
+
+Every file added to the store is hashed, and is replaced by a hard link to
+a blob named after its SHA-256 digest (the blob is created from the file,
+if there isn't one yet). Identical files (e.g. the scripts and plugin
+archives shared by many blueprints) are so stored once, while the file
+server's folder layout is kept as is.
+
+A blob's link count is its reference count. Directories are deleted with
+remove_tree, which also removes the blobs that only they linked to, by
+looking at the deleted files rather than the whole store. collect_garbage
+removes every unreferenced blob, walking the whole store.
+
+The stored files are shared: all of a blob's links are the same inode,
+with the same mode and mtime, and modifying one in place modifies them
+all. Their write permissions are removed, as a reminder that they should
+be replaced or deleted rather than modified; this doesn't protect them
+from the rest service itself, or from anything running as root.
+"""
+
+import os
+import stat
+import errno
+import shutil
+import hashlib
+import logging
+import tempfile
+
+from manager_rest import config
+
+logger = logging.getLogger(__name__)
+
+READ_ONLY_MASK = ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+BUFFER_SIZE = 64 * 1024
+
+
+def _file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(BUFFER_SIZE), ''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore(object):
+
+    def __init__(self, blobs_dir):
+        self.blobs_dir = blobs_dir
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def add_file(self, file_path, digest=None):
+        """Store a file, replacing it with a link to its blob.
+
+        :param file_path: the file to store
+        :param digest: the file's SHA-256 digest, if it's already known
+        :return: the file's digest, or None if it couldn't be stored
+        """
+        st = os.lstat(file_path)
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        digest = digest or _file_digest(file_path)
+        blob_path = self._blob_path(digest)
+        try:
+            blob_st = os.stat(blob_path)
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            blob_st = None
+
+        try:
+            if blob_st is None:
+                self._create_blob(file_path, st, blob_path)
+            elif (blob_st.st_dev, blob_st.st_ino) != (st.st_dev, st.st_ino):
+                if blob_st.st_size != st.st_size:
+                    logger.warning('Blob {0} has a different size than {1}, '
+                                   'not storing it'.format(blob_path,
+                                                           file_path))
+                    return None
+                self._replace_with_link(blob_path, file_path)
+        except OSError, e:
+            # e.g. the file is on another file system than the store
+            logger.debug("Can't store {0}: {1}".format(file_path, e))
+            return None
+        return digest
+
+    def add_tree(self, dir_path):
+        """Store every file under a directory"""
+        for root, _, file_names in os.walk(dir_path):
+            for file_name in file_names:
+                self.add_file(os.path.join(root, file_name))
+
+    def _create_blob(self, file_path, st, blob_path):
+        blob_dir = os.path.dirname(blob_path)
+        if not os.path.isdir(blob_dir):
+            try:
+                os.makedirs(blob_dir)
+            except OSError, e:
+                if e.errno != errno.EEXIST:
+                    raise
+        os.chmod(file_path, stat.S_IMODE(st.st_mode) & READ_ONLY_MASK)
+        try:
+            os.link(file_path, blob_path)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+            # another process has just created it
+            self._replace_with_link(blob_path, file_path)
+
+    @staticmethod
+    def _replace_with_link(blob_path, file_path):
+        temp_path = tempfile.mktemp(dir=os.path.dirname(file_path))
+        os.link(blob_path, temp_path)
+        try:
+            os.rename(temp_path, file_path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def remove_tree(self, dir_path, ignore_errors=False):
+        """Remove a directory, along with the blobs which were linked only
+        from its files.
+
+        :return: the number of blobs removed
+        """
+        # the directory's stored files, by inode, with the number of
+        # links to them from within the directory
+        files = {}
+        for root, _, file_names in os.walk(dir_path):
+            for file_name in file_names:
+                file_path = os.path.join(root, file_name)
+                try:
+                    st = os.lstat(file_path)
+                except OSError:
+                    continue
+                if stat.S_ISREG(st.st_mode) and st.st_nlink > 1:
+                    key = (st.st_dev, st.st_ino)
+                    path, links, nlink = files.get(key, (file_path, 0, 0))
+                    files[key] = (path, links + 1, st.st_nlink)
+
+        # the blobs which nothing else links to, once the directory is
+        # removed (the store holds one link)
+        orphans = []
+        for key, (file_path, links, nlink) in files.iteritems():
+            if nlink - links == 1:
+                try:
+                    orphans.append((key, self._blob_path(
+                        _file_digest(file_path))))
+                except (IOError, OSError):
+                    continue
+
+        shutil.rmtree(dir_path, ignore_errors=ignore_errors)
+
+        removed = 0
+        for key, blob_path in orphans:
+            try:
+                blob_st = os.lstat(blob_path)
+                if (blob_st.st_dev, blob_st.st_ino) == key and \
+                        blob_st.st_nlink == 1:
+                    os.remove(blob_path)
+                    removed += 1
+            except OSError:
+                # not a blob, or already removed by another process
+                pass
+        return removed
+
+    def collect_garbage(self):
+        """Remove the blobs which aren't linked from the file server"""
+        removed = 0
+        if not os.path.isdir(self.blobs_dir):
+            return removed
+        for blob_dir_name in os.listdir(self.blobs_dir):
+            blob_dir = os.path.join(self.blobs_dir, blob_dir_name)
+            if not os.path.isdir(blob_dir):
+                continue
+            for blob_name in os.listdir(blob_dir):
+                blob_path = os.path.join(blob_dir, blob_name)
+                try:
+                    if os.lstat(blob_path).st_nlink == 1:
+                        os.remove(blob_path)
+                        removed += 1
+                except OSError:
+                    # already removed by another process
+                    pass
+        return removed
+
+
+def get_blob_store():
+    """Return the file server's blob store, or None if it's disabled"""
+    cfy_config = config.instance()
+    if not cfy_config.file_server_blobs_folder:
+        return None
+    return BlobStore(os.path.join(cfy_config.file_server_root,
+                                  cfy_config.file_server_blobs_folder))
+
+
+def add_file(file_path, digest=None):
+    store = get_blob_store()
+    if store:
+        store.add_file(file_path, digest=digest)
+
+
+def add_tree(dir_path):
+    store = get_blob_store()
+    if store:
+        store.add_tree(dir_path)
+
+
+def remove_tree(dir_path, ignore_errors=False):
+    store = get_blob_store()
+    if store:
+        store.remove_tree(dir_path, ignore_errors=ignore_errors)
+    else:
+        shutil.rmtree(dir_path, ignore_errors=ignore_errors)
+
+
+def collect_garbage():
+    store = get_blob_store()
+    if store:
+        store.collect_garbage()
@@ -16,17 +16,21 @@
 import uuid
 import traceback
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from StringIO import StringIO
 
 from flask import current_app
 
-from dsl_parser import constants, functions, tasks
+# dsl_parser's functions, tasks and utils modules are slow to import, so
+# they're only imported when used, rather than when the rest service starts
+from dsl_parser import constants
 from dsl_parser import exceptions as parser_exceptions
-from dsl_parser import utils as dsl_parser_utils
 from manager_rest import models
 from manager_rest import config
 from manager_rest import manager_exceptions
+from manager_rest import maintenance
+from manager_rest import parse_cache
+from manager_rest import process_pool
 from manager_rest import storage_manager
 from manager_rest import workflow_client as wf_client
 
@@ -41,6 +45,34 @@ class BlueprintAlreadyExistsException(Exception):
         self.blueprint_id = blueprint_id
 
 
+def _parse_dsl(dsl_location, resources_base, resolver, validate_version,
+               record_imports=False):
+    """Parse a blueprint (in a process pool worker), returning its plan
+    along with the imports fetched while parsing it, if record_imports is
+    set.
+    """
+    from dsl_parser import tasks
+    if record_imports:
+        resolver = parse_cache.RecordingImportResolver(resolver)
+    plan = tasks.parse_dsl(dsl_location, resources_base,
+                           resolver=resolver,
+                           validate_version=validate_version)
+    return plan, resolver.imports if record_imports else None
+
+
+def _parse_timestamp(timestamp):
+    """Parse a timestamp stored as str(datetime)"""
+    timestamp_format = '%Y-%m-%d %H:%M:%S'
+    if '.' in timestamp:
+        timestamp_format += '.%f'
+    return datetime.strptime(timestamp, timestamp_format)
+
+
+def _prepare_deployment_plan(plan, inputs):
+    from dsl_parser import tasks
+    return tasks.prepare_deployment_plan(plan, inputs)
+
+
 class BlueprintsManager(object):
 
     def __init__(self):
@@ -49,8 +81,13 @@ class BlueprintsManager(object):
 
     def blueprints_list(self, include=None, filters=None,
                         pagination=None, sort=None):
-        return self.sm.blueprints_list(include=include, filters=filters,
-                                       pagination=pagination, sort=sort)
+        blueprints = self.sm.blueprints_list(include=include,
+                                             filters=filters,
+                                             pagination=pagination,
+                                             sort=sort)
+        for blueprint in blueprints.items:
+            self._fail_lost_upload(blueprint)
+        return blueprints
 
     def deployments_list(self, include=None, filters=None, pagination=None,
                          sort=None):
@@ -77,7 +114,9 @@ class BlueprintsManager(object):
                                        pagination=pagination, sort=sort)
 
     def get_blueprint(self, blueprint_id, include=None):
-        return self.sm.get_blueprint(blueprint_id, include=include)
+        blueprint = self.sm.get_blueprint(blueprint_id, include=include)
+        self._fail_lost_upload(blueprint)
+        return blueprint
 
     def get_snapshot(self, snapshot_id, include=None):
         return self.sm.get_snapshot(snapshot_id, include=include)
@@ -93,7 +132,10 @@ class BlueprintsManager(object):
         return self.sm.get_plugin(plugin_id, include=include)
 
     def update_execution_status(self, execution_id, status, error):
-        return self.sm.update_execution_status(execution_id, status, error)
+        result = self.sm.update_execution_status(execution_id, status, error)
+        if status in models.Execution.END_STATES:
+            maintenance.finish_activation_if_idle()
+        return result
 
     def _get_conf_for_snapshots_wf(self):
         return {
@@ -109,7 +151,8 @@ class BlueprintsManager(object):
             'created_status': models.Snapshot.CREATED,
             'failed_status':  models.Snapshot.FAILED,
             'file_server_uploaded_plugins_folder':
-                config.instance().file_server_uploaded_plugins_folder
+                config.instance().file_server_uploaded_plugins_folder,
+            'snapshots_staging_dir': config.instance().snapshots_staging_dir
         }
 
     def create_snapshot_model(self, snapshot_id,
@@ -168,29 +211,146 @@ class BlueprintsManager(object):
                           application_dir,
                           application_file_name,
                           resources_base,
-                          blueprint_id):
-        application_file = os.path.join(application_dir, application_file_name)
-        dsl_location = '{0}{1}'.format(resources_base, application_file)
-        try:
-            plan = tasks.parse_dsl(
-                dsl_location, resources_base,
-                **self._get_parser_context())
-        except Exception, ex:
-            raise DslParseException(str(ex))
+                          blueprint_id,
+                          async_upload=False):
+        plan = self._parse_blueprint(application_dir,
+                                     application_file_name,
+                                     resources_base)
 
         now = str(datetime.now())
 
+        if async_upload:
+            # the blueprint was created when its upload started, and is
+            # marked as uploaded once its resources are in place
+            self.sm.update_blueprint(blueprint_id, {
+                'plan': plan,
+                'description': plan.get('description'),
+                'updated_at': now,
+                'main_file_name': application_file_name
+            })
+            return self.sm.get_blueprint(blueprint_id)
+
         new_blueprint = models.BlueprintState(
             plan=plan,
             id=blueprint_id,
             description=plan.get('description'),
             created_at=now,
             updated_at=now,
-            main_file_name=application_file_name)
+            main_file_name=application_file_name,
+            status=models.BlueprintState.UPLOADED)
+        self.sm.put_blueprint(new_blueprint.id, new_blueprint)
+        return new_blueprint
+
+    def create_uploading_blueprint(self, blueprint_id, application_file_name):
+        now = str(datetime.now())
+        new_blueprint = models.BlueprintState(
+            plan=None,
+            id=blueprint_id,
+            description=None,
+            created_at=now,
+            updated_at=now,
+            main_file_name=application_file_name,
+            status=models.BlueprintState.UPLOADING)
         self.sm.put_blueprint(new_blueprint.id, new_blueprint)
         return new_blueprint
 
+    def update_blueprint_status(self, blueprint_id, status, error=None):
+        self.sm.update_blueprint(blueprint_id, {
+            'status': status,
+            'error': error,
+            'updated_at': str(datetime.now())
+        })
+
+    def _fail_lost_upload(self, blueprint):
+        """Mark an asynchronous upload which made no progress for longer
+        than the upload timeout as failed, so that it can be deleted and
+        uploaded again. Uploads run in the background of the worker process
+        which received them, and are lost if it crashes or is recycled.
+        """
+        timeout = config.instance().blueprint_upload_timeout
+        if not timeout or blueprint.updated_at is None or \
+                blueprint.status not in \
+                models.BlueprintState.IN_PROGRESS_STATES:
+            return
+        now = datetime.now()
+        if now - _parse_timestamp(blueprint.updated_at) < \
+                timedelta(seconds=timeout):
+            return
+        error = 'The upload made no progress for {0} seconds (status: {1}), ' \
+                'its worker was probably lost'.format(timeout,
+                                                      blueprint.status)
+        current_app.logger.warning('Failing blueprint {0}: {1}'
+                                   .format(blueprint.id, error))
+        self.sm.update_blueprint(blueprint.id, {
+            'status': models.BlueprintState.FAILED,
+            'error': error,
+            'updated_at': str(now)
+        })
+        blueprint.status = models.BlueprintState.FAILED
+        blueprint.error = error
+        blueprint.updated_at = str(now)
+
+    @staticmethod
+    def _verify_blueprint_uploaded(blueprint, action):
+        if blueprint.status in models.BlueprintState.IN_PROGRESS_STATES:
+            raise manager_exceptions.ConflictError(
+                "Can't {0} - blueprint {1} is still being uploaded "
+                "(status: {2})".format(action, blueprint.id,
+                                       blueprint.status))
+        if blueprint.status == models.BlueprintState.FAILED:
+            raise manager_exceptions.ConflictError(
+                "Can't {0} - the upload of blueprint {1} failed: {2}"
+                .format(action, blueprint.id, blueprint.error))
+
+    def _parse_blueprint(self, application_dir, application_file_name,
+                         resources_base):
+        application_file = os.path.join(application_dir, application_file_name)
+        dsl_location = '{0}{1}'.format(resources_base, application_file)
+        application_dir_url = '{0}{1}/'.format(resources_base,
+                                               application_dir)
+        parser_context = self._get_parser_context()
+        resolver = parser_context['resolver']
+
+        cache = parse_cache.get_parse_cache()
+        if cache:
+            with open(os.path.join(config.instance().file_server_root,
+                                   application_file)) as f:
+                cache_key = parse_cache.get_cache_key(
+                    f.read(),
+                    application_file_name,
+                    resources_base,
+                    current_app.raw_parser_context)
+            plan = cache.get(cache_key, resolver, application_dir_url)
+            if plan is not None:
+                current_app.logger.debug(
+                    'Using cached parse result of {0}'.format(dsl_location))
+                return plan
+
+        try:
+            plan, imports = process_pool.apply(
+                _parse_dsl, dsl_location, resources_base, resolver,
+                parser_context['validate_version'],
+                record_imports=cache is not None)
+        except process_pool.TaskLimitExceededError, ex:
+            raise manager_exceptions.ProcessingLimitExceededError(
+                "Can't parse blueprint {0}: {1}".format(
+                    application_file_name, str(ex)))
+        except Exception, ex:
+            raise DslParseException(str(ex))
+
+        if cache:
+            cache.put(cache_key, plan, imports, application_dir_url)
+        return plan
+
     def delete_blueprint(self, blueprint_id):
+        blueprint = self.sm.get_blueprint(
+            blueprint_id, include=['id', 'status', 'updated_at'])
+        self._fail_lost_upload(blueprint)
+        if blueprint.status in models.BlueprintState.IN_PROGRESS_STATES:
+            raise manager_exceptions.ConflictError(
+                "Can't delete blueprint {0} - it is still being uploaded"
+                .format(blueprint_id))
+
         blueprint_deployments = self.sm.get_blueprint_deployments(
             blueprint_id).items
 
@@ -202,7 +362,11 @@ class BlueprintsManager(object):
                         ','.join([dep.id for dep
                                   in blueprint_deployments])))
 
-        return self.sm.delete_blueprint(blueprint_id)
+        deleted_blueprint = self.sm.delete_blueprint(blueprint_id)
+        # the storage doesn't necessarily return the deleted blueprint's
+        # fields other than its id
+        deleted_blueprint.status = blueprint.status
+        return deleted_blueprint
 
     def delete_snapshot(self, snapshot_id):
         return self.sm.delete_snapshot(snapshot_id)
@@ -251,8 +415,7 @@ class BlueprintsManager(object):
     def execute_workflow(self, deployment_id, workflow_id,
                          parameters=None,
                          allow_custom_parameters=False, force=False):
-        deployment = self.get_deployment(deployment_id)
-        blueprint = self.get_blueprint(deployment.blueprint_id)
+        deployment = self._get_deployment_with_plugins(deployment_id)
 
         if workflow_id not in deployment.workflows:
             raise manager_exceptions.NonexistentWorkflowError(
@@ -286,12 +449,10 @@ class BlueprintsManager(object):
         self.sm.put_execution(new_execution.id, new_execution)
 
         # executing the user workflow
-        workflow_plugins = blueprint.plan[
-            constants.WORKFLOW_PLUGINS_TO_INSTALL]
         self.workflow_client.execute_workflow(
             workflow_id,
             workflow,
-            workflow_plugins=workflow_plugins,
+            workflow_plugins=deployment.workflow_plugins_to_install,
             blueprint_id=deployment.blueprint_id,
             deployment_id=deployment_id,
             execution_id=execution_id,
@@ -455,14 +616,21 @@ class BlueprintsManager(object):
 
     def create_deployment(self, blueprint_id, deployment_id, inputs=None):
         blueprint = self.get_blueprint(blueprint_id)
+        self._verify_blueprint_uploaded(
+            blueprint, 'create deployment {0}'.format(deployment_id))
         plan = blueprint.plan
         try:
-            deployment_plan = tasks.prepare_deployment_plan(plan, inputs)
+            deployment_plan = process_pool.apply(
+                _prepare_deployment_plan, plan, inputs)
         except parser_exceptions.MissingRequiredInputError, e:
             raise manager_exceptions.MissingRequiredDeploymentInputError(
                 str(e))
         except parser_exceptions.UnknownInputError, e:
             raise manager_exceptions.UnknownDeploymentInputError(str(e))
+        except process_pool.TaskLimitExceededError, e:
+            raise manager_exceptions.ProcessingLimitExceededError(
+                "Can't create deployment {0}: {1}".format(deployment_id,
+                                                          str(e)))
 
         now = str(datetime.now())
         new_deployment = models.Deployment(
@@ -473,7 +641,11 @@ class BlueprintsManager(object):
             policy_types=deployment_plan['policy_types'],
             policy_triggers=deployment_plan['policy_triggers'],
             groups=deployment_plan['groups'],
-            outputs=deployment_plan['outputs'])
+            outputs=deployment_plan['outputs'],
+            workflow_plugins_to_install=deployment_plan[
+                constants.WORKFLOW_PLUGINS_TO_INSTALL],
+            deployment_plugins_to_install=deployment_plan[
+                constants.DEPLOYMENT_PLUGINS_TO_INSTALL])
 
         self.sm.put_deployment(deployment_id, new_deployment)
         self._create_deployment_nodes(blueprint_id,
@@ -513,6 +685,7 @@ class BlueprintsManager(object):
         node_instances = [instance.to_dict() for instance
                           in self.sm.get_node_instances(
                           filters=deployment_id_filter).items]
+        from dsl_parser import tasks
         node_instances_modification = tasks.modify_deployment(
             nodes=nodes,
             previous_node_instances=node_instances,
@@ -708,6 +881,7 @@ class BlueprintsManager(object):
         def get_node(node_id):
             return self.sm.get_node(deployment_id, node_id)
 
+        from dsl_parser import functions
         try:
             return functions.evaluate_outputs(
                 outputs_def=deployment.outputs,
@@ -731,6 +905,7 @@ class BlueprintsManager(object):
         def get_node(node_id):
             return self.sm.get_node(deployment_id, node_id)
 
+        from dsl_parser import functions
         try:
             return functions.evaluate_functions(
                 payload=payload,
@@ -908,9 +1083,29 @@ class BlueprintsManager(object):
             }
         )
 
-    def _delete_deployment_environment(self, deployment_id):
+    def _get_deployment_with_plugins(self, deployment_id):
+        """Get a deployment, with the plugins it should have installed.
+
+        Deployments created before the plugins lists were stored on them
+        are migrated, by copying the lists from their blueprint's plan
+        """
         deployment = self.sm.get_deployment(deployment_id)
-        blueprint = self.sm.get_blueprint(deployment.blueprint_id)
+        if deployment.workflow_plugins_to_install is None or \
+                deployment.deployment_plugins_to_install is None:
+            blueprint = self.sm.get_blueprint(deployment.blueprint_id)
+            plugins = {
+                'workflow_plugins_to_install': blueprint.get_plan_value(
+                    constants.WORKFLOW_PLUGINS_TO_INSTALL),
+                'deployment_plugins_to_install': blueprint.get_plan_value(
+                    constants.DEPLOYMENT_PLUGINS_TO_INSTALL)
+            }
+            self.sm.update_deployment(deployment_id, plugins)
+            for field, value in plugins.iteritems():
+                setattr(deployment, field, value)
+        return deployment
+
+    def _delete_deployment_environment(self, deployment_id):
+        deployment = self._get_deployment_with_plugins(deployment_id)
         wf_id = 'delete_deployment_environment'
         deployment_env_deletion_task_name = \
             'cloudify_system_workflows.deployment_environment.delete'
@@ -921,10 +1116,10 @@ class BlueprintsManager(object):
             deployment=deployment,
             timeout=300,
             execution_parameters={
-                'deployment_plugins_to_uninstall': blueprint.plan[
-                    constants.DEPLOYMENT_PLUGINS_TO_INSTALL],
-                'workflow_plugins_to_uninstall': blueprint.plan[
-                    constants.WORKFLOW_PLUGINS_TO_INSTALL],
+                'deployment_plugins_to_uninstall':
+                    deployment.deployment_plugins_to_install,
+                'workflow_plugins_to_uninstall':
+                    deployment.workflow_plugins_to_install,
             })
 
     def _delete_deployment_logs(self, deployment_id):
@@ -986,11 +1181,13 @@ class BlueprintsManager(object):
         return current_app.parser_context
 
     def _update_parser_context_in_app(self, context):
+        from dsl_parser import utils as dsl_parser_utils
         raw_parser_context = self._extract_parser_context(context)
         resolver = dsl_parser_utils.create_import_resolver(
             raw_parser_context['resolver_section'])
         validate_definitions_version = raw_parser_context[
             'validate_definitions_version']
+        current_app.raw_parser_context = raw_parser_context
         current_app.parser_context = {
             'resolver': resolver,
             'validate_version': validate_definitions_version
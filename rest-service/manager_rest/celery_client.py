@@ -15,8 +15,6 @@
 
 import ssl
 
-from celery import Celery
-
 from manager_rest import config
 
 # These are the states that may be returned from the
@@ -44,6 +42,8 @@ class CeleryClient(object):
             password=config.instance().amqp_password,
         )
 
+        # imported here, so it isn't loaded when the rest service starts
+        from celery import Celery
         self.celery = Celery(broker=amqp_uri, backend=amqp_uri)
         self.celery.conf.update(
             CELERY_TASK_SERIALIZER="json",
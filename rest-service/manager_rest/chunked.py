@@ -15,10 +15,20 @@
 #
 
 
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
 # Chunked is handled by gunicorn
-def decode(input_stream, buffer_size=8192):
+def decode(input_stream, buffer_size=DEFAULT_BUFFER_SIZE):
+    """Read the (already de-chunked) request body in buffers, until the
+    end of the stream.
+
+    A read may return less than buffer_size bytes before the end of the
+    body (e.g. when the data is still on its way), so only an empty read
+    marks the end of the stream.
+    """
     while True:
         read_buffer = input_stream.read(buffer_size)
-        yield read_buffer
-        if len(read_buffer) < buffer_size:
+        if not read_buffer:
             return
+        yield read_buffer
@@ -0,0 +1,114 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""Coalescing of identical concurrent read requests.
+
+Requests are coalesced within a single worker process only, and only
+while they're handled concurrently by it. So coalescing is only useful
+when the rest service runs with threaded or asynchronous (e.g. gevent)
+workers. With gunicorn's default synchronous workers, each process
+handles one request at a time, and nothing is ever coalesced. It's
+therefore disabled by default (see the coalescing_enabled setting).
+"""
+
+import threading
+
+from flask import request
+
+from manager_rest import auth_cache
+
+COALESCED_METHODS = ('GET', 'HEAD')
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+        # whether followers may use the leader's result (or exception)
+        self.shared = False
+
+
+class SingleFlight(object):
+    """Coalesces identical concurrent calls.
+
+    The first caller of a given key (the leader) executes the call. Callers
+    of the same key arriving while the leader's call is in flight (the
+    followers) wait for it, and get its result (or exception) instead of
+    executing the call themselves. Nothing is cached: once a call
+    completes, the next caller of its key executes it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> _Call in flight
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func, is_shareable=None, timeout=None):
+        """Execute func, or share the result of an in-flight call with the
+        same key.
+
+        :param key: the call's key
+        :param func: the function to call
+        :param is_shareable: optional function which is given the result
+         of a call, and returns whether it may be shared with followers.
+         Followers of a call whose result isn't shareable execute func
+         themselves.
+        :param timeout: how long (in seconds) followers wait for the
+         leader's call, before executing func themselves
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait(timeout)
+            if call.done.is_set() and call.shared:
+                with self._lock:
+                    self.coalesced += 1
+                if call.exception is not None:
+                    raise call.exception
+                return call.result
+            return func()
+
+        try:
+            call.result = func()
+            call.shared = is_shareable is None or is_shareable(call.result)
+            return call.result
+        except Exception, e:
+            call.exception = e
+            call.shared = True
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+in_flight_requests = SingleFlight()
+
+
+def get_request_key():
+    """The key of identical read requests: requests for the same URL (path
+    and query string) by the same principal
+    """
+    return (request.method,
+            request.endpoint,
+            request.full_path,
+            auth_cache.get_credentials_digest())
@@ -0,0 +1,113 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import json
+import zlib
+import base64
+
+from flask import request
+
+from manager_rest import config
+
+GZIP_ENCODING = 'gzip'
+# zlib produces a gzip header and trailer when wbits is offset by 16
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/html')
+# stored data is compressed once and decompressed many times, and zlib's
+# decompression speed doesn't depend on the level
+STORED_DATA_COMPRESSION_LEVEL = 9
+
+
+def gzip_data(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def gzip_iter(chunks, level):
+    """Incrementally gzip an iterable of chunks (e.g. a streamed list
+    response), yielding compressed data as it becomes available.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode('utf-8')
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_json(obj):
+    """Compress a JSON serializable object into a base64 string, which can
+    be stored as a field of a JSON document
+    """
+    return base64.b64encode(zlib.compress(json.dumps(obj),
+                                          STORED_DATA_COMPRESSION_LEVEL))
+
+
+def decompress_json(data):
+    return json.loads(zlib.decompress(base64.b64decode(data)))
+
+
+def _client_accepts_gzip():
+    return request.accept_encodings[GZIP_ENCODING] > 0
+
+
+def _is_compressible(response):
+    return (response.mimetype in COMPRESSIBLE_MIMETYPES and
+            200 <= response.status_code < 300 and
+            response.status_code != 204 and
+            request.method != 'HEAD' and
+            not response.direct_passthrough and
+            'Content-Encoding' not in response.headers)
+
+
+def compress_response(response):
+    """after_request hook gzipping marshalled responses for clients that
+    accept it.
+
+    Buffered responses are compressed only above the configured minimum
+    size; streamed responses (e.g. list responses) are always compressed,
+    chunk by chunk, as their size isn't known in advance and they're
+    expected to be large.
+    """
+    cfy_config = config.instance()
+    if not cfy_config.compression_enabled or not _is_compressible(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if not _client_accepts_gzip():
+        return response
+
+    level = cfy_config.compression_level
+    if response.is_streamed:
+        response.response = gzip_iter(response.response, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < cfy_config.compression_min_size:
+            return response
+        response.set_data(gzip_data(data, level))
+    response.headers['Content-Encoding'] = GZIP_ENCODING
+    # the compressed body is a different representation, so a strong ETag
+    # computed for the identity body can only be sent as a weak one
+    etag, is_weak = response.get_etag()
+    if etag and not is_weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -37,6 +37,7 @@ class Config(object):
         self._rest_service_log_path = None
         self._rest_service_log_file_size_MB = None
         self._rest_service_log_files_backup_count = None
+        self._rest_service_log_requests_sample_rate = 1.0
         self._test_mode = False
         self._security_enabled = False
         self._security_ssl = {'enabled': False}
@@ -50,7 +51,45 @@ class Config(object):
         self._security_userstore_driver = None
         self._security_authentication_providers = []
         self._security_authorization_provider = None
+        self._security_auth_cache_ttl = 30
+        self._security_auth_cache_size = 1000
         self._insecure_endpoints_disabled = False
+        self._compression_enabled = True
+        self._compression_level = 6
+        self._compression_min_size = 1024
+        self._metrics_enabled = False
+        self._metrics_dir = None
+        self._profiling_sample_rate = 0.0
+        self._profiling_token = None
+        self._profiling_top_n = 5
+        self._profiles_dir = None
+        self._service_status_cache_ttl = 5
+        self._service_status_timeout = 2
+        # admission control is opt in, per resource method (see admission)
+        self._admission_limits = {}
+        self._admission_locks_dir = None
+        # only useful with threaded or asynchronous workers (see coalescing)
+        self._coalescing_enabled = False
+        self._coalescing_wait_timeout = 30
+        self._search_query_limits = {}
+        # maximal size (in bytes) of uploaded archives, by kind ('blueprint'
+        # or 'plugin'); uploads are unlimited unless a size is set
+        self._upload_max_sizes = {}
+        self._upload_buffer_size = 64 * 1024
+        self._plugins_zip_compression_level = 6
+        self._plugins_zip_threads = 4
+        self._dsl_parse_cache_dir = None
+        self._dsl_parse_cache_max_size = 256 * 1024 * 1024
+        self._background_workers = 2
+        # seconds without progress after which an asynchronous blueprint
+        # upload is considered lost (e.g. its worker process was recycled)
+        self._blueprint_upload_timeout = 30 * 60
+        self._parser_processes = 2
+        self._parser_process_timeout = 300
+        self._parser_process_memory_limit = 2 * 1024 * 1024 * 1024
+        self._file_server_blobs_folder = 'blobs'
+        # defaults to a folder next to the file server root
+        self._snapshots_staging_dir = None
 
     @property
     def db_address(self):
@@ -164,6 +203,14 @@ class Config(object):
     def rest_service_log_files_backup_count(self, value):
         self._rest_service_log_files_backup_count = value
 
+    @property
+    def rest_service_log_requests_sample_rate(self):
+        return self._rest_service_log_requests_sample_rate
+
+    @rest_service_log_requests_sample_rate.setter
+    def rest_service_log_requests_sample_rate(self, value):
+        self._rest_service_log_requests_sample_rate = value
+
     @property
     def test_mode(self):
         return self._test_mode
@@ -274,6 +321,22 @@ class Config(object):
     def security_authorization_provider(self, value):
         self._security_authorization_provider = value
 
+    @property
+    def security_auth_cache_ttl(self):
+        return self._security_auth_cache_ttl
+
+    @security_auth_cache_ttl.setter
+    def security_auth_cache_ttl(self, value):
+        self._security_auth_cache_ttl = value
+
+    @property
+    def security_auth_cache_size(self):
+        return self._security_auth_cache_size
+
+    @security_auth_cache_size.setter
+    def security_auth_cache_size(self, value):
+        self._security_auth_cache_size = value
+
     @property
     def insecure_endpoints_disabled(self):
         return self._insecure_endpoints_disabled
@@ -282,6 +345,238 @@ class Config(object):
     def insecure_endpoints_disabled(self, value):
         self._insecure_endpoints_disabled = value
 
+    @property
+    def compression_enabled(self):
+        return self._compression_enabled
+
+    @compression_enabled.setter
+    def compression_enabled(self, value):
+        self._compression_enabled = value
+
+    @property
+    def compression_level(self):
+        return self._compression_level
+
+    @compression_level.setter
+    def compression_level(self, value):
+        self._compression_level = value
+
+    @property
+    def compression_min_size(self):
+        return self._compression_min_size
+
+    @compression_min_size.setter
+    def compression_min_size(self, value):
+        self._compression_min_size = value
+
+    @property
+    def metrics_enabled(self):
+        return self._metrics_enabled
+
+    @metrics_enabled.setter
+    def metrics_enabled(self, value):
+        self._metrics_enabled = value
+
+    @property
+    def profiling_sample_rate(self):
+        return self._profiling_sample_rate
+
+    @profiling_sample_rate.setter
+    def profiling_sample_rate(self, value):
+        self._profiling_sample_rate = value
+
+    @property
+    def profiling_token(self):
+        return self._profiling_token
+
+    @profiling_token.setter
+    def profiling_token(self, value):
+        self._profiling_token = value
+
+    @property
+    def profiling_top_n(self):
+        return self._profiling_top_n
+
+    @profiling_top_n.setter
+    def profiling_top_n(self, value):
+        self._profiling_top_n = value
+
+    @property
+    def profiles_dir(self):
+        return self._profiles_dir
+
+    @profiles_dir.setter
+    def profiles_dir(self, value):
+        self._profiles_dir = value
+
+    @property
+    def service_status_cache_ttl(self):
+        return self._service_status_cache_ttl
+
+    @service_status_cache_ttl.setter
+    def service_status_cache_ttl(self, value):
+        self._service_status_cache_ttl = value
+
+    @property
+    def service_status_timeout(self):
+        return self._service_status_timeout
+
+    @service_status_timeout.setter
+    def service_status_timeout(self, value):
+        self._service_status_timeout = value
+
+    @property
+    def admission_limits(self):
+        return self._admission_limits
+
+    @admission_limits.setter
+    def admission_limits(self, value):
+        self._admission_limits = value
+
+    @property
+    def admission_locks_dir(self):
+        return self._admission_locks_dir
+
+    @admission_locks_dir.setter
+    def admission_locks_dir(self, value):
+        self._admission_locks_dir = value
+
+    @property
+    def coalescing_enabled(self):
+        return self._coalescing_enabled
+
+    @coalescing_enabled.setter
+    def coalescing_enabled(self, value):
+        self._coalescing_enabled = value
+
+    @property
+    def coalescing_wait_timeout(self):
+        return self._coalescing_wait_timeout
+
+    @coalescing_wait_timeout.setter
+    def coalescing_wait_timeout(self, value):
+        self._coalescing_wait_timeout = value
+
+    @property
+    def search_query_limits(self):
+        return self._search_query_limits
+
+    @search_query_limits.setter
+    def search_query_limits(self, value):
+        self._search_query_limits = value
+
+    @property
+    def upload_max_sizes(self):
+        return self._upload_max_sizes
+
+    @upload_max_sizes.setter
+    def upload_max_sizes(self, value):
+        self._upload_max_sizes = value
+
+    @property
+    def upload_buffer_size(self):
+        return self._upload_buffer_size
+
+    @upload_buffer_size.setter
+    def upload_buffer_size(self, value):
+        self._upload_buffer_size = value
+
+    @property
+    def plugins_zip_compression_level(self):
+        return self._plugins_zip_compression_level
+
+    @plugins_zip_compression_level.setter
+    def plugins_zip_compression_level(self, value):
+        self._plugins_zip_compression_level = value
+
+    @property
+    def plugins_zip_threads(self):
+        return self._plugins_zip_threads
+
+    @plugins_zip_threads.setter
+    def plugins_zip_threads(self, value):
+        self._plugins_zip_threads = value
+
+    @property
+    def dsl_parse_cache_dir(self):
+        return self._dsl_parse_cache_dir
+
+    @dsl_parse_cache_dir.setter
+    def dsl_parse_cache_dir(self, value):
+        self._dsl_parse_cache_dir = value
+
+    @property
+    def dsl_parse_cache_max_size(self):
+        return self._dsl_parse_cache_max_size
+
+    @dsl_parse_cache_max_size.setter
+    def dsl_parse_cache_max_size(self, value):
+        self._dsl_parse_cache_max_size = value
+
+    @property
+    def background_workers(self):
+        return self._background_workers
+
+    @background_workers.setter
+    def background_workers(self, value):
+        self._background_workers = value
+
+    @property
+    def parser_processes(self):
+        return self._parser_processes
+
+    @parser_processes.setter
+    def parser_processes(self, value):
+        self._parser_processes = value
+
+    @property
+    def parser_process_timeout(self):
+        return self._parser_process_timeout
+
+    @parser_process_timeout.setter
+    def parser_process_timeout(self, value):
+        self._parser_process_timeout = value
+
+    @property
+    def parser_process_memory_limit(self):
+        return self._parser_process_memory_limit
+
+    @parser_process_memory_limit.setter
+    def parser_process_memory_limit(self, value):
+        self._parser_process_memory_limit = value
+
+    @property
+    def file_server_blobs_folder(self):
+        return self._file_server_blobs_folder
+
+    @file_server_blobs_folder.setter
+    def file_server_blobs_folder(self, value):
+        self._file_server_blobs_folder = value
+
+    @property
+    def snapshots_staging_dir(self):
+        return self._snapshots_staging_dir
+
+    @snapshots_staging_dir.setter
+    def snapshots_staging_dir(self, value):
+        self._snapshots_staging_dir = value
+
+    @property
+    def metrics_dir(self):
+        return self._metrics_dir
+
+    @metrics_dir.setter
+    def metrics_dir(self, value):
+        self._metrics_dir = value
+
+    @property
+    def blueprint_upload_timeout(self):
+        return self._blueprint_upload_timeout
+
+    @blueprint_upload_timeout.setter
+    def blueprint_upload_timeout(self, value):
+        self._blueprint_upload_timeout = value
+
 
 _instance = Config()
 
@@ -19,3 +19,4 @@ MAINTENANCE_MODE_ACTIVE = 'activated'
 NOT_IN_MAINTENANCE_MODE = 'deactivated'
 MAINTENANCE_MODE_ACTIVE_ERROR_CODE = 'maintenance_mode_active'
 ACTIVATING_MAINTENANCE_MODE_ERROR_CODE = 'entering_maintenance_mode'
+TOO_MANY_REQUESTS_ERROR_CODE = 'too_many_requests'
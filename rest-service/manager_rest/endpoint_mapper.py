@@ -56,7 +56,10 @@ def setup_resources(api):
         'PluginsId': 'plugins/<string:plugin_id>',
         'PluginsArchive': 'plugins/<string:plugin_id>/archive',
         'MaintenanceMode': 'maintenance',
-        'MaintenanceModeAction': 'maintenance/<string:maintenance_action>'
+        'MaintenanceModeAction': 'maintenance/<string:maintenance_action>',
+        'Batch': 'batch',
+        'Metrics': 'metrics',
+        'Profiles': 'profiles'
     }
 
     for resource, endpoint_suffix in resources_endpoints.iteritems():
@@ -77,7 +80,6 @@ def _set_versioned_urls(api, resource_name, endpoint_suffix):
             api.add_resource(resource,
                              url,
                              endpoint=endpoint)
-            rest_swagger.add_swagger_resource(api,
-                                              version_name,
-                                              resource,
-                                              url)
+            rest_swagger.register_swagger_resource(version_name,
+                                                   resource,
+                                                   url)
@@ -18,6 +18,7 @@ import elasticsearch.exceptions
 from elasticsearch import Elasticsearch
 
 from manager_rest import config
+from manager_rest import compression
 from manager_rest import manager_exceptions
 from manager_rest.storage_manager import ListResult
 from manager_rest.models import (BlueprintState,
@@ -48,6 +49,13 @@ MUTATE_PARAMS = {
     'refresh': True
 }
 
+# blueprint plans are stored compressed, along with a summary of the plan
+# values used without the rest of it; blueprints stored before that have
+# their plan stored as is
+PLAN_FIELD = 'plan'
+COMPRESSED_PLAN_FIELD = 'compressed_plan'
+PLAN_SUMMARY_FIELD = 'plan_summary'
+
 
 class ESStorageManager(object):
 
@@ -138,6 +146,23 @@ class ESStorageManager(object):
                                          doc_type=doc_type,
                                          body=query)
 
+    @staticmethod
+    def _blueprint_source_fields(include):
+        if not include or PLAN_FIELD not in include:
+            return include
+        return list(include) + [COMPRESSED_PLAN_FIELD, PLAN_SUMMARY_FIELD]
+
+    @staticmethod
+    def _serialize_blueprint_fields(blueprint_fields):
+        blueprint_fields = dict(blueprint_fields)
+        plan = blueprint_fields.pop(PLAN_FIELD, None)
+        if plan is not None:
+            blueprint_fields[COMPRESSED_PLAN_FIELD] = \
+                compression.compress_json(plan)
+            blueprint_fields[PLAN_SUMMARY_FIELD] = \
+                BlueprintState.get_plan_summary(plan)
+        return blueprint_fields
+
     @staticmethod
     def _fill_missing_fields_and_deserialize(fields_data, model_class):
         for field in model_class.fields:
@@ -151,7 +176,8 @@ class ESStorageManager(object):
                                     BlueprintState,
                                     pagination=pagination,
                                     filters=filters,
-                                    include=include,
+                                    include=self._blueprint_source_fields(
+                                        include),
                                     sort=sort)
 
     def snapshots_list(self, include=None, filters=None, pagination=None,
@@ -192,9 +218,10 @@ class ESStorageManager(object):
         doc = self._get_doc(NODE_INSTANCE_TYPE,
                             node_instance_id,
                             fields=include)
-        node = DeploymentNodeInstance(version=doc['_version'],
-                                      **doc['_source'])
-        return node
+        fields_data = doc['_source']
+        fields_data['version'] = doc['_version']
+        return self._fill_missing_fields_and_deserialize(
+            fields_data, DeploymentNodeInstance)
 
     def get_node(self, deployment_id, node_id, include=None):
         storage_node_id = self._storage_node_id(deployment_id, node_id)
@@ -241,10 +268,12 @@ class ESStorageManager(object):
                                fields=include)
 
     def get_blueprint(self, blueprint_id, include=None):
-        return self._get_doc_and_deserialize(BLUEPRINT_TYPE,
-                                             blueprint_id,
-                                             BlueprintState,
-                                             fields=include)
+        # the stored fields differ from the model's (see PLAN_FIELD), so
+        # the fields returned aren't checked against the requested ones
+        doc = self._get_doc(BLUEPRINT_TYPE, blueprint_id,
+                            self._blueprint_source_fields(include))
+        return self._fill_missing_fields_and_deserialize(doc['_source'],
+                                                         BlueprintState)
 
     def get_snapshot(self, snapshot_id, include=None):
         return self._get_doc_and_deserialize(SNAPSHOT_TYPE,
@@ -271,8 +300,9 @@ class ESStorageManager(object):
                                              fields=include)
 
     def put_blueprint(self, blueprint_id, blueprint):
-        self._put_doc_if_not_exists(BLUEPRINT_TYPE, str(blueprint_id),
-                                    blueprint.to_dict())
+        self._put_doc_if_not_exists(
+            BLUEPRINT_TYPE, str(blueprint_id),
+            self._serialize_blueprint_fields(blueprint.to_dict()))
 
     def put_snapshot(self, snapshot_id, snapshot):
         self._put_doc_if_not_exists(SNAPSHOT_TYPE, str(snapshot_id),
@@ -315,6 +345,30 @@ class ESStorageManager(object):
         return self._delete_doc(SNAPSHOT_TYPE, snapshot_id,
                                 Snapshot)
 
+    def update_blueprint(self, blueprint_id, updated_fields):
+        update_doc = {'doc': self._serialize_blueprint_fields(updated_fields)}
+        try:
+            self._connection.update(index=STORAGE_INDEX_NAME,
+                                    doc_type=BLUEPRINT_TYPE,
+                                    id=str(blueprint_id),
+                                    body=update_doc,
+                                    **MUTATE_PARAMS)
+        except elasticsearch.exceptions.NotFoundError:
+            raise manager_exceptions.NotFoundError(
+                "Blueprint {0} not found".format(blueprint_id))
+
+    def update_deployment(self, deployment_id, updated_fields):
+        update_doc = {'doc': updated_fields}
+        try:
+            self._connection.update(index=STORAGE_INDEX_NAME,
+                                    doc_type=DEPLOYMENT_TYPE,
+                                    id=str(deployment_id),
+                                    body=update_doc,
+                                    **MUTATE_PARAMS)
+        except elasticsearch.exceptions.NotFoundError:
+            raise manager_exceptions.NotFoundError(
+                "Deployment {0} not found".format(deployment_id))
+
     def update_snapshot_status(self, snapshot_id, status, error):
         update_doc_data = {'status': status,
                            'error': error}
@@ -0,0 +1,110 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import json
+import hashlib
+
+from flask import request, make_response
+
+from manager_rest import models
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+def is_conditional_request():
+    return request.method in CONDITIONAL_METHODS
+
+
+def make_etag(*parts):
+    """Create a strong ETag for the current request from the given version
+    parts (e.g. a document's version or update time).
+
+    The request endpoint (which includes the API version) and the query
+    string (which includes projection, sorting and pagination parameters)
+    are part of the tag, as they affect the representation being sent.
+    """
+    digest = hashlib.sha1()
+    digest.update(request.endpoint or '')
+    digest.update('\0')
+    digest.update(request.query_string or '')
+    for part in parts:
+        digest.update('\0')
+        digest.update(unicode(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def content_hash(items):
+    """Hash the contents of the given storage items (models or dicts)"""
+    digest = hashlib.sha1()
+    for item in items:
+        if isinstance(item, models.SerializableObject):
+            item = item.to_dict()
+        digest.update(json.dumps(item, sort_keys=True))
+        digest.update('\0')
+    return digest.hexdigest()
+
+
+def _version_token(item):
+    version_fields = getattr(item, 'version_fields', None)
+    if version_fields:
+        versions = [getattr(item, field) for field in version_fields]
+        # the version fields may have been projected out of the item (or
+        # not be supported by the storage), in which case the item's
+        # (projected) content is hashed instead
+        if None not in versions:
+            return json.dumps([item.id] + versions)
+    return content_hash([item])
+
+
+def list_version(items, metadata=None):
+    """Create a version token for a list of storage items, from the items'
+    ids and version fields and the list's (pagination) metadata, so that
+    the items needn't be serialized for computing the list's ETag
+    """
+    digest = hashlib.sha1()
+    for item in items:
+        digest.update(_version_token(item))
+        digest.update('\0')
+    digest.update(json.dumps(metadata, sort_keys=True))
+    return digest.hexdigest()
+
+
+def is_not_modified(etag):
+    # If-None-Match uses weak comparison, so that tags weakened by response
+    # compression still match
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag):
+    response = make_response('', 304)
+    response.set_etag(etag)
+    return response
+
+
+def add_etag(result, etag):
+    """Attach an ETag header to a resource method's result, which may be a
+    response object, a (data, code, headers) tuple or plain data.
+    """
+    if hasattr(result, 'set_etag'):
+        result.set_etag(etag)
+        return result
+    if isinstance(result, tuple):
+        data = result[0]
+        code = result[1] if len(result) > 1 else 200
+        headers = dict(result[2]) if len(result) > 2 and result[2] else {}
+    else:
+        data, code, headers = result, 200, {}
+    headers['ETag'] = '"{0}"'.format(etag)
+    return data, code, headers
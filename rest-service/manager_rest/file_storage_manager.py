@@ -233,6 +233,30 @@ class FileStorageManager(object):
         self._dump_data(data)
         return 1
 
+    def update_blueprint(self, blueprint_id, updated_fields):
+        data = self._load_data()
+        if blueprint_id not in data[BLUEPRINTS]:
+            raise manager_exceptions.NotFoundError(
+                "Blueprint {0} not found".format(blueprint_id))
+
+        blueprint = data[BLUEPRINTS][blueprint_id]
+        for field, value in updated_fields.iteritems():
+            setattr(blueprint, field, value)
+        data[BLUEPRINTS][blueprint_id] = blueprint
+        self._dump_data(data)
+
+    def update_deployment(self, deployment_id, updated_fields):
+        data = self._load_data()
+        if deployment_id not in data[DEPLOYMENTS]:
+            raise manager_exceptions.NotFoundError(
+                "Deployment {0} not found".format(deployment_id))
+
+        deployment = data[DEPLOYMENTS][deployment_id]
+        for field, value in updated_fields.iteritems():
+            setattr(deployment, field, value)
+        data[DEPLOYMENTS][deployment_id] = deployment
+        self._dump_data(data)
+
     def update_execution_status(self, execution_id, status, error):
         data = self._load_data()
         if execution_id not in data[EXECUTIONS]:
@@ -13,21 +13,29 @@
 #  * See the License for the specific language governing permissions and
 #  * limitations under the License.
 import os
+import time
 import shutil
+import hashlib
 import tempfile
 import contextlib
 
 from urllib2 import urlopen, URLError
 
-from flask import request
+from flask import request, current_app
 
 from manager_rest import manager_exceptions
+from manager_rest import blob_store
 from manager_rest import chunked
 from manager_rest import config
+from manager_rest import metrics
 
 
 class UploadedDataManager(object):
 
+    # SHA-256 digest and size of the last received archive
+    archive_sha256 = None
+    archive_size = None
+
     def receive_uploaded_data(self, data_id):
         file_server_root = config.instance().file_server_root
         archive_target_path = tempfile.mktemp(dir=file_server_root)
@@ -50,7 +58,8 @@ class UploadedDataManager(object):
     def _save_file_locally(self, archive_target_path):
         url_key = self._get_data_url_key()
         if url_key in request.args:
-            if request.data or 'Transfer-Encoding' in request.headers:
+            if request.content_length or \
+                    'Transfer-Encoding' in request.headers:
                 raise manager_exceptions.BadParametersError(
                     "Can't pass both a {0} URL via query parameters "
                     "and {0} data via the request body at the same time"
@@ -58,8 +67,9 @@ class UploadedDataManager(object):
             data_url = request.args[url_key]
             try:
                 with contextlib.closing(urlopen(data_url)) as urlf:
-                    with open(archive_target_path, 'w') as f:
-                        f.write(urlf.read())
+                    self._verify_upload_size(
+                        urlf.info().getheader('Content-Length'))
+                    self._write_archive(urlf, archive_target_path)
             except URLError:
                 raise manager_exceptions.ParamUrlNotFoundError(
                     "URL {0} not found - can't download {1} archive"
@@ -70,18 +80,51 @@ class UploadedDataManager(object):
                     .format(data_url, self._get_kind()))
 
         elif 'Transfer-Encoding' in request.headers:
-            with open(archive_target_path, 'w') as f:
-                for buffered_chunked in chunked.decode(request.input_stream):
-                    f.write(buffered_chunked)
+            # gunicorn de-chunks the body, but doesn't set its length
+            self._write_archive(request.input_stream, archive_target_path)
         else:
-            if not request.data:
+            if not request.content_length:
                 raise manager_exceptions.BadParametersError(
                     'Missing {0} archive in request body or '
                     '"{1}" in query parameters'.format(self._get_kind(),
                                                        url_key))
-            uploaded_file_data = request.data
-            with open(archive_target_path, 'w') as f:
-                f.write(uploaded_file_data)
+            self._verify_upload_size(request.content_length)
+            self._write_archive(request.stream, archive_target_path)
+
+    def _get_max_upload_size(self):
+        return config.instance().upload_max_sizes.get(self._get_kind())
+
+    def _verify_upload_size(self, size):
+        max_size = self._get_max_upload_size()
+        if max_size and size and long(size) > max_size:
+            raise manager_exceptions.PayloadTooLargeError(
+                'The {0} archive is larger than the maximal allowed size '
+                '({1} bytes)'.format(self._get_kind(), max_size))
+
+    def _write_archive(self, stream, archive_target_path):
+        """Write the uploaded archive to disk as it arrives, computing its
+        SHA-256 digest on the way. The upload size limit is enforced on
+        the bytes actually received, as the declared size (if any) can't
+        be trusted.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        start = time.time()
+        with open(archive_target_path, 'wb') as f:
+            for buf in chunked.decode(stream,
+                                      config.instance().upload_buffer_size):
+                size += len(buf)
+                self._verify_upload_size(size)
+                digest.update(buf)
+                f.write(buf)
+        duration = time.time() - start
+        metrics.registry.observe_upload(self._get_kind(), size, duration)
+        self.archive_size = size
+        self.archive_sha256 = digest.hexdigest()
+        current_app.logger.info(
+            'Received a {0} archive of {1} bytes in {2:.3f} seconds '
+            '(sha256: {3})'.format(self._get_kind(), size, duration,
+                                   self.archive_sha256))
 
     def _move_archive_to_uploaded_dir(self,
                                       data_id,
@@ -102,8 +145,9 @@ class UploadedDataManager(object):
         archive_type = self._get_archive_type(archive_path)
         if not dest_file_name:
             dest_file_name = '{0}.{1}'.format(data_id, archive_type)
-        shutil.move(archive_path,
-                    os.path.join(uploaded_dir, dest_file_name))
+        dest_path = os.path.join(uploaded_dir, dest_file_name)
+        shutil.move(archive_path, dest_path)
+        blob_store.add_file(dest_path, digest=self.archive_sha256)
 
     def _get_kind(self):
         raise NotImplementedError('Subclass responsibility')
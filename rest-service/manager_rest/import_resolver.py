@@ -0,0 +1,239 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""An import resolver keeping the remote imports it fetches in a local
+disk cache.
+
+To use it, set the import resolver section of the provider context to:
+
+    import_resolver:
+      implementation: manager_rest.import_resolver:CachingImportResolver
+      parameters:
+        rules: [...]          # same as the default resolver's rules
+        cache_dir: ...        # optional
+        offline_fallback: ... # optional, defaults to true
+        warmup_urls: [...]    # optional, remote imports to prefetch
+        warmup: {...}         # optional, import url -> local file path
+
+Cached imports are revalidated on every use, with conditional requests
+(If-None-Match / If-Modified-Since), so an unchanged import costs a 304
+response rather than a download. If the remote server can't be reached
+(or fails), the cached copy is used, unless offline_fallback is disabled.
+
+The cache can be warmed up, so that even the first blueprints using an
+import needn't wait for it to be downloaded (or can be parsed while the
+manager is offline):
+ - the imports given in warmup_urls (e.g. the cloudify types and plugin
+   yamls at http://www.getcloudify.org/spec/...) which aren't cached yet
+   are fetched in the background when the resolver is created, and
+ - the imports given in the warmup mapping are cached with the contents
+   of the given local files. The cloudify types shipped with the manager
+   (resources/rest-service/cloudify/types, copied to the file server) are
+   always cached for the published types url of the manager's version.
+
+The cached imports are used as the blueprints' own content, so the cache
+directory must only be accessible by the rest service's user: caching is
+disabled if it's owned by another user.
+"""
+
+import os
+import json
+import errno
+import hashlib
+import logging
+import tempfile
+from email.utils import formatdate
+
+import requests
+from dsl_parser.exceptions import DSLParsingLogicException
+from dsl_parser.import_resolver.abstract_import_resolver import \
+    read_import, DEFAULT_REQUEST_TIMEOUT
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+
+from manager_rest import background
+from manager_rest import config
+from manager_rest import get_version
+from manager_rest import utils
+
+logger = logging.getLogger(__name__)
+
+CACHED_SCHEMES = ('http:', 'https:')
+TYPES_RESOURCE_PATH = 'cloudify/types/types.yaml'
+TYPES_SPEC_URL = 'http://www.getcloudify.org/spec/cloudify/{0}/types.yaml'
+
+
+def get_default_cache_dir():
+    return os.path.join(tempfile.gettempdir(),
+                        'cloudify-rest-import-cache-{0}'.format(os.getuid()))
+
+
+def get_types_spec_version(manager_version):
+    """The version in the types spec url of a manager version (e.g. 3.4 for
+    3.4.0, 3.4m3 for 3.4.0-m3)
+    """
+    version, _, milestone = manager_version.partition('-')
+    if version.count('.') > 1 and version.endswith('.0'):
+        version = version[:-len('.0')]
+    return version + milestone
+
+
+def get_default_warmup():
+    """The cloudify types shipped with the manager, for their published url
+    """
+    file_server_root = config.instance().file_server_root
+    if not file_server_root:
+        return {}
+    types_url = TYPES_SPEC_URL.format(get_types_spec_version(get_version()))
+    return {types_url: os.path.join(file_server_root, TYPES_RESOURCE_PATH)}
+
+
+class CachingImportResolver(DefaultImportResolver):
+
+    def __init__(self, rules=None, cache_dir=None, offline_fallback=True,
+                 warmup=None, warmup_urls=None):
+        super(CachingImportResolver, self).__init__(rules=rules)
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.offline_fallback = offline_fallback
+        try:
+            utils.create_private_dir(self.cache_dir)
+        except (OSError, utils.UnsafeDirectoryError), e:
+            logger.warning('Not caching imports: {0}'.format(e))
+            self.cache_dir = None
+            return
+        warmup_files = get_default_warmup()
+        warmup_files.update(warmup or {})
+        self._warmup(warmup_files)
+        urls_to_fetch = [url for url in warmup_urls or []
+                         if not self._load_entry(url)]
+        if urls_to_fetch:
+            background.get_worker_pool().submit(self._prefetch,
+                                                urls_to_fetch)
+
+    def resolve(self, import_url):
+        # same resolution order as the default resolver: the urls given
+        # by the matching rules, and then the original url
+        urls = []
+        for rule in self.rules:
+            prefix, replacement = rule.items()[0]
+            if import_url.startswith(prefix):
+                url = replacement + import_url[len(prefix):]
+                if url not in urls:
+                    urls.append(url)
+        if import_url not in urls:
+            urls.append(import_url)
+
+        failed_urls = {}
+        for url in urls:
+            try:
+                return self._fetch(url)
+            except DSLParsingLogicException, ex:
+                if len(urls) == 1:
+                    raise
+                failed_urls[url] = str(ex)
+        ex = DSLParsingLogicException(
+            13, 'Failed to resolve the following urls: {0}'
+                .format(failed_urls))
+        ex.failed_import = import_url
+        raise ex
+
+    def _fetch(self, url):
+        if not url.startswith(CACHED_SCHEMES):
+            return read_import(url)
+
+        entry = self._load_entry(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        error_str = 'Import failed: Unable to open import url'
+        try:
+            response = requests.get(url, headers=headers,
+                                    timeout=DEFAULT_REQUEST_TIMEOUT)
+        except requests.RequestException, ex:
+            if entry and self.offline_fallback:
+                return entry['content']
+            raise DSLParsingLogicException(
+                13, '{0} {1}; {2}'.format(error_str, url, ex))
+
+        if response.status_code == 304 and entry:
+            return entry['content']
+        if 200 <= response.status_code < 300:
+            self._store_entry(url,
+                              response.text,
+                              etag=response.headers.get('ETag'),
+                              last_modified=response.headers.get(
+                                  'Last-Modified'))
+            return response.text
+        if response.status_code >= 500 and entry and self.offline_fallback:
+            return entry['content']
+        raise DSLParsingLogicException(
+            13, '{0} {1}; status code: {2}'.format(
+                error_str, url, response.status_code))
+
+    def _prefetch(self, urls):
+        for url in urls:
+            try:
+                self.fetch_import(url)
+            except DSLParsingLogicException, ex:
+                logger.warning("Couldn't prefetch import {0}: {1}"
+                               .format(url, ex))
+
+    def _warmup(self, warmup_files):
+        for url, file_path in warmup_files.iteritems():
+            if self._load_entry(url) or not os.path.isfile(file_path):
+                continue
+            with open(file_path) as f:
+                content = f.read().decode('utf-8')
+            # a newer remote file will replace the warmed up one, since
+            # it'll be returned for the If-Modified-Since request
+            self._store_entry(url, content, last_modified=formatdate(
+                os.path.getmtime(file_path), usegmt=True))
+
+    def _entry_path(self, url):
+        url_digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, url_digest + '.json')
+
+    def _load_entry(self, url):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._entry_path(url)) as f:
+                entry = json.load(f)
+        except IOError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        except ValueError:
+            return None
+        # guard against (unlikely) hash collisions
+        return entry if entry.get('url') == url else None
+
+    def _store_entry(self, url, content, etag=None, last_modified=None):
+        if not self.cache_dir:
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'url': url,
+                           'etag': etag,
+                           'last_modified': last_modified,
+                           'content': content}, f)
+            os.rename(temp_path, self._entry_path(url))
+        except Exception:
+            os.remove(temp_path)
+            raise
@@ -0,0 +1,185 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""Non-blocking logging for the rest service.
+
+Log records are formatted by a QueueHandler in the logging thread, and put
+on a bounded in-memory queue. A single background writer thread per worker
+process hands them to the actual (file) handlers, so request threads never
+wait on disk I/O or log file rollover. When the queue is full, records are
+dropped rather than blocking; the number of dropped records is logged once
+the writer catches up.
+"""
+
+import os
+import atexit
+import fcntl
+import Queue
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_QUEUE_SIZE = 10000
+# how long to wait for pending records to be written when exiting
+EXIT_FLUSH_TIMEOUT = 5
+
+_writer_lock = threading.Lock()
+_writer = None
+
+
+class ProcessSafeRotatingFileHandler(RotatingFileHandler):
+    """A RotatingFileHandler which may be shared by several processes
+    (e.g. the rest service's gunicorn workers) writing to the same file.
+
+    Writes and rollovers are serialized with an exclusive lock on a
+    <log file>.lock file, and a process reopens its log file if another
+    process rolled it over.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        RotatingFileHandler.__init__(self, filename, *args, **kwargs)
+        self._lock_file = open('{0}.lock'.format(self.baseFilename), 'a')
+
+    def emit(self, record):
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            self._reopen_if_rolled_over()
+            RotatingFileHandler.emit(self, record)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _reopen_if_rolled_over(self):
+        if not self.stream:
+            return
+        try:
+            current_inode = os.stat(self.baseFilename).st_ino
+        except OSError:
+            current_inode = None
+        if current_inode != os.fstat(self.stream.fileno()).st_ino:
+            self.stream.close()
+            self.stream = self._open()
+
+    def close(self):
+        RotatingFileHandler.close(self)
+        self._lock_file.close()
+
+
+class QueueHandler(logging.Handler):
+    """Hands log records over to the background writer, to be handled by
+    the given target handler.
+    """
+
+    def __init__(self, target):
+        logging.Handler.__init__(self)
+        self.target = target
+        self.dropped = 0
+        self.reported_dropped = 0
+
+    def prepare(self, record):
+        # the record is formatted here, while its arguments (which may be
+        # mutable or depend on the request context) are still valid
+        message = self.format(record)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+    def emit(self, record):
+        try:
+            record = self.prepare(record)
+        except Exception:
+            self.handleError(record)
+            return
+        if not _get_writer().put(self, record):
+            self.dropped += 1
+
+
+class _Writer(object):
+
+    def __init__(self, queue_size):
+        self.pid = os.getpid()
+        self.queue = Queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._run,
+                                       name='log-writer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, queue_handler, record):
+        try:
+            self.queue.put_nowait((queue_handler, record))
+            return True
+        except Queue.Full:
+            return False
+
+    def _run(self):
+        while True:
+            queue_handler, record = self.queue.get()
+            try:
+                if queue_handler is None:
+                    return
+                self._handle(queue_handler, record)
+            finally:
+                self.queue.task_done()
+
+    @staticmethod
+    def _handle(queue_handler, record):
+        target = queue_handler.target
+        try:
+            target.handle(record)
+            dropped = queue_handler.dropped - queue_handler.reported_dropped
+            if dropped > 0:
+                queue_handler.reported_dropped += dropped
+                warning = logging.LogRecord(
+                    record.name, logging.WARNING, __file__, 0,
+                    '{0} log records were dropped (log queue is full)'
+                    .format(dropped), None, None)
+                warning.msg = queue_handler.format(warning)
+                target.handle(warning)
+        except Exception:
+            target.handleError(record)
+
+    def stop(self, timeout=None):
+        try:
+            self.queue.put((None, None), timeout=timeout)
+        except Queue.Full:
+            return
+        self.thread.join(timeout)
+
+
+def _get_writer():
+    global _writer
+    writer = _writer
+    # a writer thread started before forking doesn't exist in the child
+    if writer is None or writer.pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid():
+                _writer = _Writer(DEFAULT_QUEUE_SIZE)
+            writer = _writer
+    return writer
+
+
+def flush():
+    """Block until all the queued log records are written"""
+    if _writer is not None and _writer.pid == os.getpid():
+        _writer.queue.join()
+
+
+def _stop_writer():
+    if _writer is not None and _writer.pid == os.getpid():
+        _writer.stop(timeout=EXIT_FLUSH_TIMEOUT)
+
+
+atexit.register(_stop_writer)
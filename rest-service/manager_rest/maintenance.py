@@ -0,0 +1,94 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import tempfile
+
+from manager_rest import config
+from manager_rest import models
+from manager_rest.storage_manager import get_storage_manager
+from manager_rest.constants import (MAINTENANCE_MODE_ACTIVE,
+                                    MAINTENANCE_MODE_STATUS_FILE,
+                                    ACTIVATING_MAINTENANCE_MODE,
+                                    NOT_IN_MAINTENANCE_MODE)
+
+# maintenance file path -> (file stat signature, maintenance state).
+# The maintenance state is shared between the rest service's workers
+# through the maintenance file; each worker keeps the last state it read
+# and only re-reads the file when its stat signature changes.
+_state_cache = {}
+
+
+def get_maintenance_file_path():
+    return os.path.join(
+        config.instance().maintenance_folder,
+        MAINTENANCE_MODE_STATUS_FILE)
+
+
+def get_maintenance_state():
+    maintenance_file_path = get_maintenance_file_path()
+    try:
+        stat = os.stat(maintenance_file_path)
+    except OSError:
+        _state_cache.pop(maintenance_file_path, None)
+        return NOT_IN_MAINTENANCE_MODE
+
+    signature = (stat.st_ino, stat.st_mtime, stat.st_size)
+    cached = _state_cache.get(maintenance_file_path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    with open(maintenance_file_path, 'r') as f:
+        state = f.read()
+    _state_cache[maintenance_file_path] = (signature, state)
+    return state
+
+
+def write_maintenance_state(state):
+    maintenance_file_path = get_maintenance_file_path()
+    # the new state is written to a temporary file which then replaces the
+    # maintenance file, so other workers never read a partially written
+    # state, and always see a changed stat signature
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(maintenance_file_path))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(state)
+        os.chmod(tmp_path, 0644)
+        os.rename(tmp_path, maintenance_file_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def remove_maintenance_state():
+    os.remove(get_maintenance_file_path())
+
+
+def finish_activation_if_idle():
+    """Move from "activating" to "activated" maintenance mode if there are
+    no more running executions.
+
+    This is called when maintenance mode activation is requested, and
+    whenever an execution ends, rather than on every status query.
+    """
+    if get_maintenance_state() != ACTIVATING_MAINTENANCE_MODE:
+        return
+    running_executions = get_storage_manager().executions_list(
+        include=['id'],
+        filters={'status': models.Execution.ACTIVE_STATES},
+        pagination={'size': 1}).items
+    if not running_executions:
+        write_maintenance_state(MAINTENANCE_MODE_ACTIVE)
@@ -13,7 +13,6 @@
 #  * limitations under the License.
 import re
 
-import elasticsearch
 from flask import g
 
 from manager_rest import config
@@ -153,6 +152,8 @@ class ManagerElasticsearch:
         """Return a connection to Cloudify manager's Elasticsearch
         """
         if 'es_connection' not in g:
+            # imported here, so it isn't loaded when the rest service starts
+            import elasticsearch
             es_host = config.instance().db_address
             es_port = config.instance().db_port
             g.es_connection = elasticsearch.Elasticsearch(
@@ -175,6 +176,7 @@ class ManagerElasticsearch:
 
     @staticmethod
     def search_events(doc_type=None, body=None, include=None):
+        import elasticsearch
         try:
             return ManagerElasticsearch.search(index=EVENTS_INDICES_PATTERN,
                                                doc_type=doc_type,
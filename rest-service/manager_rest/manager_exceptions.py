@@ -324,3 +324,39 @@ class SnapshotActionError(ManagerException):
             *args,
             **kwargs
         )
+
+
+class QueryNotAllowedError(ManagerException):
+    ERROR_CODE = 'query_not_allowed_error'
+
+    def __init__(self, *args, **kwargs):
+        super(QueryNotAllowedError, self).__init__(
+            400,
+            QueryNotAllowedError.ERROR_CODE,
+            *args,
+            **kwargs
+        )
+
+
+class PayloadTooLargeError(ManagerException):
+    ERROR_CODE = 'payload_too_large_error'
+
+    def __init__(self, *args, **kwargs):
+        super(PayloadTooLargeError, self).__init__(
+            413,
+            PayloadTooLargeError.ERROR_CODE,
+            *args,
+            **kwargs
+        )
+
+
+class ProcessingLimitExceededError(ManagerException):
+    ERROR_CODE = 'processing_limit_exceeded_error'
+
+    def __init__(self, *args, **kwargs):
+        super(ProcessingLimitExceededError, self).__init__(
+            400,
+            ProcessingLimitExceededError.ERROR_CODE,
+            *args,
+            **kwargs
+        )
@@ -0,0 +1,515 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import json
+import errno
+import bisect
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask import g, request, has_request_context
+
+from manager_rest import config
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRIC_PREFIX = 'manager_rest'
+# upper bounds (in seconds) of the latency histograms' buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+UPLOAD_DURATION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0,
+                           300.0, 900.0)
+# upper bounds (in bytes per second) of the upload throughput histogram
+UPLOAD_THROUGHPUT_BUCKETS = (64 * 1024, 256 * 1024, 1024 ** 2,
+                             4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2,
+                             256 * 1024 ** 2, 1024 ** 3)
+# minimal interval (in seconds) between writes of a worker's metrics file
+FLUSH_INTERVAL = 1.0
+METRICS_FILE_PREFIX = 'metrics-'
+
+
+class Histogram(object):
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # the last count is for the implicit +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _encode_value(value):
+    if isinstance(value, Histogram):
+        return {'buckets': list(value.buckets),
+                'counts': list(value.counts),
+                'sum': value.sum,
+                'count': value.count}
+    if isinstance(value, list):
+        return [_encode_value(v) for v in value]
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        histogram = Histogram(buckets=tuple(value['buckets']))
+        histogram.counts = list(value['counts'])
+        histogram.sum = value['sum']
+        histogram.count = value['count']
+        return histogram
+    if isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    return value
+
+
+def _merge_values(value, other):
+    if isinstance(value, Histogram):
+        merged = Histogram(buckets=value.buckets)
+        if value.buckets == other.buckets:
+            merged.counts = [a + b for a, b in zip(value.counts,
+                                                   other.counts)]
+            merged.sum = value.sum + other.sum
+            merged.count = value.count + other.count
+        return merged
+    if isinstance(value, list):
+        return [_merge_values(a, b) for a, b in zip(value, other)]
+    return value + other
+
+
+class MetricsRegistry(object):
+    """Store of the rest service's request and storage metrics.
+
+    Each worker process collects its metrics in memory. When a metrics
+    directory is configured, a worker also writes its metrics to its own
+    file in it (at most once every FLUSH_INTERVAL seconds), and exports
+    the metrics of all the workers, aggregated over the files. This way
+    any worker can be scraped, and counters don't go back when a worker
+    is replaced, as the files of exited workers are kept (a worker which
+    gets the pid of an exited one continues from its metrics).
+    """
+
+    # the names of the metrics attributes, which are dicts of label values
+    # (a string or a tuple of strings) to metric values
+    METRICS = ('request_durations', 'request_storage_calls',
+               'storage_call_durations', 'admission_waits',
+               'admission_rejections', 'uploads')
+
+    def __init__(self, metrics_dir=None):
+        self._lock = threading.Lock()
+        self.metrics_dir = metrics_dir
+        self._pid = None
+        self._last_flush = 0
+        self.reset()
+
+    def configure(self, metrics_dir):
+        with self._lock:
+            self.metrics_dir = metrics_dir
+            self._pid = None
+
+    def _file_path(self, pid):
+        return os.path.join(self.metrics_dir,
+                            '{0}{1}.json'.format(METRICS_FILE_PREFIX, pid))
+
+    def _check_process(self):
+        """Make sure the in-memory metrics are this process's (rather than
+        the ones of the process it was forked from)
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        self._reset_metrics()
+        if self.metrics_dir:
+            state = self._read_file(self._file_path(pid))
+            if state:
+                self._set_state(state)
+
+    @staticmethod
+    def _read_file(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def _get_state(self):
+        return dict((name, [[list(k) if isinstance(k, tuple) else k,
+                             _encode_value(v)]
+                            for k, v in getattr(self, name).iteritems()])
+                    for name in self.METRICS)
+
+    def _set_state(self, state):
+        for name in self.METRICS:
+            metric = getattr(self, name)
+            for key, value in state.get(name, []):
+                key = tuple(key) if isinstance(key, list) else key
+                value = _decode_value(value)
+                if key in metric:
+                    value = _merge_values(metric[key], value)
+                metric[key] = value
+
+    def flush(self, force=False):
+        """Write this worker's metrics to its file in the metrics directory
+        """
+        with self._lock:
+            if not self.metrics_dir or (
+                    not force and
+                    time.time() - self._last_flush < FLUSH_INTERVAL):
+                return
+            self._check_process()
+            self._last_flush = time.time()
+            state = self._get_state()
+            path = self._file_path(self._pid)
+        try:
+            if not os.path.isdir(self.metrics_dir):
+                os.makedirs(self.metrics_dir)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        fd, temp_path = tempfile.mkstemp(dir=self.metrics_dir,
+                                         prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.rename(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def reset(self):
+        with self._lock:
+            self._pid = os.getpid()
+            self._reset_metrics()
+            if self.metrics_dir:
+                _remove_file(self._file_path(self._pid))
+
+    def _reset_metrics(self):
+        # (endpoint, method, status) -> Histogram
+        self.request_durations = {}
+        # (endpoint, method) -> [storage calls count, duration sum]
+        self.request_storage_calls = {}
+        # operation -> Histogram
+        self.storage_call_durations = {}
+        # concurrency limit name -> Histogram
+        self.admission_waits = {}
+        # concurrency limit name -> rejected requests count
+        self.admission_rejections = {}
+        # archive kind -> [Histogram, Histogram, received bytes count]
+        # of the upload durations and throughputs
+        self.uploads = {}
+
+    def observe_request(self, endpoint, method, status, duration,
+                        storage_calls, storage_duration):
+        with self._lock:
+            self._check_process()
+            key = (endpoint, method, str(status))
+            histogram = self.request_durations.get(key)
+            if histogram is None:
+                histogram = self.request_durations[key] = Histogram()
+            histogram.observe(duration)
+            totals = self.request_storage_calls.setdefault(
+                (endpoint, method), [0, 0.0])
+            totals[0] += storage_calls
+            totals[1] += storage_duration
+
+    def observe_storage_call(self, operation, duration):
+        with self._lock:
+            self._check_process()
+            histogram = self.storage_call_durations.get(operation)
+            if histogram is None:
+                histogram = self.storage_call_durations[operation] = \
+                    Histogram()
+            histogram.observe(duration)
+
+    def observe_admission(self, limit_name, wait, admitted):
+        with self._lock:
+            self._check_process()
+            histogram = self.admission_waits.get(limit_name)
+            if histogram is None:
+                histogram = self.admission_waits[limit_name] = Histogram()
+            histogram.observe(wait)
+            if not admitted:
+                self.admission_rejections[limit_name] = \
+                    self.admission_rejections.get(limit_name, 0) + 1
+
+    def observe_upload(self, kind, size, duration):
+        with self._lock:
+            self._check_process()
+            upload = self.uploads.get(kind)
+            if upload is None:
+                upload = self.uploads[kind] = [
+                    Histogram(buckets=UPLOAD_DURATION_BUCKETS),
+                    Histogram(buckets=UPLOAD_THROUGHPUT_BUCKETS),
+                    0]
+            upload[0].observe(duration)
+            if duration > 0:
+                upload[1].observe(size / duration)
+            upload[2] += size
+
+    def to_prometheus(self):
+        """Export the metrics in the prometheus text exposition format.
+
+        When there's a metrics directory, the exported metrics are the
+        aggregate of this worker's metrics and the ones written by the
+        other live workers. The files of workers which have exited (e.g.
+        recycled by gunicorn) are removed.
+        """
+        with self._lock:
+            self._check_process()
+            state = self._get_state()
+            own_file_name = os.path.basename(self._file_path(self._pid)) \
+                if self.metrics_dir else None
+        aggregate = MetricsRegistry()
+        aggregate._set_state(state)
+        if self.metrics_dir and os.path.isdir(self.metrics_dir):
+            for file_name in os.listdir(self.metrics_dir):
+                if file_name == own_file_name or \
+                        not file_name.startswith(METRICS_FILE_PREFIX):
+                    continue
+                file_path = os.path.join(self.metrics_dir, file_name)
+                if not _is_process_alive(_file_pid(file_name)):
+                    _remove_file(file_path)
+                    continue
+                other_state = self._read_file(file_path)
+                if other_state:
+                    aggregate._set_state(other_state)
+        return aggregate._export()
+
+    def _export(self):
+        lines = []
+        _histogram_lines(
+            lines,
+            'request_duration_seconds',
+            'REST requests latency, by endpoint, method and status',
+            ('endpoint', 'method', 'status'),
+            self.request_durations)
+        _counter_lines(
+            lines,
+            'request_storage_calls_total',
+            'Storage calls made while serving REST requests',
+            ('endpoint', 'method'),
+            dict((k, v[0]) for k, v in
+                 self.request_storage_calls.iteritems()))
+        _counter_lines(
+            lines,
+            'request_storage_duration_seconds_total',
+            'Time spent in storage calls while serving REST requests',
+            ('endpoint', 'method'),
+            dict((k, v[1]) for k, v in
+                 self.request_storage_calls.iteritems()))
+        _histogram_lines(
+            lines,
+            'storage_call_duration_seconds',
+            'Storage calls latency, by storage manager operation',
+            ('operation',),
+            dict(((k,), v) for k, v in
+                 self.storage_call_durations.iteritems()))
+        _histogram_lines(
+            lines,
+            'admission_wait_seconds',
+            'Time requests waited for a concurrency limit slot',
+            ('limit',),
+            dict(((k,), v) for k, v in
+                 self.admission_waits.iteritems()))
+        _counter_lines(
+            lines,
+            'admission_rejections_total',
+            'Requests rejected because of a concurrency limit',
+            ('limit',),
+            dict(((k,), v) for k, v in
+                 self.admission_rejections.iteritems()))
+        _histogram_lines(
+            lines,
+            'upload_duration_seconds',
+            'Time it took to receive uploaded archives, by kind',
+            ('kind',),
+            dict(((k,), v[0]) for k, v in self.uploads.iteritems()))
+        _histogram_lines(
+            lines,
+            'upload_throughput_bytes_per_second',
+            'Throughput of archive uploads, by kind',
+            ('kind',),
+            dict(((k,), v[1]) for k, v in self.uploads.iteritems()))
+        _counter_lines(
+            lines,
+            'upload_bytes_total',
+            'Bytes received in archive uploads, by kind',
+            ('kind',),
+            dict(((k,), v[2]) for k, v in self.uploads.iteritems()))
+        return '\n'.join(lines) + '\n'
+
+
+def _file_pid(file_name):
+    try:
+        return int(os.path.splitext(file_name)[0][len(METRICS_FILE_PREFIX):])
+    except ValueError:
+        return None
+
+
+def _is_process_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError, e:
+        # EPERM: the process exists, but belongs to another user
+        return e.errno == errno.EPERM
+    return True
+
+
+def _remove_file(file_path):
+    try:
+        os.remove(file_path)
+    except OSError, e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+def _escape_label_value(value):
+    return unicode(value).replace('\\', r'\\').replace(
+        '\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(label_names, label_values, extra=()):
+    labels = zip(label_names, label_values) + list(extra)
+    return '{{{0}}}'.format(','.join(
+        '{0}="{1}"'.format(name, _escape_label_value(value))
+        for name, value in labels))
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+def _histogram_lines(lines, name, help_text, label_names, histograms):
+    name = '{0}_{1}'.format(METRIC_PREFIX, name)
+    lines.append('# HELP {0} {1}'.format(name, help_text))
+    lines.append('# TYPE {0} histogram'.format(name))
+    for label_values, histogram in sorted(histograms.iteritems()):
+        cumulative = 0
+        bounds = [repr(b) for b in histogram.buckets] + ['+Inf']
+        for bound, count in zip(bounds, histogram.counts):
+            cumulative += count
+            lines.append('{0}_bucket{1} {2}'.format(
+                name,
+                _format_labels(label_names, label_values, [('le', bound)]),
+                cumulative))
+        labels = _format_labels(label_names, label_values)
+        lines.append('{0}_sum{1} {2}'.format(
+            name, labels, _format_value(histogram.sum)))
+        lines.append('{0}_count{1} {2}'.format(
+            name, labels, histogram.count))
+
+
+def _counter_lines(lines, name, help_text, label_names, values):
+    name = '{0}_{1}'.format(METRIC_PREFIX, name)
+    lines.append('# HELP {0} {1}'.format(name, help_text))
+    lines.append('# TYPE {0} counter'.format(name))
+    for label_values, value in sorted(values.iteritems()):
+        lines.append('{0}{1} {2}'.format(
+            name,
+            _format_labels(label_names, label_values),
+            _format_value(value)))
+
+
+registry = MetricsRegistry()
+
+
+def start_request_timer():
+    g.metrics_request_start = time.time()
+    g.metrics_storage_calls = 0
+    g.metrics_storage_duration = 0.0
+
+
+def _record_request(status):
+    start = getattr(g, 'metrics_request_start', None)
+    if start is None:
+        return
+    # make sure a request is recorded only once
+    g.metrics_request_start = None
+    registry.observe_request(
+        endpoint=request.endpoint or 'unknown',
+        method=request.method,
+        status=status,
+        duration=time.time() - start,
+        storage_calls=g.metrics_storage_calls,
+        storage_duration=g.metrics_storage_duration)
+
+
+def record_response(response):
+    """after_request hook recording the request's latency.
+
+    Note that for streamed responses this doesn't include the time it
+    takes to send the response body.
+    """
+    _record_request(response.status_code)
+    registry.flush()
+    return response
+
+
+def record_failed_request(exception):
+    """teardown_request hook recording requests which failed with an
+    unhandled exception (for which after_request hooks aren't called)
+    """
+    if exception is not None:
+        _record_request(500)
+        registry.flush()
+
+
+def get_metrics_dir():
+    return config.instance().metrics_dir or os.path.join(
+        tempfile.gettempdir(), 'cloudify-rest-metrics')
+
+
+def init_app(app):
+    registry.configure(get_metrics_dir())
+    app.before_request(start_request_timer)
+    app.after_request(record_response)
+    app.teardown_request(record_failed_request)
+
+
+class InstrumentedStorageManager(object):
+    """Storage manager proxy timing every public storage manager call"""
+
+    def __init__(self, storage_manager):
+        self._storage_manager = storage_manager
+
+    def __getattr__(self, name):
+        attr = getattr(self._storage_manager, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                _record_storage_call(name, time.time() - start)
+        return timed
+
+
+def _record_storage_call(operation, duration):
+    registry.observe_storage_call(operation, duration)
+    if has_request_context() and \
+            getattr(g, 'metrics_request_start', None) is not None:
+        g.metrics_storage_calls += 1
+        g.metrics_storage_duration += duration
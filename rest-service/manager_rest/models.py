@@ -15,9 +15,15 @@
 
 import json
 
+from manager_rest import compression
+
 
 class SerializableObject(object):
 
+    # fields which change whenever the object does. they're used (with the
+    # object's id) for cheaply deriving the ETags of lists of objects
+    version_fields = None
+
     def to_dict(self):
         # attr_and_values = ((attr, getattr(self, attr)) for attr in dir(self)
         #                    if not attr.startswith("__"))
@@ -31,18 +37,64 @@ class SerializableObject(object):
 
 class BlueprintState(SerializableObject):
 
+    UPLOADING = 'uploading'
+    PARSING = 'parsing'
+    UPLOADED = 'uploaded'
+    FAILED = 'failed'
+
+    IN_PROGRESS_STATES = [UPLOADING, PARSING]
+
+    # plan values which are kept alongside the compressed plan in storage,
+    # as they're used without the rest of the plan
+    PLAN_SUMMARY_KEYS = [
+        'workflow_plugins_to_install', 'deployment_plugins_to_install'
+    ]
+
     fields = {
         'plan', 'id', 'description', 'created_at', 'updated_at',
-        'main_file_name'
+        'main_file_name', 'status', 'error'
     }
+    version_fields = ('updated_at',)
 
     def __init__(self, **kwargs):
         self.plan = kwargs['plan']
+        # a plan loaded from storage may be compressed, in which case it's
+        # only decompressed when it's used
+        self._compressed_plan = kwargs.get('compressed_plan')
+        self._plan_summary = kwargs.get('plan_summary')
         self.id = kwargs['id']
         self.description = kwargs['description']
         self.created_at = kwargs['created_at']
         self.updated_at = kwargs['updated_at']
         self.main_file_name = kwargs['main_file_name']
+        # blueprints stored before uploads could be asynchronous have no
+        # status, and are uploaded
+        self.status = kwargs.get('status') or self.UPLOADED
+        self.error = kwargs.get('error')
+
+    @property
+    def plan(self):
+        if self._compressed_plan is not None:
+            self._plan = compression.decompress_json(self._compressed_plan)
+            self._compressed_plan = None
+        return self._plan
+
+    @plan.setter
+    def plan(self, value):
+        self._plan = value
+        self._compressed_plan = None
+
+    def get_plan_value(self, key):
+        """Get a value of the plan, without decompressing the plan if the
+        value is kept in its summary
+        """
+        if self._plan_summary is not None and key in self._plan_summary:
+            return self._plan_summary[key]
+        return self.plan[key]
+
+    @classmethod
+    def get_plan_summary(cls, plan):
+        return {key: plan.get(key) for key in cls.PLAN_SUMMARY_KEYS}
 
 
 class Snapshot(SerializableObject):
@@ -55,6 +107,7 @@ class Snapshot(SerializableObject):
     END_STATES = [CREATED, FAILED, UPLOADED]
 
     fields = {'id', 'created_at', 'status', 'error'}
+    version_fields = ('status',)
 
     def __init__(self, **kwargs):
         self.id = kwargs['id']
@@ -67,7 +120,9 @@ class Deployment(SerializableObject):
 
     fields = {'id', 'created_at', 'updated_at', 'blueprint_id',
               'workflows', 'permalink', 'inputs', 'policy_types',
-              'policy_triggers', 'groups', 'outputs'}
+              'policy_triggers', 'groups', 'outputs',
+              'workflow_plugins_to_install', 'deployment_plugins_to_install'}
+    version_fields = ('updated_at',)
 
     def __init__(self, **kwargs):
         self.id = kwargs['id']
@@ -80,6 +135,13 @@ class Deployment(SerializableObject):
         self.policy_triggers = kwargs['policy_triggers']
         self.groups = kwargs['groups']
         self.outputs = kwargs['outputs']
+        # copied from the blueprint's plan, so that executing workflows and
+        # deleting the deployment don't require the blueprint. None for
+        # deployments created before they were stored
+        self.workflow_plugins_to_install = kwargs.get(
+            'workflow_plugins_to_install')
+        self.deployment_plugins_to_install = kwargs.get(
+            'deployment_plugins_to_install')
         self.permalink = None  # TODO: implement
 
 
@@ -93,6 +155,7 @@ class DeploymentModification(SerializableObject):
 
     fields = {'id', 'deployment_id', 'modified_nodes', 'node_instances',
               'status', 'created_at', 'ended_at', 'context'}
+    version_fields = ('status',)
 
     def __init__(self, **kwargs):
         self.id = kwargs['id']
@@ -122,6 +185,7 @@ class Execution(SerializableObject):
 
     fields = {'id', 'status', 'deployment_id', 'workflow_id', 'blueprint_id',
               'created_at', 'error', 'parameters', 'is_system_workflow'}
+    version_fields = ('status',)
 
     def __init__(self, **kwargs):
         self.id = kwargs['id']
@@ -146,6 +210,8 @@ class DeploymentNode(SerializableObject):
         'deploy_number_of_instances', 'host_id', 'properties',
         'operations', 'plugins', 'relationships', 'plugins_to_install'
     }
+    version_fields = ('number_of_instances', 'planned_number_of_instances',
+                      'deploy_number_of_instances')
 
     def __init__(self, **kwargs):
         self.id = kwargs['id']
@@ -174,6 +240,7 @@ class DeploymentNodeInstance(SerializableObject):
         'id', 'deployment_id', 'runtime_properties', 'state', 'version',
         'relationships', 'node_id', 'host_id'
     }
+    version_fields = ('version',)
 
     def __init__(self, **kwargs):
         self.id = kwargs['id']
@@ -203,6 +270,7 @@ class Plugin(SerializableObject):
               'package_version', 'supported_platform', 'distribution',
               'distribution_version', 'distribution_release', 'wheels',
               'excluded_wheels', 'supported_py_versions', 'uploaded_at'}
+    version_fields = ('uploaded_at',)
 
     def __init__(self, **kwargs):
         self.id = kwargs['id']
@@ -0,0 +1,217 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""On disk cache of DSL parse results.
+
+A parsed plan is cached under a key made of the content hash of the main
+blueprint file, its name, the resources base url, the parser context and
+the dsl parser's version. Along with the plan, the cache entry records the
+content hashes of every import fetched while parsing it; a cached plan is
+only used if all of its imports still have the same content.
+
+Imports located under the blueprint's application directory are recorded
+relative to it, as every upload is extracted into a new, uniquely named,
+directory.
+
+The cache directory is shared by the rest service's worker processes, and
+is kept under its maximal size by evicting the least recently used
+entries. Its entries are trusted, so it must only be accessible by the
+rest service's user: the cache is disabled if it's owned by another user.
+Entries are stored as JSON.
+"""
+
+import os
+import json
+import errno
+import hashlib
+import logging
+import tempfile
+
+import pkg_resources
+
+from manager_rest import config
+from manager_rest import utils
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENTRY_SUFFIX = '.plan'
+APPLICATION_DIR_PLACEHOLDER = '{application_dir}/'
+
+_parser_version = None
+
+
+def _digest(content):
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def _get_parser_version():
+    global _parser_version
+    if _parser_version is None:
+        try:
+            _parser_version = pkg_resources.get_distribution(
+                'cloudify-dsl-parser').version
+        except pkg_resources.DistributionNotFound:
+            _parser_version = 'unknown'
+    return _parser_version
+
+
+def get_cache_key(main_file_content, application_file_name,
+                  resources_base, raw_parser_context):
+    return _digest(json.dumps({
+        'main_file': _digest(main_file_content),
+        'application_file_name': application_file_name,
+        'resources_base': resources_base,
+        'parser_context': raw_parser_context,
+        'parser_version': _get_parser_version()
+    }, sort_keys=True))
+
+
+class RecordingImportResolver(object):
+    """Import resolver proxy recording the content hashes of the fetched
+    imports
+    """
+
+    def __init__(self, resolver):
+        self._resolver = resolver
+        self.imports = []
+
+    def fetch_import(self, import_url):
+        content = self._resolver.fetch_import(import_url)
+        self.imports.append((import_url, _digest(content)))
+        return content
+
+    def __getattr__(self, name):
+        return getattr(self._resolver, name)
+
+
+class ParseCache(object):
+
+    def __init__(self, cache_dir, max_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_ENTRY_SUFFIX)
+
+    def get(self, key, resolver, application_dir_url):
+        """Return the cached plan, or None if there's no cached plan or
+        any of its imports has changed.
+
+        :param key: the cache key (see get_cache_key)
+        :param resolver: the import resolver used to fetch the imports
+        :param application_dir_url: the url of the uploaded blueprint's
+                                    application directory
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path) as f:
+                entry = json.load(f)
+        except IOError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        except ValueError:
+            return None
+
+        for import_ref, digest in entry['imports']:
+            import_url = import_ref.replace(APPLICATION_DIR_PLACEHOLDER,
+                                            application_dir_url, 1)
+            try:
+                if _digest(resolver.fetch_import(import_url)) != digest:
+                    return None
+            except Exception:
+                # parsing the blueprint will report the failed import
+                return None
+        try:
+            # the modification time marks the entry's last use
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+        return entry['plan']
+
+    def put(self, key, plan, imports, application_dir_url):
+        """Store a parsed plan, along with the (import url, content hash)
+        pairs of the imports fetched while parsing it.
+        """
+        utils.create_private_dir(self.cache_dir)
+        imports = [
+            (APPLICATION_DIR_PLACEHOLDER + import_url[
+                len(application_dir_url):]
+             if import_url.startswith(application_dir_url) else import_url,
+             digest)
+            for import_url, digest in imports]
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'plan': plan, 'imports': imports}, f)
+            # other workers never see a partially written entry
+            os.rename(temp_path, self._entry_path(key))
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_ENTRY_SUFFIX):
+                continue
+            entry_path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry_path))
+            total_size += st.st_size
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.max_size:
+                return
+            try:
+                os.remove(entry_path)
+            except OSError:
+                # already evicted by another worker
+                pass
+            total_size -= size
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(CACHE_ENTRY_SUFFIX):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+
+def get_cache_dir():
+    return config.instance().dsl_parse_cache_dir or os.path.join(
+        tempfile.gettempdir(),
+        'cloudify-rest-parse-cache-{0}'.format(os.getuid()))
+
+
+def get_parse_cache():
+    """Return the configured parse cache, or None if it's disabled (or its
+    directory can't be trusted)
+    """
+    max_size = config.instance().dsl_parse_cache_max_size
+    if not max_size:
+        return None
+    cache_dir = get_cache_dir()
+    try:
+        utils.create_private_dir(cache_dir)
+    except (OSError, utils.UnsafeDirectoryError), e:
+        logger.warning('Not caching parse results: {0}'.format(e))
+        return None
+    return ParseCache(cache_dir, max_size)
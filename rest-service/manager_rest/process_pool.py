@@ -0,0 +1,272 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""A bounded pool of worker processes, for running CPU heavy work (DSL
+parsing, deployment plan preparation) outside of the request's process.
+
+Every task runs with a timeout, and in a process with a limited address
+space: a worker exceeding either is killed (or dropped) and replaced by a
+new one, and the task fails with a TaskLimitExceededError.
+
+Every rest service worker process has its own pool, which is started when
+work is first submitted to it, and is replaced (with the new settings) when
+the configuration is reset.
+"""
+
+import os
+import signal
+import cPickle
+import logging
+import resource
+import threading
+import multiprocessing
+
+from manager_rest import config
+
+logger = logging.getLogger(__name__)
+
+# how often an idle worker checks that its parent is still alive
+PARENT_CHECK_INTERVAL = 5
+
+_RESULT = 'result'
+_ERROR = 'error'
+
+
+class TaskLimitExceededError(Exception):
+    pass
+
+
+class TaskTimeoutError(TaskLimitExceededError):
+    pass
+
+
+class TaskMemoryLimitError(TaskLimitExceededError):
+    pass
+
+
+class UnpicklableTaskError(Exception):
+    pass
+
+
+def _dump_exception(ex):
+    # exceptions are sent without calling their __init__ on the other side,
+    # as exceptions with custom __init__ arguments (such as the dsl parser's)
+    # can't be unpickled otherwise
+    return type(ex), ex.args, ex.__dict__
+
+
+def _load_exception(dumped_exception):
+    exc_type, args, attributes = dumped_exception
+    ex = exc_type.__new__(exc_type)
+    ex.args = args
+    ex.__dict__.update(attributes)
+    return ex
+
+
+def _worker_main(conn, parent_conn, memory_limit):
+    parent_conn.close()
+    # don't run the handlers inherited from the server process
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGQUIT,
+                   signal.SIGHUP, signal.SIGUSR1, signal.SIGUSR2):
+        signal.signal(signum, signal.SIG_DFL)
+    if memory_limit:
+        _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard_limit))
+    parent_pid = os.getppid()
+
+    while True:
+        while not conn.poll(PARENT_CHECK_INTERVAL):
+            if os.getppid() != parent_pid:
+                return
+        try:
+            func, args, kwargs = cPickle.loads(conn.recv_bytes())
+        except EOFError:
+            return
+        try:
+            message = (_RESULT, func(*args, **kwargs))
+        except Exception, ex:
+            message = (_ERROR, _dump_exception(ex))
+        try:
+            data = cPickle.dumps(message, cPickle.HIGHEST_PROTOCOL)
+        except Exception, ex:
+            # e.g. a result or an exception that can't be pickled
+            data = cPickle.dumps((_ERROR, _dump_exception(RuntimeError(
+                'Failed sending the result of {0}: {1}'.format(
+                    func.__name__, ex)))), cPickle.HIGHEST_PROTOCOL)
+        conn.send_bytes(data)
+
+
+class _Worker(object):
+
+    def __init__(self, memory_limit):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main,
+            args=(child_conn, self.conn, memory_limit))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+
+    def stop(self):
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+
+
+class ProcessPool(object):
+
+    def __init__(self, size, timeout=None, memory_limit=None):
+        """
+        :param size: the maximal number of worker processes
+        :param timeout: the timeout (in seconds) of every task
+        :param memory_limit: the address space limit (in bytes) of every
+                             worker process
+        """
+        self.size = size
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._idle_workers = []
+        self._stopped = False
+
+    def apply(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) in a worker process and return its
+        result, or raise the exception it raised.
+
+        func and its arguments must be picklable (as module level functions
+        are), otherwise an UnpicklableTaskError is raised.
+        """
+        try:
+            task = cPickle.dumps((func, args, kwargs),
+                                 cPickle.HIGHEST_PROTOCOL)
+        except Exception, ex:
+            raise UnpicklableTaskError(
+                "Can't send {0} to a worker process: {1}".format(
+                    func.__name__, ex))
+
+        with self._slots:
+            worker = self._get_idle_worker() or _Worker(self.memory_limit)
+            try:
+                status, value = self._run(worker, func, task)
+            except Exception:
+                worker.stop()
+                raise
+            if status == _ERROR and issubclass(value[0], MemoryError):
+                # a worker which ran out of memory might be left in a bad
+                # state, so it's replaced
+                worker.stop()
+                raise TaskMemoryLimitError(
+                    '{0} exceeded the memory limit of {1} bytes'.format(
+                        func.__name__, self.memory_limit))
+            self._return_worker(worker)
+
+        if status == _RESULT:
+            return value
+        raise _load_exception(value)
+
+    def _run(self, worker, func, task):
+        worker.conn.send_bytes(task)
+        if not worker.conn.poll(self.timeout):
+            raise TaskTimeoutError(
+                '{0} did not finish within {1} seconds'.format(
+                    func.__name__, self.timeout))
+        try:
+            return cPickle.loads(worker.conn.recv_bytes())
+        except EOFError:
+            # most likely killed by the kernel's out of memory killer
+            worker.process.join()
+            raise TaskLimitExceededError(
+                'The worker process running {0} exited unexpectedly '
+                '(exit code: {1})'.format(func.__name__,
+                                          worker.process.exitcode))
+
+    def stop(self):
+        """Stop the idle workers. The workers running tasks are stopped
+        once their tasks are done.
+        """
+        with self._lock:
+            self._stopped = True
+            workers, self._idle_workers = self._idle_workers, []
+        for worker in workers:
+            worker.stop()
+
+    def _get_idle_worker(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # the workers belong to the process this one was forked from
+                self._pid = os.getpid()
+                self._idle_workers = []
+            while self._idle_workers:
+                worker = self._idle_workers.pop()
+                if worker.process.is_alive():
+                    return worker
+                worker.stop()
+        return None
+
+    def _return_worker(self, worker):
+        with self._lock:
+            if not self._stopped:
+                self._idle_workers.append(worker)
+                return
+        worker.stop()
+
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    """Return the process pool, or None if DSL processing should be done in
+    the request's process
+    """
+    global _process_pool
+    cfy_config = config.instance()
+    if not cfy_config.parser_processes:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPool(
+                cfy_config.parser_processes,
+                timeout=cfy_config.parser_process_timeout,
+                memory_limit=cfy_config.parser_process_memory_limit)
+        return _process_pool
+
+
+def reset():
+    """Stop the process pool, so that a new one is created with the current
+    configuration
+    """
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.stop()
+
+
+def apply(func, *args, **kwargs):
+    """Run func in the process pool, or in this process if there's no pool
+    (or if func's arguments can't be sent to it, e.g. a custom import
+    resolver which can't be pickled)
+    """
+    pool = get_process_pool()
+    if pool is not None:
+        try:
+            return pool.apply(func, *args, **kwargs)
+        except UnpicklableTaskError, ex:
+            logger.debug('{0}; running it in this process'.format(ex))
+    return func(*args, **kwargs)
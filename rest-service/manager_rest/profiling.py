@@ -0,0 +1,253 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import json
+import hmac
+import uuid
+import errno
+import pstats
+import random
+import hashlib
+import logging
+import StringIO
+import tempfile
+import time
+import cProfile
+from datetime import datetime
+
+from flask import g, request
+
+from manager_rest import config, utils
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Cloudify-Profile-Token'
+# number of functions included in each profile's stats
+STATS_LINES = 40
+
+
+class RequestProfile(object):
+
+    def __init__(self, endpoint, method, path, duration, stats,
+                 created_at=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.duration = duration
+        self.stats = stats
+        self.created_at = created_at or str(datetime.now())
+
+    def to_dict(self):
+        return {'endpoint': self.endpoint,
+                'method': self.method,
+                'path': self.path,
+                'duration': self.duration,
+                'stats': self.stats,
+                'created_at': self.created_at}
+
+    @classmethod
+    def from_dict(cls, profile_dict):
+        return cls(**profile_dict)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError, e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+class ProfileStore(object):
+    """Keeps the slowest profiled requests of each endpoint.
+
+    The profiles are kept in a directory shared by the rest service's
+    worker processes, so that any of them can list the profiles recorded
+    by all of them. Each endpoint's profiles are files in a directory of
+    their own, named after their duration, so that the slowest ones are
+    found without reading them.
+    """
+
+    def __init__(self, profiles_dir=None):
+        self.profiles_dir = profiles_dir
+
+    def configure(self, profiles_dir):
+        self.profiles_dir = profiles_dir
+
+    def _endpoint_dir(self, endpoint):
+        return os.path.join(self.profiles_dir,
+                            hashlib.sha1(endpoint.encode('utf-8')).hexdigest())
+
+    def _endpoint_dirs(self, endpoint=None):
+        if endpoint is not None:
+            return [self._endpoint_dir(endpoint)]
+        return [os.path.join(self.profiles_dir, name)
+                for name in self._list_dir(self.profiles_dir)]
+
+    @staticmethod
+    def _list_dir(dir_path):
+        try:
+            return [name for name in os.listdir(dir_path)
+                    if not name.startswith('.tmp-')]
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            return []
+
+    def _profile_files(self, endpoint):
+        """The endpoint's profile files, slowest first"""
+        return sorted(self._list_dir(self._endpoint_dir(endpoint)),
+                      reverse=True)
+
+    @staticmethod
+    def _duration(file_name):
+        return float(file_name.split('-', 1)[0])
+
+    def is_kept(self, endpoint, duration, top_n):
+        file_names = self._profile_files(endpoint)
+        return len(file_names) < top_n or \
+            duration > self._duration(file_names[top_n - 1])
+
+    def add(self, profile, top_n):
+        utils.create_private_dir(self.profiles_dir)
+        endpoint_dir = self._endpoint_dir(profile.endpoint)
+        utils.mkdirs(endpoint_dir)
+        # written to a temporary file first, so that workers listing the
+        # profiles don't read partially written ones
+        fd, temp_path = tempfile.mkstemp(dir=self.profiles_dir,
+                                         prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(profile.to_dict(), f)
+            os.rename(temp_path, os.path.join(
+                endpoint_dir, '{0:020.6f}-{1}.json'.format(
+                    profile.duration, uuid.uuid4().hex)))
+        except Exception:
+            os.remove(temp_path)
+            raise
+        for file_name in self._profile_files(profile.endpoint)[top_n:]:
+            _remove_file(os.path.join(endpoint_dir, file_name))
+
+    def list(self, endpoint=None):
+        profiles = []
+        for endpoint_dir in self._endpoint_dirs(endpoint):
+            for file_name in self._list_dir(endpoint_dir):
+                try:
+                    with open(os.path.join(endpoint_dir, file_name)) as f:
+                        profiles.append(RequestProfile.from_dict(
+                            json.load(f)))
+                except (IOError, ValueError):
+                    # removed by another worker since listed
+                    continue
+        return sorted(profiles, key=lambda p: p.duration, reverse=True)
+
+    def clear(self, endpoint=None):
+        for endpoint_dir in self._endpoint_dirs(endpoint):
+            for file_name in self._list_dir(endpoint_dir):
+                _remove_file(os.path.join(endpoint_dir, file_name))
+
+
+store = ProfileStore()
+
+
+def get_profiles_dir():
+    return config.instance().profiles_dir or os.path.join(
+        tempfile.gettempdir(),
+        'cloudify-rest-profiles-{0}'.format(os.getuid()))
+
+
+def is_enabled():
+    cfy_config = config.instance()
+    return cfy_config.profiling_sample_rate > 0 or \
+        bool(cfy_config.profiling_token)
+
+
+def _is_valid_token(token, expected_token):
+    # compared in constant time, so that the token can't be guessed by
+    # timing requests
+    return hmac.compare_digest(unicode(token).encode('utf-8'),
+                               unicode(expected_token).encode('utf-8'))
+
+
+def _is_profiled():
+    cfy_config = config.instance()
+    if cfy_config.profiling_token:
+        token = request.headers.get(PROFILE_HEADER)
+        if token:
+            return _is_valid_token(token, cfy_config.profiling_token)
+    sample_rate = cfy_config.profiling_sample_rate
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def start_profiling():
+    # the configuration is read on every request, rather than when the
+    # hooks are registered, so that they follow the configuration the
+    # service is reset with (it isn't reloaded from the configuration file
+    # at runtime though, so changing it requires a restart)
+    if not is_enabled() or not _is_profiled():
+        return
+    g.profiler = cProfile.Profile()
+    g.profiler_start = time.time()
+    g.profiler.enable()
+
+
+def _stop_profiling():
+    profiler = getattr(g, 'profiler', None)
+    if profiler is None:
+        return
+    profiler.disable()
+    g.profiler = None
+    duration = time.time() - g.profiler_start
+
+    endpoint = request.endpoint or 'unknown'
+    top_n = config.instance().profiling_top_n
+    # rendering the stats is only worth it for profiles which are kept
+    if not store.is_kept(endpoint, duration, top_n):
+        return
+    stats_stream = StringIO.StringIO()
+    stats = pstats.Stats(profiler, stream=stats_stream)
+    stats.sort_stats('cumulative').print_stats(STATS_LINES)
+    try:
+        store.add(RequestProfile(endpoint=endpoint,
+                                 method=request.method,
+                                 path=request.full_path,
+                                 duration=duration,
+                                 stats=stats_stream.getvalue()),
+                  top_n)
+    except (OSError, IOError, utils.UnsafeDirectoryError) as e:
+        logger.warning('Not keeping the profile of {0}: {1}'
+                       .format(request.full_path, e))
+
+
+def stop_profiling(response):
+    _stop_profiling()
+    return response
+
+
+def stop_profiling_on_error(exception):
+    # after_request hooks aren't called for unhandled exceptions
+    if exception is not None:
+        _stop_profiling()
+
+
+def init_app(app):
+    """Register the profiling request hooks. They're registered whether
+    or not profiling is enabled, and do nothing while it's disabled
+    """
+    store.configure(get_profiles_dir())
+    app.before_request(start_profiling)
+    app.after_request(stop_profiling)
+    app.teardown_request(stop_profiling_on_error)
@@ -0,0 +1,196 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+"""Guard rails for client supplied Elasticsearch queries.
+
+Query bodies sent to the raw query endpoints (/search and the v1 /events)
+are validated and rewritten before being run:
+ - the number of returned hits is capped, and paging deeper than the
+   maximal result window is rejected;
+ - a server side timeout and a per shard terminate_after are set (or
+   lowered, if the client asked for more);
+ - expensive constructs are rejected: scripts, leading wildcards,
+   too many aggregations and unbounded aggregation sizes.
+
+The applied limits are reported back in the query_limits field of the
+response.
+"""
+
+import re
+
+from manager_rest import config
+from manager_rest import manager_exceptions
+
+DEFAULT_LIMITS = {
+    # maximal number of hits returned by a query
+    'max_size': 10000,
+    # maximal from + size of a query
+    'max_result_window': 50000,
+    'timeout_ms': 30000,
+    # maximal number of documents collected per shard
+    'terminate_after': 1000000,
+    'max_aggregations': 20,
+    # maximal size (number of buckets) of a single aggregation
+    'max_aggregation_size': 1000,
+    'allow_leading_wildcards': False,
+    'forbidden_clauses': ['script', 'script_fields', 'script_score'],
+}
+
+AGGREGATION_KEYS = ('aggs', 'aggregations', 'facets')
+AGGREGATION_SIZE_KEYS = ('size', 'shard_size')
+# a wildcard at the beginning of a query_string term
+LEADING_WILDCARD_REGEX = re.compile(r'(?:^|[\s(\[:])[*?]')
+TIME_UNITS_MS = {'ms': 1, 's': 1000, 'm': 60 * 1000, 'h': 60 * 60 * 1000}
+TIME_VALUE_REGEX = re.compile(r'^(\d+)(ms|s|m|h)?$')
+
+
+def get_limits():
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(config.instance().search_query_limits or {})
+    return limits
+
+
+def _reject(message):
+    raise manager_exceptions.QueryNotAllowedError(
+        'Query not allowed: {0}'.format(message))
+
+
+def _to_int(body, key):
+    try:
+        return int(body[key])
+    except (TypeError, ValueError):
+        _reject('{0} must be an integer'.format(key))
+
+
+def _parse_timeout_ms(timeout):
+    match = TIME_VALUE_REGEX.match(str(timeout).strip())
+    if not match:
+        _reject('unsupported timeout value: {0}'.format(timeout))
+    value, unit = match.groups()
+    return int(value) * TIME_UNITS_MS[unit or 'ms']
+
+
+def _check_wildcard(clause, allow_leading_wildcards):
+    if allow_leading_wildcards:
+        return
+    for field, value in clause.iteritems():
+        if isinstance(value, dict):
+            value = value.get('value', value.get('wildcard'))
+        if isinstance(value, basestring) and value[:1] in ('*', '?'):
+            _reject('leading wildcard in wildcard query on {0}'
+                    .format(field))
+
+
+def _check_query_string(clause, allow_leading_wildcards):
+    if allow_leading_wildcards:
+        return
+    query = clause.get('query')
+    if isinstance(query, basestring) and \
+            LEADING_WILDCARD_REGEX.search(query):
+        _reject('leading wildcard in query_string query')
+
+
+def _check_regexp(clause):
+    for field, value in clause.iteritems():
+        if isinstance(value, dict):
+            value = value.get('value')
+        if isinstance(value, basestring) and value.startswith('.*'):
+            _reject('leading .* in regexp query on {0}'.format(field))
+
+
+def _check_aggregations(aggregations, limits, counter):
+    if not isinstance(aggregations, dict):
+        _reject('aggregations must be an object')
+    for name, aggregation in aggregations.iteritems():
+        counter[0] += 1
+        if counter[0] > limits['max_aggregations']:
+            _reject('more than {0} aggregations'
+                    .format(limits['max_aggregations']))
+        if not isinstance(aggregation, dict):
+            continue
+        for definition in aggregation.itervalues():
+            if not isinstance(definition, dict):
+                continue
+            for size_key in AGGREGATION_SIZE_KEYS:
+                if size_key not in definition:
+                    continue
+                size = _to_int(definition, size_key)
+                # a size of 0 means an unbounded number of buckets
+                if size == 0 or size > limits['max_aggregation_size']:
+                    _reject('{0} of aggregation {1} must be between 1 and '
+                            '{2}'.format(size_key, name,
+                                         limits['max_aggregation_size']))
+
+
+def _check_clauses(element, limits, counter):
+    if isinstance(element, list):
+        for item in element:
+            _check_clauses(item, limits, counter)
+        return
+    if not isinstance(element, dict):
+        return
+    for key, value in element.iteritems():
+        if key in limits['forbidden_clauses']:
+            _reject('{0} is not allowed'.format(key))
+        if key in AGGREGATION_KEYS:
+            _check_aggregations(value, limits, counter)
+        elif isinstance(value, dict):
+            if key == 'wildcard':
+                _check_wildcard(value, limits['allow_leading_wildcards'])
+            elif key == 'query_string':
+                _check_query_string(value,
+                                    limits['allow_leading_wildcards'])
+            elif key == 'regexp':
+                _check_regexp(value)
+        _check_clauses(value, limits, counter)
+
+
+def apply_limits(body, limits=None):
+    """Validate a client supplied query body, and rewrite it according to
+    the query limits.
+
+    :param body: the query body (a dict), which is modified in place
+    :param limits: the limits to apply (defaults to the configured ones)
+    :return: a dict of the limits applied to the query
+    :raises QueryNotAllowedError: if the query violates the limits
+    """
+    limits = limits or get_limits()
+    if not isinstance(body, dict):
+        _reject('the query body must be an object')
+
+    _check_clauses(body, limits, counter=[0])
+
+    if 'size' in body:
+        body['size'] = min(_to_int(body, 'size'), limits['max_size'])
+    offset = _to_int(body, 'from') if 'from' in body else 0
+    if offset + body.get('size', 0) > limits['max_result_window']:
+        _reject('from + size must not exceed {0}'
+                .format(limits['max_result_window']))
+
+    timeout_ms = limits['timeout_ms']
+    if 'timeout' in body:
+        timeout_ms = min(_parse_timeout_ms(body['timeout']), timeout_ms)
+    body['timeout'] = '{0}ms'.format(timeout_ms)
+
+    terminate_after = limits['terminate_after']
+    if 'terminate_after' in body:
+        terminate_after = min(_to_int(body, 'terminate_after'),
+                              terminate_after)
+    body['terminate_after'] = terminate_after
+
+    return {'max_size': limits['max_size'],
+            'max_result_window': limits['max_result_window'],
+            'timeout': body['timeout'],
+            'terminate_after': terminate_after}
@@ -70,3 +70,12 @@ class EvaluateFunctionsRequest(object):
         'context': fields.Raw,
         'payload': fields.Raw
     }
+
+
+@swagger.model
+class BatchRequest(object):
+
+    resource_fields = {
+        'requests': fields.Raw,
+        'stop_on_error': fields.Boolean
+    }
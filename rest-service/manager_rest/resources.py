@@ -15,7 +15,6 @@
 #
 
 import os
-import zipfile
 import urllib
 import tempfile
 import shutil
@@ -25,6 +24,7 @@ from functools import wraps
 from os import path
 
 from setuptools import archive_util
+from werkzeug.wrappers import BaseResponse
 
 from flask import (
     request,
@@ -36,16 +36,21 @@ from flask_restful_swagger import swagger
 from flask.ext.restful.utils import unpack
 from flask_securest.rest_security import SECURED_MODE, SecuredResource
 
-from dsl_parser import utils as dsl_parser_utils
-
 from manager_rest import config
 from manager_rest import models
 from manager_rest import responses
 from manager_rest import requests_schema
 from manager_rest import archiving
+from manager_rest import background
+from manager_rest import blob_store
+from manager_rest import coalescing
 from manager_rest import manager_exceptions
 from manager_rest import utils
 from manager_rest import responses_v2
+from manager_rest import streaming
+from manager_rest import etags
+from manager_rest import query_limits
+from manager_rest import service_status
 from manager_rest.files import UploadedDataManager
 from manager_rest.storage_manager import get_storage_manager
 from manager_rest.blueprints_manager import (DslParseException,
@@ -82,6 +87,54 @@ def exceptions_handled(func):
     return wrapper
 
 
+def conditional(get_version):
+    """Decorator for answering conditional GET requests.
+
+    :param get_version: a function which is called with the same arguments
+     as the decorated method, and returns a cheap to obtain token which
+     changes whenever the resource does (e.g. its version or update time).
+     It is used for creating the resource's ETag, so that requests with a
+     matching If-None-Match header are answered with a 304 without loading
+     and marshalling the whole resource.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if hasattr(request, '__skip_marshalling') or \
+                    not etags.is_conditional_request():
+                return func(*args, **kwargs)
+            etag = etags.make_etag(get_version(*args, **kwargs))
+            if etags.is_not_modified(etag):
+                return etags.not_modified_response(etag)
+            return etags.add_etag(func(*args, **kwargs), etag)
+        return wrapper
+    return decorator
+
+
+def coalesced(func):
+    """Decorator for coalescing identical concurrent read requests.
+
+    While a request is being handled, identical requests (same URL, by the
+    same principal) wait for it and share its result, instead of querying
+    the storage (and evaluating functions) again. It should be placed
+    under the conditional decorator, as ETags are computed per request.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        cfy_config = config.instance()
+        if not cfy_config.coalescing_enabled or \
+                hasattr(request, '__skip_marshalling') or \
+                request.method not in coalescing.COALESCED_METHODS:
+            return func(*args, **kwargs)
+        return coalescing.in_flight_requests.do(
+            coalescing.get_request_key(),
+            lambda: func(*args, **kwargs),
+            # response objects (e.g. streamed responses) can't be shared
+            is_shareable=lambda result: not isinstance(result, BaseResponse),
+            timeout=cfy_config.coalescing_wait_timeout)
+    return wrapper
+
+
 def _is_include_parameter_in_request():
     return '_include' in request.args and request.args['_include']
 
@@ -109,9 +162,16 @@ def _get_fields_to_include(model_fields):
 
 @contextmanager
 def skip_nested_marshalling():
+    # may be nested, when overriding a resource which itself overrides
+    # an older version's resource
+    if hasattr(request, '__skip_marshalling'):
+        yield
+        return
     request.__skip_marshalling = True
-    yield
-    delattr(request, '__skip_marshalling')
+    try:
+        yield
+    finally:
+        delattr(request, '__skip_marshalling')
 
 
 class marshal_with(object):
@@ -142,21 +202,53 @@ class marshal_with(object):
 
             response = f(*args, **kwargs)
 
+            # lists are marshalled and serialized one item at a time while
+            # the response is being sent, rather than being held in memory
+            # as a whole in their model, marshalled and serialized forms
             if isinstance(response, responses_v2.ListResponse):
-                wrapped_items = self.wrap_with_response_object(response.items)
-                response.items = marshal(wrapped_items, fields_to_include)
-                return marshal(response,
-                               responses_v2.ListResponse.resource_fields)
+                return self._list_response(response.items,
+                                           fields_to_include,
+                                           metadata=response.metadata)
             if isinstance(response, tuple):
                 data, code, headers = unpack(response)
                 data = self.wrap_with_response_object(data)
                 return marshal(data, fields_to_include), code, headers
+            elif isinstance(response, list):
+                return self._list_response(response,
+                                           fields_to_include,
+                                           envelope=False)
             else:
                 response = self.wrap_with_response_object(response)
                 return marshal(response, fields_to_include)
 
         return wrapper
 
+    def _list_response(self, items, fields_to_include, metadata=None,
+                       envelope=True):
+        etag = None
+        if etags.is_conditional_request() and isinstance(items, list):
+            # list items have no common version, so the list's ETag is
+            # derived from the items' versions. a matching If-None-Match is
+            # answered before any item is marshalled
+            etag = etags.make_etag(etags.list_version(items, metadata))
+            if etags.is_not_modified(etag):
+                return etags.not_modified_response(etag)
+
+        response = streaming.make_streaming_list_response(
+            items,
+            serialize_item=self._marshal_item(fields_to_include),
+            metadata=metadata,
+            envelope=envelope)
+        if etag:
+            response.set_etag(etag)
+        return response
+
+    def _marshal_item(self, fields_to_include):
+        def marshal_item(item):
+            return marshal(self.wrap_with_response_object(item),
+                           fields_to_include)
+        return marshal_item
+
     def wrap_with_response_object(self, data):
         if isinstance(data, dict):
             return self.response_class(**data)
@@ -215,6 +307,27 @@ def make_streaming_response(res_id, res_path, content_length, archive_type):
     return response
 
 
+def blueprint_version(_, blueprint_id, **kwargs):
+    # blueprints are immutable once uploaded (while being uploaded
+    # asynchronously, every status change also updates updated_at)
+    return get_blueprints_manager().get_blueprint(
+        blueprint_id, include=['id', 'updated_at']).updated_at
+
+
+def deployment_version(_, deployment_id, **kwargs):
+    return get_blueprints_manager().get_deployment(
+        deployment_id, include=['id', 'updated_at']).updated_at
+
+
+def node_instance_version(_, node_instance_id, **kwargs):
+    node_instance = get_storage_manager().get_node_instance(
+        node_instance_id, include=['id'])
+    if node_instance.version is None:
+        # storage without versioning support
+        return etags.content_hash([node_instance])
+    return node_instance.version
+
+
 class UploadedBlueprintsManager(UploadedDataManager):
 
     def _get_kind(self):
@@ -234,9 +347,73 @@ class UploadedBlueprintsManager(UploadedDataManager):
         application_dir = self._extract_file_to_file_server(
             file_server_root,
             archive_target_path)
-        return self._prepare_and_submit_blueprint(file_server_root,
-                                                  application_dir,
-                                                  data_id), None
+        return self._prepare_and_submit_blueprint(
+            file_server_root,
+            application_dir,
+            data_id,
+            self._get_application_file_name()), None
+
+    def receive_uploaded_data_async(self, data_id):
+        """Receive the blueprint archive, and leave its extraction and
+        parsing to a background worker. The blueprint is created right
+        away, in the uploading status.
+        """
+        application_file_name = self._get_application_file_name()
+        file_server_root = config.instance().file_server_root
+        archive_target_path = tempfile.mktemp(dir=file_server_root)
+        try:
+            self._save_file_locally(archive_target_path)
+            blueprint = get_blueprints_manager().create_uploading_blueprint(
+                data_id,
+                application_file_name or CONVENTION_APPLICATION_BLUEPRINT_FILE)
+        except Exception:
+            if os.path.exists(archive_target_path):
+                os.remove(archive_target_path)
+            raise
+        background.get_worker_pool().submit(
+            self._process_uploaded_blueprint,
+            app._get_current_object(),
+            data_id,
+            application_file_name,
+            archive_target_path)
+        return blueprint, 202
+
+    def _process_uploaded_blueprint(self, flask_app, blueprint_id,
+                                    application_file_name,
+                                    archive_target_path):
+        with flask_app.app_context():
+            blueprints_manager = get_blueprints_manager()
+            file_server_root = config.instance().file_server_root
+            application_dir = None
+            try:
+                blueprints_manager.update_blueprint_status(
+                    blueprint_id, models.BlueprintState.PARSING)
+                application_dir = self._extract_file_to_file_server(
+                    file_server_root,
+                    archive_target_path)
+                self._prepare_and_submit_blueprint(file_server_root,
+                                                   application_dir,
+                                                   blueprint_id,
+                                                   application_file_name,
+                                                   async_upload=True)
+                self._move_archive_to_uploaded_dir(blueprint_id,
+                                                   file_server_root,
+                                                   archive_target_path)
+                blueprints_manager.update_blueprint_status(
+                    blueprint_id, models.BlueprintState.UPLOADED)
+            except Exception, ex:
+                flask_app.logger.exception(
+                    'Failed uploading blueprint {0}'.format(blueprint_id))
+                if application_dir:
+                    shutil.rmtree(path.join(file_server_root,
+                                            application_dir),
+                                  ignore_errors=True)
+                blueprints_manager.update_blueprint_status(
+                    blueprint_id, models.BlueprintState.FAILED,
+                    error=str(ex))
+            finally:
+                if os.path.exists(archive_target_path):
+                    os.remove(archive_target_path)
 
     @classmethod
     def _process_plugins(cls, file_server_root, blueprint_id):
@@ -248,31 +425,19 @@ class UploadedBlueprintsManager(UploadedDataManager):
                    for directory in os.listdir(plugins_directory)
                    if path.isdir(path.join(plugins_directory, directory))]
 
-        for plugin_dir in plugins:
-            final_zip_name = '{0}.zip'.format(path.basename(plugin_dir))
-            target_zip_path = path.join(file_server_root,
-                                        "blueprints", blueprint_id,
-                                        'plugins', final_zip_name)
-            cls._zip_dir(plugin_dir, target_zip_path)
-
-    @classmethod
-    def _zip_dir(cls, dir_to_zip, target_zip_path):
-        zipf = zipfile.ZipFile(target_zip_path, 'w', zipfile.ZIP_DEFLATED)
-        try:
-            plugin_dir_base_name = path.basename(dir_to_zip)
-            rootlen = len(dir_to_zip) - len(plugin_dir_base_name)
-            for base, dirs, files in os.walk(dir_to_zip):
-                for entry in files:
-                    fn = os.path.join(base, entry)
-                    zipf.write(fn, fn[rootlen:])
-        finally:
-            zipf.close()
+        archiving.zip_dirs(
+            [(plugin_dir, '{0}.zip'.format(plugin_dir))
+             for plugin_dir in plugins],
+            compression_level=config.instance().plugins_zip_compression_level,
+            threads=config.instance().plugins_zip_threads)
 
     @classmethod
     def _extract_file_to_file_server(cls, file_server_root,
                                      archive_target_path):
-        # extract application to file server
-        tempdir = tempfile.mkdtemp('-blueprint-submit')
+        # extract application to file server. extracting into a temporary
+        # directory under the file server root, so that moving the
+        # application directory into place is a rename rather than a copy
+        tempdir = tempfile.mkdtemp('-blueprint-submit', dir=file_server_root)
         try:
             try:
                 archive_util.unpack_archive(archive_target_path, tempdir)
@@ -293,12 +458,8 @@ class UploadedBlueprintsManager(UploadedDataManager):
             # the latter is guaranteed to be unique).
             generated_app_dir_name = '{0}-{1}'.format(
                 application_dir_base_name, uuid.uuid4())
-            temp_application_dir = path.join(tempdir,
-                                             application_dir_base_name)
-            temp_application_target_dir = path.join(tempdir,
-                                                    generated_app_dir_name)
-            shutil.move(temp_application_dir, temp_application_target_dir)
-            shutil.move(temp_application_target_dir, file_server_root)
+            os.rename(path.join(tempdir, application_dir_base_name),
+                      path.join(file_server_root, generated_app_dir_name))
             return generated_app_dir_name
         finally:
             shutil.rmtree(tempdir)
@@ -306,10 +467,12 @@ class UploadedBlueprintsManager(UploadedDataManager):
     @classmethod
     def _prepare_and_submit_blueprint(cls, file_server_root,
                                       app_dir,
-                                      blueprint_id):
+                                      blueprint_id,
+                                      application_file_name,
+                                      async_upload=False):
 
         app_dir, app_file_name = cls._extract_application_file(
-            file_server_root, app_dir)
+            file_server_root, app_dir, application_file_name)
 
         file_server_base_url = '{0}/'.format(
             config.instance().file_server_base_uri)
@@ -320,30 +483,42 @@ class UploadedBlueprintsManager(UploadedDataManager):
                 app_dir,
                 app_file_name,
                 file_server_base_url,
-                blueprint_id)
+                blueprint_id,
+                async_upload=async_upload)
 
             # moving the app directory in the file server to be under a
             # directory named after the blueprint id
+            blueprint_dir = os.path.join(
+                file_server_root,
+                config.instance().file_server_blueprints_folder,
+                blueprint.id)
             shutil.move(os.path.join(file_server_root, app_dir),
-                        os.path.join(
-                            file_server_root,
-                            config.instance().file_server_blueprints_folder,
-                            blueprint.id))
+                        blueprint_dir)
             cls._process_plugins(file_server_root, blueprint.id)
+            blob_store.add_tree(blueprint_dir)
             return blueprint
         except DslParseException, ex:
             shutil.rmtree(os.path.join(file_server_root, app_dir))
             raise manager_exceptions.InvalidBlueprintError(
                 'Invalid blueprint - {0}'.format(ex.message))
+        except manager_exceptions.ProcessingLimitExceededError:
+            shutil.rmtree(os.path.join(file_server_root, app_dir))
+            raise
+
+    @staticmethod
+    def _get_application_file_name():
+        if 'application_file_name' in request.args:
+            return urllib.unquote(
+                request.args['application_file_name']).decode('utf-8')
+        return None
 
     @classmethod
-    def _extract_application_file(cls, file_server_root, application_dir):
+    def _extract_application_file(cls, file_server_root, application_dir,
+                                  application_file_name):
 
         full_application_dir = path.join(file_server_root, application_dir)
 
-        if 'application_file_name' in request.args:
-            application_file_name = urllib.unquote(
-                request.args['application_file_name']).decode('utf-8')
+        if application_file_name:
             application_file = path.join(full_application_dir,
                                          application_file_name)
             if not path.isfile(application_file):
@@ -435,6 +610,8 @@ class BlueprintsId(SecuredResource):
         notes="Returns a blueprint by its id."
     )
     @exceptions_handled
+    @conditional(blueprint_version)
+    @coalesced
     @marshal_with(responses.BlueprintState)
     def get(self, blueprint_id, _include=None, **kwargs):
         """
@@ -507,12 +684,16 @@ class BlueprintsId(SecuredResource):
             config.instance().file_server_root,
             config.instance().file_server_blueprints_folder,
             blueprint.id)
-        shutil.rmtree(blueprint_folder)
         uploaded_blueprint_folder = os.path.join(
             config.instance().file_server_root,
             config.instance().file_server_uploaded_blueprints_folder,
             blueprint.id)
-        shutil.rmtree(uploaded_blueprint_folder)
+        # a failed asynchronous upload may not have gotten to create the
+        # blueprint's folders
+        ignore_errors = blueprint.status == models.BlueprintState.FAILED
+        blob_store.remove_tree(blueprint_folder, ignore_errors=ignore_errors)
+        blob_store.remove_tree(uploaded_blueprint_folder,
+                               ignore_errors=ignore_errors)
 
         return blueprint, 200
 
@@ -716,6 +897,8 @@ class DeploymentsId(SecuredResource):
         notes="Returns a deployment by its id."
     )
     @exceptions_handled
+    @conditional(deployment_version)
+    @coalesced
     @marshal_with(responses.Deployment)
     def get(self, deployment_id, _include=None, **kwargs):
         """
@@ -1014,6 +1197,8 @@ class NodeInstancesId(SecuredResource):
                      'paramType': 'query'}]
     )
     @exceptions_handled
+    @conditional(node_instance_version)
+    @coalesced
     @marshal_with(responses.NodeInstance)
     def get(self, node_instance_id, _include=None, **kwargs):
         """
@@ -1106,6 +1291,7 @@ class DeploymentsIdOutputs(SecuredResource):
         notes="Gets a specific deployment outputs."
     )
     @exceptions_handled
+    @coalesced
     @marshal_with(responses.DeploymentOutputs)
     def get(self, deployment_id, **kwargs):
         """Get deployment outputs"""
@@ -1122,7 +1308,11 @@ class Events(SecuredResource):
         List events for the provided Elasticsearch query
         """
         verify_json_content_type()
-        return ManagerElasticsearch.search_events(body=request.json)
+        body = request.json or {}
+        applied_limits = query_limits.apply_limits(body)
+        result = ManagerElasticsearch.search_events(body=body)
+        result['query_limits'] = applied_limits
+        return result
 
     @swagger.operation(
         nickname='events',
@@ -1187,9 +1377,13 @@ class Search(SecuredResource):
         Search using an Elasticsearch query
         """
         verify_json_content_type()
-        return ManagerElasticsearch.search(
+        body = request.json or {}
+        applied_limits = query_limits.apply_limits(body)
+        result = ManagerElasticsearch.search(
             index='cloudify_storage',
-            body=request.json)
+            body=body)
+        result['query_limits'] = applied_limits
+        return result
 
 
 class Status(SecuredResource):
@@ -1197,7 +1391,9 @@ class Status(SecuredResource):
     @swagger.operation(
         responseClass=responses.Status,
         nickname="status",
-        notes="Returns state of running system services"
+        notes="Returns state of running system services. Services' state "
+              "is cached for a few seconds; the 'age' of each service is "
+              "the age (in seconds) of its reported state."
     )
     @exceptions_handled
     @marshal_with(responses.Status)
@@ -1217,10 +1413,9 @@ class Status(SecuredResource):
                             'rest-service': 'Manager Rest-Service',
                             'amqp-influx': 'AMQP InfluxDB'
                             }
-                from manager_rest.runitsupervise import get_services
-                jobs = get_services(job_list)
+                from manager_rest.runitsupervise import get_service
             else:
-                from manager_rest.systemddbus import get_services
+                from manager_rest.systemddbus import get_service
                 job_list = {'cloudify-mgmtworker.service': 'Celery Management',
                             'cloudify-restservice.service':
                                 'Manager Rest-Service',
@@ -1233,7 +1428,7 @@ class Status(SecuredResource):
                             'logstash.service': 'Logstash',
                             'nginx.service': 'Webserver'
                             }
-                jobs = get_services(job_list)
+            jobs = service_status.get_services(job_list, get_service)
         except ImportError:
             jobs = ['undefined']
 
@@ -1292,6 +1487,8 @@ class ProviderContext(SecuredResource):
 
         status_code = 200 if update else 201
 
+        # imported here, as importing dsl_parser's utils is slow
+        from dsl_parser import utils as dsl_parser_utils
         try:
             get_blueprints_manager().update_provider_context(update, context)
             return dict(status='ok'), status_code
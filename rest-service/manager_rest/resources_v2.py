@@ -13,7 +13,6 @@
 #  * See the License for the specific language governing permissions and
 #  * limitations under the License.
 #
-import shutil
 import os
 import json
 import tarfile
@@ -23,7 +22,6 @@ from collections import OrderedDict
 
 from flask_restful_swagger import swagger
 from flask import request
-from flask.ext.restful import marshal
 
 from flask_securest.rest_security import SecuredResource
 
@@ -38,7 +36,9 @@ from manager_rest import models
 from manager_rest import responses_v2
 from manager_rest import manager_exceptions
 from manager_rest import config
+from manager_rest import blob_store
 from manager_rest import files
+from manager_rest import streaming
 from manager_rest.storage_manager import get_storage_manager
 from manager_rest.storage_manager import ListResult
 from manager_rest.blueprints_manager import get_blueprints_manager
@@ -102,8 +102,9 @@ def marshal_events(func):
     Decorator for marshalling raw event responses
     """
     def marshal_response(*args, **kwargs):
-        return marshal(func(*args, **kwargs),
-                       responses_v2.ListResponse.resource_fields)
+        result = func(*args, **kwargs)
+        return streaming.make_streaming_list_response(
+            result.items, metadata=result.metadata)
     return marshal_response
 
 
@@ -266,7 +267,7 @@ class SnapshotsId(SecuredResource):
     def delete(self, snapshot_id):
         snapshot = get_blueprints_manager().delete_snapshot(snapshot_id)
         path = _get_snapshot_path(snapshot_id)
-        shutil.rmtree(path, ignore_errors=True)
+        blob_store.remove_tree(path, ignore_errors=True)
         return snapshot, 200
 
     @exceptions_handled
@@ -408,6 +409,8 @@ class BlueprintsId(resources.BlueprintsId):
         notes="Returns a blueprint by its id."
     )
     @exceptions_handled
+    @resources.conditional(resources.blueprint_version)
+    @resources.coalesced
     @marshal_with(responses_v2.BlueprintState)
     def get(self, blueprint_id, _include=None, **kwargs):
         """
@@ -853,7 +856,8 @@ class PluginsId(SecuredResource):
         plugin = get_blueprints_manager().get_plugin(plugin_id)
         archive_name = plugin.archive_name
         archive_path = _get_plugin_archive_path(plugin_id, archive_name)
-        shutil.rmtree(os.path.dirname(archive_path), ignore_errors=True)
+        blob_store.remove_tree(os.path.dirname(archive_path),
+                               ignore_errors=True)
         get_storage_manager().delete_plugin(plugin_id)
         return plugin
 
@@ -14,76 +14,388 @@
 #  * limitations under the License.
 #
 
-import os
+import json
+
+from flask import request, current_app, make_response
+from flask_restful_swagger import swagger
 from flask_securest.rest_security import SecuredResource
 
 from manager_rest import utils
+from manager_rest import models
+from manager_rest import resources
+from manager_rest import resources_v2
+from manager_rest import manager_exceptions
+from manager_rest import metrics
+from manager_rest import profiling
+from manager_rest import requests_schema
 from manager_rest.resources import (marshal_with,
-                                    exceptions_handled)
+                                    exceptions_handled,
+                                    verify_json_content_type,
+                                    verify_parameter_in_request_body,
+                                    verify_and_convert_bool)
 
-from manager_rest import models
 from manager_rest import responses_v2_1
 from manager_rest import config
-from manager_rest.blueprints_manager import get_blueprints_manager
+from manager_rest.maintenance import (get_maintenance_state,
+                                      write_maintenance_state,
+                                      remove_maintenance_state,
+                                      finish_activation_if_idle)
 from manager_rest.constants import (MAINTENANCE_MODE_ACTIVE,
-                                    MAINTENANCE_MODE_STATUS_FILE,
                                     ACTIVATING_MAINTENANCE_MODE,
                                     NOT_IN_MAINTENANCE_MODE)
 
 
+class Blueprints(resources_v2.Blueprints):
+
+    @swagger.operation(
+        responseClass='List[{0}]'.format(
+            responses_v2_1.BlueprintState.__name__),
+        nickname="list",
+        notes='Returns a list of submitted blueprints for the optionally '
+              'provided filter parameters {0}'
+        .format(models.BlueprintState.fields),
+        parameters=resources_v2._create_filter_params_list_description(
+            models.BlueprintState.fields,
+            'blueprints'
+        )
+    )
+    @exceptions_handled
+    @marshal_with(responses_v2_1.BlueprintState)
+    def get(self, _include=None, **kwargs):
+        """
+        List uploaded blueprints
+        """
+        with resources.skip_nested_marshalling():
+            return super(Blueprints, self).get(_include=_include, **kwargs)
+
+
+class BlueprintsId(resources_v2.BlueprintsId):
+
+    @swagger.operation(
+        responseClass=responses_v2_1.BlueprintState,
+        nickname="getById",
+        notes="Returns a blueprint by its id. A blueprint uploaded "
+              "asynchronously is in the uploading/parsing status until it "
+              "is either uploaded, or failed (with the failure in error)."
+    )
+    @exceptions_handled
+    @resources.conditional(resources.blueprint_version)
+    @resources.coalesced
+    @marshal_with(responses_v2_1.BlueprintState)
+    def get(self, blueprint_id, _include=None, **kwargs):
+        """
+        Get blueprint by id
+        """
+        with resources.skip_nested_marshalling():
+            return super(BlueprintsId, self).get(blueprint_id=blueprint_id,
+                                                 _include=_include,
+                                                 **kwargs)
+
+    @swagger.operation(
+        responseClass=responses_v2_1.BlueprintState,
+        nickname="upload",
+        notes="Submitted blueprint should be an archive "
+              "containing the directory which contains the blueprint. "
+              "Archive format may be zip, tar, tar.gz or tar.bz2."
+              " Blueprint archive may be submitted via either URL or by "
+              "direct upload. If async is set, the archive is extracted "
+              "and parsed in the background, and the blueprint is "
+              "returned (with 202) in the uploading status.",
+        parameters=[{'name': 'application_file_name',
+                     'description': 'File name of yaml '
+                                    'containing the "main" blueprint.',
+                     'required': False,
+                     'allowMultiple': False,
+                     'dataType': 'string',
+                     'paramType': 'query',
+                     'defaultValue': 'blueprint.yaml'},
+                    {'name': 'blueprint_archive_url',
+                     'description': 'url of a blueprint archive file',
+                     'required': False,
+                     'allowMultiple': False,
+                     'dataType': 'string',
+                     'paramType': 'query'},
+                    {'name': 'async',
+                     'description': 'Whether to extract and parse the '
+                                    'blueprint in the background.',
+                     'required': False,
+                     'allowMultiple': False,
+                     'dataType': 'boolean',
+                     'paramType': 'query',
+                     'defaultValue': False},
+                    {
+                        'name': 'body',
+                        'description': 'Binary form of the tar '
+                                       'gzipped blueprint directory',
+                        'required': True,
+                        'allowMultiple': False,
+                        'dataType': 'binary',
+                        'paramType': 'body'}],
+        consumes=[
+            "application/octet-stream"
+        ]
+
+    )
+    @exceptions_handled
+    @marshal_with(responses_v2_1.BlueprintState)
+    def put(self, blueprint_id, **kwargs):
+        """
+        Upload a blueprint (id specified)
+        """
+        async_upload = verify_and_convert_bool(
+            'async', request.args.get('async', False))
+        if async_upload:
+            return resources.UploadedBlueprintsManager().\
+                receive_uploaded_data_async(blueprint_id)
+        with resources.skip_nested_marshalling():
+            return super(BlueprintsId, self).put(blueprint_id=blueprint_id,
+                                                 **kwargs)
+
+    @swagger.operation(
+        responseClass=responses_v2_1.BlueprintState,
+        nickname="deleteById",
+        notes="deletes a blueprint by its id."
+    )
+    @exceptions_handled
+    @marshal_with(responses_v2_1.BlueprintState)
+    def delete(self, blueprint_id, **kwargs):
+        """
+        Delete blueprint by id
+        """
+        with resources.skip_nested_marshalling():
+            return super(BlueprintsId, self).delete(
+                blueprint_id=blueprint_id, **kwargs)
+
+
 class MaintenanceMode(SecuredResource):
     @exceptions_handled
     @marshal_with(responses_v2_1.MaintenanceMode)
     def get(self, **kwargs):
-        maintenance_file_path = get_maintenance_file_path()
-        if os.path.isfile(maintenance_file_path):
-            with open(maintenance_file_path, 'r') as f:
-                status = f.read()
-
-            if status == MAINTENANCE_MODE_ACTIVE:
-                return {'status': MAINTENANCE_MODE_ACTIVE}
-            if status == ACTIVATING_MAINTENANCE_MODE:
-                executions = get_blueprints_manager().executions_list(
-                        is_include_system_workflows=True).items
-                for execution in executions:
-                    if execution.status not in models.Execution.END_STATES:
-                        return {'status': ACTIVATING_MAINTENANCE_MODE}
-
-                write_maintenance_state(MAINTENANCE_MODE_ACTIVE)
-                return {'status': MAINTENANCE_MODE_ACTIVE}
-        else:
-            return {'status': NOT_IN_MAINTENANCE_MODE}
+        # moving from "activating" to "activated" is done when executions
+        # end (see maintenance.finish_activation_if_idle)
+        return {'status': get_maintenance_state()}
 
 
 class MaintenanceModeAction(SecuredResource):
     @exceptions_handled
     @marshal_with(responses_v2_1.MaintenanceMode)
     def post(self, maintenance_action, **kwargs):
-        maintenance_file_path = get_maintenance_file_path()
+        state = get_maintenance_state()
 
         if maintenance_action == 'activate':
-            if os.path.isfile(maintenance_file_path):
+            if state != NOT_IN_MAINTENANCE_MODE:
                 return {'status': MAINTENANCE_MODE_ACTIVE}, 304
 
             utils.mkdirs(config.instance().maintenance_folder)
             write_maintenance_state(ACTIVATING_MAINTENANCE_MODE)
+            finish_activation_if_idle()
 
             return {'status': ACTIVATING_MAINTENANCE_MODE}
 
         if maintenance_action == 'deactivate':
-            if not os.path.isfile(maintenance_file_path):
+            if state == NOT_IN_MAINTENANCE_MODE:
                 return {'status': NOT_IN_MAINTENANCE_MODE}, 304
-            os.remove(maintenance_file_path)
+            remove_maintenance_state()
             return {'status': NOT_IN_MAINTENANCE_MODE}
 
 
-def get_maintenance_file_path():
-    return os.path.join(
-        config.instance().maintenance_folder,
-        MAINTENANCE_MODE_STATUS_FILE)
+class Metrics(SecuredResource):
+
+    @swagger.operation(
+        nickname="metrics",
+        notes="Returns the rest service's request latency and storage "
+              "metrics, in the prometheus text format. Available only "
+              "when metrics collection is enabled in the configuration "
+              "(metrics_enabled). Metrics are aggregated over all the "
+              "worker processes, through files the workers write to the "
+              "metrics_dir directory."
+    )
+    @exceptions_handled
+    def get(self, **kwargs):
+        """
+        Get rest service metrics
+        """
+        if not config.instance().metrics_enabled:
+            raise manager_exceptions.NotFoundError(
+                'Metrics collection is disabled')
+        response = make_response(metrics.registry.to_prometheus())
+        response.headers['Content-Type'] = metrics.PROMETHEUS_CONTENT_TYPE
+        return response
+
+
+class Profiles(SecuredResource):
+
+    @swagger.operation(
+        responseClass='List[{0}]'.format(
+            responses_v2_1.RequestProfile.__name__),
+        nickname="listProfiles",
+        notes="Returns the slowest profiled requests of each endpoint "
+              "(or of the endpoint given by the 'endpoint' query "
+              "parameter), slowest first. Requests are profiled when a "
+              "profiling sample rate is configured, or when sent with a "
+              "{0} header matching the configured profiling token. "
+              "The profiles recorded by all the worker processes are "
+              "listed."
+              .format(profiling.PROFILE_HEADER)
+    )
+    @exceptions_handled
+    @marshal_with(responses_v2_1.RequestProfile)
+    def get(self, **kwargs):
+        """
+        List request profiles
+        """
+        return [profile.to_dict() for profile in
+                profiling.store.list(request.args.get('endpoint'))]
+
+    @swagger.operation(
+        responseClass='List[{0}]'.format(
+            responses_v2_1.RequestProfile.__name__),
+        nickname="deleteProfiles",
+        notes="Deletes the stored request profiles (of the endpoint given "
+              "by the 'endpoint' query parameter, or of all endpoints)."
+    )
+    @exceptions_handled
+    @marshal_with(responses_v2_1.RequestProfile)
+    def delete(self, **kwargs):
+        """
+        Delete request profiles
+        """
+        endpoint = request.args.get('endpoint')
+        profiles = profiling.store.list(endpoint)
+        profiling.store.clear(endpoint)
+        return [profile.to_dict() for profile in profiles]
+
+
+class Batch(SecuredResource):
+
+    @swagger.operation(
+        responseClass=responses_v2_1.BatchResponse,
+        nickname="batch",
+        notes="Executes a list of REST requests, in order, and returns "
+              "their results. Each request is a dict with 'method' and "
+              "'path' (relative to the API version of this request, "
+              "e.g. '/deployments/dep1') and an optional JSON 'body'. "
+              "If 'stop_on_error' is set, requests following the first "
+              "failed one (status code >= 400) are not executed, and are "
+              "missing from the results.",
+        parameters=[{'name': 'body',
+                     'description': 'Batch of requests',
+                     'required': True,
+                     'allowMultiple': False,
+                     'dataType': requests_schema.BatchRequest.__name__,
+                     'paramType': 'body'}],
+        consumes=[
+            "application/json"
+        ]
+    )
+    @exceptions_handled
+    @marshal_with(responses_v2_1.BatchResponse)
+    def post(self, **kwargs):
+        """
+        Execute a batch of requests
+        """
+        verify_json_content_type()
+        request_json = request.json
+        verify_parameter_in_request_body('requests', request_json,
+                                         param_type=list)
+        stop_on_error = verify_and_convert_bool(
+            'stop_on_error', request_json.get('stop_on_error', False))
+        sub_requests = request_json['requests']
+        for sub_request in sub_requests:
+            _verify_batch_sub_request(sub_request)
+
+        # sub requests paths are relative to the API version of the
+        # batch request itself, i.e. /api/<version>/
+        base_path = request.path[:request.path.rfind('/')]
+        # the batch response is compressed as a whole, rather than each of
+        # its items
+        headers = [(name, value) for name, value in request.headers
+                   if name not in ('Content-Type', 'Content-Length',
+                                   'Accept-Encoding')]
+
+        results = []
+        for sub_request in sub_requests:
+            result = _dispatch_batch_sub_request(sub_request,
+                                                 base_path,
+                                                 headers)
+            results.append(result)
+            if stop_on_error and result['status_code'] >= 400:
+                break
+        return {'items': results}
+
+
+def _verify_batch_sub_request(sub_request):
+    if not isinstance(sub_request, dict):
+        raise manager_exceptions.BadParametersError(
+            'Each request in a batch is expected to be a dict, got '
+            '{0}'.format(sub_request))
+    verify_parameter_in_request_body('method', sub_request,
+                                     param_type=basestring)
+    verify_parameter_in_request_body('path', sub_request,
+                                     param_type=basestring)
+
+
+def _dispatch_batch_sub_request(sub_request, base_path, headers):
+    """Dispatch a single request of a batch to the resource handling it.
+
+    The request is executed in its own (nested) request context, going
+    through the app's request hooks (e.g. logging and metrics) and error
+    handlers, just as if it was sent on its own, but without the
+    per-request HTTP overhead. It shares the batch request's state, so
+    that its credentials are authenticated, and the maintenance mode state
+    is read, only once per batch.
+    """
+    method = sub_request['method'].upper()
+    path = sub_request['path']
+    if not path.startswith('/api/'):
+        path = '{0}/{1}'.format(base_path, path.lstrip('/'))
+    body = sub_request.get('body')
+    request_args = {
+        'method': method,
+        'headers': headers,
+        'environ_overrides': {
+            utils.SHARED_STATE_ENVIRON_KEY: utils.get_shared_request_state()
+        }
+    }
+    if body is not None:
+        request_args['data'] = json.dumps(body)
+        request_args['content_type'] = 'application/json'
+
+    result = {'method': method, 'path': sub_request['path']}
+    app = current_app._get_current_object()
+    # each sub request gets its own app context, and with it its own
+    # flask.g, which the app's request hooks keep per request state on
+    with app.app_context(), app.test_request_context(path, **request_args):
+        # error handling mirrors flask's own request handling, so that
+        # errors are reported just as they would be for a single request
+        try:
+            try:
+                response = _full_dispatch_sub_request(app)
+            except Exception as e:
+                response = app.handle_user_exception(e)
+            response = app.process_response(app.make_response(response))
+        except Exception as e:
+            response = app.make_response(app.handle_exception(e))
+        # the response data is read in the request context, as streamed
+        # responses depend on it
+        data = response.get_data()
+
+    result['status_code'] = response.status_code
+    if response.mimetype == 'application/json' and data:
+        data = json.loads(data)
+    result['response'] = data or None
+    return result
 
 
-def write_maintenance_state(state):
-    maintenance_file_path = get_maintenance_file_path()
-    with open(maintenance_file_path, 'w') as f:
-        f.write(state)
+@exceptions_handled
+def _full_dispatch_sub_request(app):
+    # the request hooks expect the request to have been routed
+    if request.routing_exception is not None:
+        raise request.routing_exception
+    if request.endpoint and request.endpoint.split('/', 1)[-1] == 'batch':
+        raise manager_exceptions.BadParametersError(
+            'Batch requests cannot be nested')
+    response = app.preprocess_request()
+    if response is None:
+        response = app.dispatch_request()
+    return response
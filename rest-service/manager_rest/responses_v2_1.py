@@ -16,6 +16,8 @@
 from flask.ext.restful import fields
 from flask_restful_swagger import swagger
 
+from manager_rest.responses_v2 import BlueprintState as BlueprintStateV2
+
 
 @swagger.model
 class MaintenanceMode(object):
@@ -25,3 +27,47 @@ class MaintenanceMode(object):
 
     def __init__(self, **kwargs):
         self.status = kwargs['status']
+
+
+@swagger.model
+class BatchResponse(object):
+    resource_fields = {
+        'items': fields.Raw
+    }
+
+    def __init__(self, **kwargs):
+        self.items = kwargs['items']
+
+
+@swagger.model
+class RequestProfile(object):
+    resource_fields = {
+        'endpoint': fields.String,
+        'method': fields.String,
+        'path': fields.String,
+        'duration': fields.Float,
+        'created_at': fields.String,
+        'stats': fields.String
+    }
+
+    def __init__(self, **kwargs):
+        self.endpoint = kwargs['endpoint']
+        self.method = kwargs['method']
+        self.path = kwargs['path']
+        self.duration = kwargs['duration']
+        self.created_at = kwargs['created_at']
+        self.stats = kwargs['stats']
+
+
+@swagger.model
+class BlueprintState(BlueprintStateV2):
+
+    resource_fields = dict(BlueprintStateV2.resource_fields.items() + {
+        'status': fields.String,
+        'error': fields.String
+    }.items())
+
+    def __init__(self, **kwargs):
+        super(BlueprintState, self).__init__(**kwargs)
+        self.status = kwargs['status']
+        self.error = kwargs['error']
@@ -33,6 +33,23 @@ def get_service_details(name):
     return {'instances': get_instance_properties(name)}
 
 
+def get_service(service, name):
+    """
+    Returns service deployment details for a single job.
+    :param service: Service name
+    :param name: Service screen name.
+    :return: Service details, or None if there's no such service.
+    """
+    if not is_service(service):
+        return None
+    service_details = get_service_details(service)
+    display_name = {'display_name': name}
+    if service_details:
+        service_details.update(display_name)
+        return service_details
+    return display_name
+
+
 def get_services(services):
     """
     Returns service deployment details for all requested jobs.
@@ -42,14 +59,9 @@ def get_services(services):
     """
     output = []
     for service, name in services.items():
-        if is_service(service):
-            service_details = get_service_details(service)
-            display_name = {'display_name': name}
-            if service_details:
-                service_details.update(display_name)
-                output.append(service_details)
-            else:
-                output.append(display_name)
+        service_details = get_service(service, name)
+        if service_details is not None:
+            output.append(service_details)
     return output
 
 
@@ -15,30 +15,41 @@
 
 import StringIO
 import functools
+import logging
+import random
+import time
 import traceback
 import os
 import yaml
 import psutil
-from logging.handlers import RotatingFileHandler
 
 from flask import (
     Flask,
     jsonify,
     request,
-    current_app
+    current_app,
+    g
 )
 from flask_restful import Api
 
 from flask_securest.rest_security import SecuREST
 
+from manager_rest import admission
+from manager_rest import auth_cache
 from manager_rest import endpoint_mapper
+from manager_rest import log_handlers
+from manager_rest import maintenance
+from manager_rest import metrics
+from manager_rest import profiling
+from manager_rest import process_pool
+from manager_rest import compression
 from manager_rest import config
 from manager_rest import storage_manager
+from manager_rest import swagger as rest_swagger
 from manager_rest import manager_exceptions
 from manager_rest import utils
 from manager_rest.constants import (MAINTENANCE_MODE_ACTIVE,
                                     MAINTENANCE_MODE_ACTIVE_ERROR_CODE,
-                                    MAINTENANCE_MODE_STATUS_FILE,
                                     ACTIVATING_MAINTENANCE_MODE,
                                     ACTIVATING_MAINTENANCE_MODE_ERROR_CODE)
 
@@ -76,10 +87,20 @@ def setup_app(warnings=None):
         app.logger.info('initializing rest-service security')
         init_secured_app(app)
 
+    if cfy_config.metrics_enabled:
+        metrics.init_app(app)
+    profiling.init_app(app)
+
     app.before_request(handle_maintenance_mode)
 
     app.before_request(log_request)
     app.after_request(log_response)
+    # requests are admitted after being logged, so that rejected and
+    # queued requests are logged as well
+    admission.init_app(app)
+    # after_request functions run in reverse order of registration, so
+    # the response is compressed before its headers are logged
+    app.after_request(compression.compress_response)
 
     # saving flask's original error handlers
     flask_handle_exception = app.handle_exception
@@ -111,50 +132,103 @@ def setup_app(warnings=None):
         flask_restful_handle_user_exception)
 
     endpoint_mapper.setup_resources(api)
+    # the swagger documentation is served by a separate app, which is
+    # only created once the documentation is requested
+    app.wsgi_app = rest_swagger.SwaggerDocsMiddleware(app.wsgi_app)
     return app
 
 
-def log_request():
+class _LazyFormat(object):
+    """Defers formatting a log message argument until the record is
+    actually emitted
+    """
+
+    def __init__(self, func, *args):
+        self._func = func
+        self._args = args
+
+    def __str__(self):
+        return str(self._func(*self._args))
+
+
+def _is_request_logged():
+    """Whether the current request (and its response) should be logged.
+
+    Decided once per request, so that no work is done for requests which
+    aren't logged: the request log is emitted only if the logger is enabled
+    for DEBUG, and then only for a sample of the requests, according to
+    the rest_service_log_requests_sample_rate setting.
+    """
+    logged = getattr(g, 'log_request', None)
+    if logged is None:
+        sample_rate = config.instance().rest_service_log_requests_sample_rate
+        logged = app.logger.isEnabledFor(logging.DEBUG) and \
+            (sample_rate >= 1 or random.random() < sample_rate)
+        g.log_request = logged
+    return logged
+
+
+def _request_data(request_obj):
     # form and args parameters are "multidicts", i.e. values are not
     # flattened and will appear in a list (even if single value)
-    form_data = request.form.to_dict(False)
-    # args is the parsed query string data
-    args_data = request.args.to_dict(False)
-    # json data; other data (e.g. binary) is available via request.data,
-    #  but is not logged
-    json_data = request.json if hasattr(request, 'json') else None
+    return {
+        # json data; other data (e.g. binary) is available via
+        # request.data, but is not logged
+        'json': request_obj.get_json(silent=True),
+        # args is the parsed query string data
+        'args': request_obj.args.to_dict(False),
+        'form': request_obj.form.to_dict(False)
+    }
 
-    # content-type and content-length are already included in headers
 
+def log_request():
+    if not _is_request_logged():
+        return
+    g.log_request_start = time.time()
+
+    # content-type and content-length are already included in headers
+    request_data = _LazyFormat(_request_data, request._get_current_object())
     app.logger.debug(
-        '\nRequest ({0}):\n'
-        '\tpath: {1}\n'
-        '\thttp method: {2}\n'
-        '\tjson data: {3}\n'
-        '\tquery string data: {4}\n'
-        '\tform data: {5}\n'
-        '\theaders: {6}'.format(
-            id(request),
-            request.path,  # includes "path parameters"
-            request.method,
-            json_data,
-            args_data,
-            form_data,
-            headers_pretty_print(request.headers)))
+        '\nRequest (%s):\n'
+        '\tpath: %s\n'
+        '\thttp method: %s\n'
+        '\trequest data: %s\n'
+        '\theaders: %s',
+        id(request),
+        request.path,  # includes "path parameters"
+        request.method,
+        request_data,
+        _LazyFormat(headers_pretty_print, request.headers),
+        extra={'access_log': {'request_id': id(request),
+                              'method': request.method,
+                              'path': request.path,
+                              'remote_addr': request.remote_addr}})
 
 
 def log_response(response):
+    if not _is_request_logged():
+        return response
+    # the request may have been answered by an earlier before_request
+    # hook (e.g. maintenance mode), in which case it wasn't timed
+    start = getattr(g, 'log_request_start', None)
+    duration_ms = round((time.time() - start) * 1000, 1) if start else None
+
     # content-type and content-length are already included in headers
     # not logging response.data as volumes are massive
-
     app.logger.debug(
-        '\nResponse ({0}):\n'
-        '\tstatus: {1}\n'
-        '\theaders: {2}'
-        .format(
-            id(request),
-            response.status,
-            headers_pretty_print(response.headers)))
+        '\nResponse (%s):\n'
+        '\tstatus: %s\n'
+        '\tduration: %sms\n'
+        '\theaders: %s',
+        id(request),
+        response.status,
+        duration_ms,
+        _LazyFormat(headers_pretty_print, response.headers),
+        extra={'access_log': {'request_id': id(request),
+                              'method': request.method,
+                              'path': request.path,
+                              'status': response.status_code,
+                              'duration_ms': duration_ms}})
     return response
 
 
@@ -162,7 +236,13 @@ def handle_maintenance_mode():
 
     allowed_endpoints = ['maintenance',
                          'status',
-                         'version']
+                         'version',
+                         'metrics',
+                         'profiles']
+
+    # unknown paths aren't routed to an endpoint, and fail with a 404
+    if request.endpoint is None:
+        return
 
     # Removing v*/ from the endpoint
     index = request.endpoint.find('/')
@@ -172,36 +252,34 @@ def handle_maintenance_mode():
         if request_endpoint.startswith(endpoint):
             return
 
-    maintenance_file = os.path.join(
-        config.instance().maintenance_folder,
-        MAINTENANCE_MODE_STATUS_FILE)
-
-    if os.path.isfile(maintenance_file):
-        with open(maintenance_file, 'r') as f:
-            status = f.read()
-
-        if status == MAINTENANCE_MODE_ACTIVE:
-            return maintenance_mode_error()
-        if status == ACTIVATING_MAINTENANCE_MODE:
-            forbidden_requests = ['POST', 'PATCH', 'PUT']
-
-            if request_endpoint == 'snapshots/<string:snapshot_id>':
-                if request.method in forbidden_requests:
-                    return activating_maintenance_mode_error()
-            if request_endpoint == 'snapshots/<string:snapshot_id>/restore':
+    # the state is read once for a batch request and the requests in it
+    shared_state = utils.get_shared_request_state()
+    if 'maintenance_state' not in shared_state:
+        shared_state['maintenance_state'] = \
+            maintenance.get_maintenance_state()
+    status = shared_state['maintenance_state']
+    if status == MAINTENANCE_MODE_ACTIVE:
+        return maintenance_mode_error()
+    if status == ACTIVATING_MAINTENANCE_MODE:
+        forbidden_requests = ['POST', 'PATCH', 'PUT']
+
+        if request_endpoint == 'snapshots/<string:snapshot_id>':
+            if request.method in forbidden_requests:
                 return activating_maintenance_mode_error()
+        if request_endpoint == 'snapshots/<string:snapshot_id>/restore':
+            return activating_maintenance_mode_error()
 
-            if request_endpoint == 'executions':
-                if request.method in forbidden_requests:
-                    return activating_maintenance_mode_error()
+        if request_endpoint == 'executions':
+            if request.method in forbidden_requests:
+                return activating_maintenance_mode_error()
 
-            if request_endpoint == 'deployments/<string:deployment_id>':
-                if request.method in forbidden_requests:
-                    return activating_maintenance_mode_error()
+        if request_endpoint == 'deployments/<string:deployment_id>':
+            if request.method in forbidden_requests:
+                return activating_maintenance_mode_error()
 
-            if request_endpoint == 'deployment-modifications':
-                if request.method in forbidden_requests:
-                    return activating_maintenance_mode_error()
+        if request_endpoint == 'deployment-modifications':
+            if request.method in forbidden_requests:
+                return activating_maintenance_mode_error()
 
 
 def headers_pretty_print(headers):
@@ -216,6 +294,7 @@ def reset_state(configuration=None):
     # this doesn't really do anything
     # blueprints_manager.reset()
     storage_manager.reset()
+    process_pool.reset()
     app = setup_app()
 
 
@@ -225,11 +304,14 @@ def create_logger(logger_name,
                   log_file_size_MB,
                   log_files_backup_count):
 
+    # records are written to the log file by a background thread, so that
+    # logging never blocks on disk I/O
     additional_log_handlers = [
-        RotatingFileHandler(
-            filename=log_file,
-            maxBytes=log_file_size_MB * 1024 * 1024,
-            backupCount=log_files_backup_count)
+        log_handlers.QueueHandler(
+            log_handlers.ProcessSafeRotatingFileHandler(
+                filename=log_file,
+                maxBytes=log_file_size_MB * 1024 * 1024,
+                backupCount=log_files_backup_count))
     ]
 
     return utils.setup_logger(logger_name=logger_name,
@@ -251,12 +333,34 @@ def init_secured_app(_app):
         secure_app.userstore_driver = create_instance(userstore_driver)
 
     def register_authentication_providers(authentication_providers):
+        cache_ttl = cfy_config.security_auth_cache_ttl
+        watcher = auth_cache.FilesWatcher(_get_security_files_paths())
         # Note: the order of registration is important here
         for provider in authentication_providers:
             secure_app.app.logger.debug(
                 'registering authentication provider {0}'.format(provider))
+            # authentications are cached across requests only if a cache
+            # TTL is set, but are always shared by the requests of a batch
+            provider_instance = auth_cache.CachingAuthenticationProvider(
+                name=provider['name'],
+                provider=create_instance(provider),
+                ttl=cache_ttl,
+                max_size=cfy_config.security_auth_cache_size,
+                watcher=watcher)
             secure_app.register_authentication_provider(
-                provider['name'], create_instance(provider))
+                provider['name'], provider_instance)
+
+    def _get_security_files_paths():
+        # cached authentications are dropped when these files are reloaded
+        paths = []
+        for class_details, path_key in [
+                (cfy_config.security_userstore_driver,
+                 'userstore_file_path'),
+                (cfy_config.security_authorization_provider,
+                 'roles_config_file_path')]:
+            properties = (class_details or {}).get(PROPERTIES_KEY) or {}
+            paths.append(properties.get(path_key))
+        return paths
 
     def register_authorization_provider(authorization_provider):
         secure_app.app.logger.debug('registering authorization provider {0}'
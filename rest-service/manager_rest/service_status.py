@@ -0,0 +1,133 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import time
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+
+from manager_rest import config
+
+logger = logging.getLogger('manager-rest')
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+
+
+def _get_pool(size):
+    global _pool, _pool_pid
+    # a pool created before forking has no threads in the child
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPool(processes=size)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+class ServiceStatusCache(object):
+    """Short-lived cache of system services' status.
+
+    Services whose cached status is older than the cache's TTL are queried
+    in parallel. A request waits for them up to a timeout. Services which
+    weren't queried in time are served from the cache, and their status is
+    updated once the query completes. Only a single query per service is
+    in flight at any time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # service id -> (collected at, service details)
+        self._entries = {}
+        # service id -> AsyncResult of the in-flight query
+        self._pending = {}
+
+    def get_services(self, services, get_service, ttl, timeout):
+        """Get the status of the given services.
+
+        :param services: dict of service id -> display name
+        :param get_service: function returning the details of a single
+         service, given its id and display name (or None if there's no
+         such service)
+        :param ttl: how long (in seconds) a service status is cached for
+        :param timeout: how long (in seconds) to wait for queried services
+        :return: list of service details, each with an 'age' key holding
+         the age (in seconds) of its status, or None if its status
+         couldn't be obtained in time
+        """
+        now = time.time()
+        queries = []
+        with self._lock:
+            for service_id, display_name in services.iteritems():
+                entry = self._entries.get(service_id)
+                if entry and now - entry[0] < ttl:
+                    continue
+                query = self._pending.get(service_id)
+                if query is None:
+                    query = _get_pool(len(services)).apply_async(
+                        self._query_service,
+                        (get_service, service_id, display_name))
+                    self._pending[service_id] = query
+                queries.append(query)
+
+        deadline = now + timeout
+        for query in queries:
+            query.wait(max(deadline - time.time(), 0))
+
+        out = []
+        now = time.time()
+        with self._lock:
+            for service_id, display_name in services.iteritems():
+                entry = self._entries.get(service_id)
+                if entry is None:
+                    out.append({'display_name': display_name,
+                                'instances': [],
+                                'age': None})
+                    continue
+                collected_at, service = entry
+                if service is not None:
+                    service = dict(service)
+                    service['age'] = round(now - collected_at, 3)
+                    out.append(service)
+        return out
+
+    def _query_service(self, get_service, service_id, display_name):
+        try:
+            service = get_service(service_id, display_name)
+            with self._lock:
+                self._entries[service_id] = (time.time(), service)
+        except Exception:
+            # the previous status (if any) is kept, and will keep aging
+            logger.exception('Failed getting the status of service {0}'
+                             .format(service_id))
+        finally:
+            with self._lock:
+                self._pending.pop(service_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = ServiceStatusCache()
+
+
+def get_services(services, get_service):
+    cfy_config = config.instance()
+    return cache.get_services(services,
+                              get_service,
+                              ttl=cfy_config.service_status_cache_ttl,
+                              timeout=cfy_config.service_status_timeout)
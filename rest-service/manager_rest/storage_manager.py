@@ -16,6 +16,9 @@
 import importlib
 from flask import current_app
 
+from manager_rest import config
+from manager_rest import metrics
+
 # storage_manager_module_name = 'file_storage_manager'
 storage_manager_module_name = 'manager_rest.es_storage_manager'
 
@@ -51,8 +54,10 @@ def get_storage_manager():
     """
     manager = current_app.config.get('storage_manager')
     if not manager:
-        current_app.config['storage_manager'] = _get_instance()
-        manager = current_app.config.get('storage_manager')
+        manager = _get_instance()
+        if config.instance().metrics_enabled:
+            manager = metrics.InstrumentedStorageManager(manager)
+        current_app.config['storage_manager'] = manager
     return manager
 
 
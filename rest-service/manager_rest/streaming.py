@@ -0,0 +1,93 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import json
+
+from flask import Response, stream_with_context
+
+# serialized items are buffered up to roughly this many bytes before being
+# handed to the WSGI server, to avoid a write call per item
+CHUNK_SIZE = 64 * 1024
+
+JSON_MIMETYPE = 'application/json'
+
+
+def iter_list_items(items):
+    """Iterate over a list of storage items, releasing each item as soon as
+    it has been handed out.
+
+    Lists are consumed destructively (the list is emptied during
+    iteration), so that items which were already serialized can be garbage
+    collected while the rest of the response is still being produced.
+    Any other iterable (e.g. a generator over storage results) is simply
+    iterated.
+    """
+    if not isinstance(items, list):
+        for item in items:
+            yield item
+        return
+    items.reverse()
+    while items:
+        yield items.pop()
+
+
+def stream_json_list(items, serialize_item=None, metadata=None,
+                     envelope=True, chunk_size=CHUNK_SIZE):
+    """Generate a JSON list document, serializing a single item at a time.
+
+    :param items: the items to serialize (see `iter_list_items`).
+    :param serialize_item: an optional function turning an item into a
+                           json-serializable object (e.g. marshalling it).
+    :param metadata: the list metadata, used when `envelope` is set.
+    :param envelope: when True, the items are wrapped in the
+                     {"items": [...], "metadata": {...}} list response
+                     envelope; otherwise a bare JSON array is generated.
+    :param chunk_size: approximate size (in bytes) of the generated chunks.
+    """
+    buf = ['{"items": [' if envelope else '[']
+    buf_size = 0
+    separator = ''
+    for item in iter_list_items(items):
+        if serialize_item is not None:
+            item = serialize_item(item)
+        dumped = json.dumps(item)
+        buf.append(separator)
+        buf.append(dumped)
+        separator = ', '
+        buf_size += len(dumped)
+        if buf_size >= chunk_size:
+            yield ''.join(buf)
+            buf = []
+            buf_size = 0
+    if envelope:
+        buf.append('], "metadata": {0}}}'.format(json.dumps(metadata)))
+    else:
+        buf.append(']')
+    yield ''.join(buf)
+
+
+def make_streaming_list_response(items, serialize_item=None, metadata=None,
+                                 envelope=True, status=200, headers=None):
+    """Create a response whose JSON body is generated incrementally from the
+    given items, rather than from a fully marshalled and dumped list.
+    """
+    body = stream_json_list(items,
+                            serialize_item=serialize_item,
+                            metadata=metadata,
+                            envelope=envelope)
+    return Response(stream_with_context(body),
+                    status=status,
+                    headers=headers,
+                    mimetype=JSON_MIMETYPE)
@@ -14,8 +14,20 @@
 #  * limitations under the License.
 #
 
+import threading
+
+from flask import Flask
+from flask_restful import Api
 from flask_restful_swagger import swagger
 
+DOCS_PATH_SUFFIXES = ('.help.json', '.help.html')
+SPEC_PATH = '/api/spec'
+
+_docs_lock = threading.Lock()
+# (api version, resource, resource path) of every documented resource
+_documented_resources = []
+_docs_app = None
+
 
 """
 This method is based on swagger's
@@ -54,3 +66,50 @@ def add_swagger_resource(api, api_version, resource, resource_path):
         basePath='http://localhost:8100',
         resourcePath='/', produces=["application/json"],
         endpoint='/api/spec')
+
+
+def register_swagger_resource(api_version, resource, resource_path):
+    """Register a resource to be documented.
+
+    Creating the documentation endpoints of all resources takes a
+    significant part of the rest service's startup time, while they're
+    rarely used. Instead, they're created in a separate app when the
+    documentation is first requested (see SwaggerDocsMiddleware).
+    """
+    with _docs_lock:
+        resource_details = (api_version, resource, resource_path)
+        if resource_details not in _documented_resources:
+            _documented_resources.append(resource_details)
+
+
+def is_docs_request(path):
+    return path.endswith(DOCS_PATH_SUFFIXES) or path == SPEC_PATH or \
+        path.startswith((SPEC_PATH + '.', SPEC_PATH + '/'))
+
+
+def _get_docs_app():
+    global _docs_app
+    with _docs_lock:
+        if _docs_app is None:
+            docs_app = Flask(__name__)
+            api = Api(docs_app)
+            for api_version, resource, resource_path in \
+                    _documented_resources:
+                add_swagger_resource(api, api_version, resource,
+                                     resource_path)
+            _docs_app = docs_app
+        return _docs_app
+
+
+class SwaggerDocsMiddleware(object):
+    """WSGI middleware passing documentation requests to the (lazily
+    created) documentation app, and any other request to the rest service
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if is_docs_request(environ.get('PATH_INFO', '')):
+            return _get_docs_app().wsgi_app(environ, start_response)
+        return self.wsgi_app(environ, start_response)
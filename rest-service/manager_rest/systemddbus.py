@@ -1,3 +1,5 @@
+import threading
+
 import dbus
 
 SYSTEMD_BUS = 'org.freedesktop.systemd1'
@@ -40,20 +42,33 @@ class DBusClient:
         return self.get_properties(unit_name, property_names, SVC_IFACE)
 
 
+_local = threading.local()
+
+
+def _get_client():
+    # a client per thread, as services may be queried in parallel
+    client = getattr(_local, 'client', None)
+    if client is None:
+        client = _local.client = DBusClient()
+    return client
+
+
+def get_service(unit_id, display_name):
+    service = {}
+    service['display_name'] = display_name
+    service['instances'] = []
+    try:
+        client = _get_client()
+        instance = {}
+        instance.update(client.get_unit_properties(unit_id))
+        instance.update(client.get_service_properties(unit_id))
+        instance['state'] = instance['SubState']
+        service['instances'].append(instance)
+    except dbus.exceptions.DBusException:
+        pass
+    return service
+
+
 def get_services(units):
-    out = []
-    client = DBusClient()
-    for unit_id, display_name in units.iteritems():
-        service = {}
-        service['display_name'] = display_name
-        service['instances'] = []
-        try:
-            instance = {}
-            instance.update(client.get_unit_properties(unit_id))
-            instance.update(client.get_service_properties(unit_id))
-            instance['state'] = instance['SubState']
-            service['instances'].append(instance)
-        except dbus.exceptions.DBusException:
-            pass
-        out.append(service)
-    return out
+    return [get_service(unit_id, display_name)
+            for unit_id, display_name in units.iteritems()]
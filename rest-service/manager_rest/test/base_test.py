@@ -48,6 +48,16 @@ FILE_SERVER_RESOURCES_URI = '/resources'
 LATEST_API_VERSION = 2.1  # to be used by max_client_version test attribute
 
 
+def create_temp_file():
+    """Create an empty temporary file, and return its path (the file
+    descriptors of the many files created by tests are closed, so they're
+    not exhausted)
+    """
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    return path
+
+
 def build_query_string(query_params):
     query_string = ''
     if query_params and len(query_params) > 0:
@@ -193,10 +203,13 @@ class BaseServerTestCase(unittest.TestCase):
 
     def setUp(self):
         self.tmpdir = tempfile.mkdtemp()
-        self.rest_service_log = tempfile.mkstemp()[1]
-        self.securest_log_file = tempfile.mkstemp()[1]
+        self.rest_service_log = create_temp_file()
+        self.securest_log_file = create_temp_file()
         self.file_server = FileServer(self.tmpdir)
         self.maintenance_mode_dir = tempfile.mkdtemp()
+        self.parse_cache_dir = tempfile.mkdtemp()
+        self.metrics_dir = tempfile.mkdtemp()
+        self.profiles_dir = tempfile.mkdtemp()
         self.addCleanup(self.cleanup)
         self.file_server.start()
         storage_manager.storage_manager_module_name = \
@@ -206,17 +219,18 @@ class BaseServerTestCase(unittest.TestCase):
         # needed when 'server' module is imported.
         # right after the import the log path is set normally like the rest
         # of the variables (used in the reset_state)
-        tmp_conf_file = tempfile.mkstemp()[1]
-        json.dump({'rest_service_log_path': self.rest_service_log,
-                   'rest_service_log_file_size_MB': 1,
-                   'rest_service_log_files_backup_count': 1,
-                   'rest_service_log_level': 'DEBUG'},
-                  open(tmp_conf_file, 'w'))
+        tmp_conf_file = create_temp_file()
+        with open(tmp_conf_file, 'w') as f:
+            json.dump({'rest_service_log_path': self.rest_service_log,
+                       'rest_service_log_file_size_MB': 1,
+                       'rest_service_log_files_backup_count': 1,
+                       'rest_service_log_level': 'DEBUG'}, f)
         os.environ['MANAGER_REST_CONFIG_PATH'] = tmp_conf_file
         try:
             from manager_rest import server
         finally:
             del(os.environ['MANAGER_REST_CONFIG_PATH'])
+            os.remove(tmp_conf_file)
 
         server.reset_state(self.create_configuration())
         utils.copy_resources(config.instance().file_server_root)
@@ -230,6 +244,9 @@ class BaseServerTestCase(unittest.TestCase):
         self.quiet_delete(self.rest_service_log)
         self.quiet_delete(self.securest_log_file)
         self.quiet_delete_directory(self.maintenance_mode_dir)
+        self.quiet_delete_directory(self.parse_cache_dir)
+        self.quiet_delete_directory(self.metrics_dir)
+        self.quiet_delete_directory(self.profiles_dir)
         if self.file_server:
             self.file_server.stop()
 
@@ -260,6 +277,9 @@ class BaseServerTestCase(unittest.TestCase):
         test_config.security_audit_log_file_size_MB = 100
         test_config.security_audit_log_files_backup_count = 20
         test_config._maintenance_folder = self.maintenance_mode_dir
+        test_config.dsl_parse_cache_dir = self.parse_cache_dir
+        test_config.metrics_dir = self.metrics_dir
+        test_config.profiles_dir = self.profiles_dir
         return test_config
 
     def _version_url(self, url):
@@ -352,7 +372,7 @@ class BaseServerTestCase(unittest.TestCase):
 
     def archive_mock_blueprint(self, archive_func=archiving.make_targzfile,
                                blueprint_dir='mock_blueprint'):
-        archive_path = tempfile.mkstemp()[1]
+        archive_path = create_temp_file()
         source_dir = os.path.join(os.path.dirname(
             os.path.abspath(__file__)), blueprint_dir)
         archive_func(archive_path, source_dir)
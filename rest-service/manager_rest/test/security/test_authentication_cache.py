@@ -0,0 +1,156 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import json
+import time
+import base64
+import tempfile
+
+from nose.plugins.attrib import attr
+
+from manager_rest import auth_cache, utils
+from manager_rest.test import base_test
+from manager_rest.test.security.security_test_base import \
+    CLOUDIFY_AUTH_TOKEN_HEADER, SecurityTestBase
+
+
+class MockUserstore(object):
+
+    def __init__(self, users):
+        self.users = users
+        self.calls = 0
+
+    def get_user(self, username):
+        self.calls += 1
+        return self.users.get(username)
+
+
+class MockAuthenticationProvider(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def authenticate(self, userstore):
+        self.calls += 1
+        return userstore.get_user('alice')
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class AuthenticationCacheTests(SecurityTestBase):
+
+    def setUp(self):
+        super(AuthenticationCacheTests, self).setUp()
+        auth_cache.cache.clear()
+        self.provider = MockAuthenticationProvider()
+        self.userstore = MockUserstore(
+            {'alice': {'username': 'alice', 'password': 'alice_password'}})
+
+    def _authenticate(self, caching_provider, token='token'):
+        headers = {CLOUDIFY_AUTH_TOKEN_HEADER: token} if token else {}
+        with self.app.application.test_request_context(headers=headers):
+            return caching_provider.authenticate(self.userstore)
+
+    def _caching_provider(self, ttl=60, max_size=10, watcher=None):
+        return auth_cache.CachingAuthenticationProvider(
+            name='token', provider=self.provider, ttl=ttl,
+            max_size=max_size, watcher=watcher)
+
+    def test_authentication_cached(self):
+        caching_provider = self._caching_provider()
+        for _ in range(3):
+            self.assertEqual('alice',
+                             self._authenticate(caching_provider)['username'])
+        self.assertEqual(1, self.provider.calls)
+        self._authenticate(caching_provider, token='other_token')
+        self.assertEqual(2, self.provider.calls)
+
+    def test_requests_without_credentials_not_cached(self):
+        caching_provider = self._caching_provider()
+        self._authenticate(caching_provider, token=None)
+        self._authenticate(caching_provider, token=None)
+        self.assertEqual(2, self.provider.calls)
+        self.assertEqual(0, len(auth_cache.cache))
+
+    def test_expired_entries(self):
+        caching_provider = self._caching_provider(ttl=0)
+        self._authenticate(caching_provider)
+        self._authenticate(caching_provider)
+        self.assertEqual(2, self.provider.calls)
+
+    def test_cache_size_bounded(self):
+        caching_provider = self._caching_provider(max_size=2)
+        for token in ('a', 'b', 'c'):
+            self._authenticate(caching_provider, token=token)
+        self.assertEqual(2, len(auth_cache.cache))
+        self._authenticate(caching_provider, token='a')
+        self.assertEqual(4, self.provider.calls)
+
+    def test_userstore_not_consulted_on_cache_hits(self):
+        caching_provider = self._caching_provider()
+        self._authenticate(caching_provider)
+        userstore_calls = self.userstore.calls
+        for _ in range(3):
+            self._authenticate(caching_provider)
+        self.assertEqual(userstore_calls, self.userstore.calls)
+        self.assertEqual(1, self.provider.calls)
+
+    def test_entry_expires_with_token(self):
+        caching_provider = self._caching_provider(ttl=60)
+        header = base64.urlsafe_b64encode(json.dumps(
+            {'alg': 'HS256', 'exp': int(time.time()) - 1})).rstrip('=')
+        token = '{0}.payload.signature'.format(header)
+        self._authenticate(caching_provider, token=token)
+        self._authenticate(caching_provider, token=token)
+        self.assertEqual(2, self.provider.calls)
+
+    def test_cache_cleared_when_watched_file_changes(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        caching_provider = self._caching_provider(
+            watcher=auth_cache.FilesWatcher([path]))
+        self._authenticate(caching_provider)
+        with open(path, 'w') as f:
+            f.write('users: []')
+        self._authenticate(caching_provider)
+        self.assertEqual(2, self.provider.calls)
+
+    def test_authentication_shared_by_batch_requests(self):
+        caching_provider = self._caching_provider(ttl=0)
+        headers = {CLOUDIFY_AUTH_TOKEN_HEADER: 'token'}
+        app = self.app.application
+        with app.test_request_context(headers=headers):
+            caching_provider.authenticate(self.userstore)
+            shared_state = utils.get_shared_request_state()
+            for _ in range(3):
+                with app.test_request_context(
+                        headers=headers,
+                        environ_overrides={
+                            utils.SHARED_STATE_ENVIRON_KEY: shared_state}):
+                    self.assertEqual(
+                        'alice',
+                        caching_provider.authenticate(
+                            self.userstore)['username'])
+        self.assertEqual(1, self.provider.calls)
+
+    def test_secured_requests_use_cache(self):
+        client = self.create_client(
+            headers=SecurityTestBase.create_auth_header(
+                username='alice', password='alice_password'))
+        client.deployments.list()
+        hits = auth_cache.cache.hits
+        client.deployments.list()
+        self.assertEqual(hits + 1, auth_cache.cache.hits)
@@ -0,0 +1,96 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import shutil
+import tempfile
+
+from nose.plugins.attrib import attr
+
+from manager_rest import admission
+from manager_rest import config
+from manager_rest import metrics
+from manager_rest.constants import TOO_MANY_REQUESTS_ERROR_CODE
+from manager_rest.test import base_test
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class AdmissionControlTestCase(base_test.BaseServerTestCase):
+
+    def setUp(self):
+        self.locks_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.locks_dir)
+        super(AdmissionControlTestCase, self).setUp()
+        metrics.registry.reset()
+
+    def create_configuration(self):
+        test_config = super(AdmissionControlTestCase, self).\
+            create_configuration()
+        test_config.admission_limits = {
+            'Blueprints.get': {'max_concurrent': 1, 'queue_timeout': 0.1}
+        }
+        test_config.admission_locks_dir = self.locks_dir
+        return test_config
+
+    def _blueprints_limit(self):
+        return admission.ConcurrencyLimit(name='Blueprints.get',
+                                          max_concurrent=1,
+                                          queue_timeout=0,
+                                          locks_dir=self.locks_dir)
+
+    def test_no_limits_by_default(self):
+        self.assertEqual({}, config.Config().admission_limits)
+
+    def test_request_rejected_when_limit_reached(self):
+        slot = self._blueprints_limit().acquire()
+        try:
+            response = self.get('/blueprints')
+        finally:
+            admission.ConcurrencyLimit.release(slot)
+        self.assertEqual(429, response.status_code)
+        self.assertEqual('1', response.headers['Retry-After'])
+        self.assertEqual(TOO_MANY_REQUESTS_ERROR_CODE,
+                         response.json['error_code'])
+        self.assertIsNone(response.json['server_traceback'])
+        self.assertEqual({'Blueprints.get': 1},
+                         metrics.registry.admission_rejections)
+
+        self.assertEqual(200, self.get('/blueprints').status_code)
+
+    def test_slot_released_after_request(self):
+        self.assertEqual(200, self.get('/blueprints').status_code)
+        slot = self._blueprints_limit().acquire()
+        self.assertIsNotNone(slot)
+        admission.ConcurrencyLimit.release(slot)
+
+    def test_other_endpoints_not_limited(self):
+        slot = self._blueprints_limit().acquire()
+        try:
+            self.assertEqual(200, self.get('/deployments').status_code)
+        finally:
+            admission.ConcurrencyLimit.release(slot)
+
+    def test_concurrency_limit(self):
+        limit = admission.ConcurrencyLimit(name='test',
+                                           max_concurrent=2,
+                                           queue_timeout=0,
+                                           locks_dir=self.locks_dir)
+        slots = [limit.acquire(), limit.acquire()]
+        self.assertNotIn(None, slots)
+        self.assertIsNone(limit.acquire())
+        admission.ConcurrencyLimit.release(slots.pop())
+        slots.append(limit.acquire())
+        self.assertNotIn(None, slots)
+        for slot in slots:
+            admission.ConcurrencyLimit.release(slot)
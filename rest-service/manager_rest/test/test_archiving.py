@@ -0,0 +1,73 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from manager_rest import archiving
+
+FILE_CONTENT = 'import os\n' * 1000
+
+
+class ZipDirsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+        self.dirs_to_zip = []
+        for name in ('plugin1', 'plugin2', 'plugin3'):
+            dir_to_zip = os.path.join(self.tempdir, name)
+            os.makedirs(os.path.join(dir_to_zip, 'module'))
+            for file_name in ('setup.py', 'module/__init__.py'):
+                with open(os.path.join(dir_to_zip, file_name), 'w') as f:
+                    f.write(FILE_CONTENT)
+            self.dirs_to_zip.append(
+                (dir_to_zip, '{0}.zip'.format(dir_to_zip)))
+
+    def _assert_zipped(self):
+        for dir_to_zip, target_zip_path in self.dirs_to_zip:
+            name = os.path.basename(dir_to_zip)
+            with zipfile.ZipFile(target_zip_path) as zipf:
+                self.assertIsNone(zipf.testzip())
+                self.assertEqual(
+                    ['{0}/module/__init__.py'.format(name),
+                     '{0}/setup.py'.format(name)],
+                    sorted(zipf.namelist()))
+                self.assertEqual(
+                    FILE_CONTENT, zipf.read('{0}/setup.py'.format(name)))
+
+    def test_zip_dirs(self):
+        archiving.zip_dirs(self.dirs_to_zip)
+        self._assert_zipped()
+
+    def test_zip_dirs_serially(self):
+        archiving.zip_dirs(self.dirs_to_zip, threads=1)
+        self._assert_zipped()
+
+    def test_compression_level(self):
+        sizes = []
+        for level in (0, 1, 6, 9):
+            archiving.zip_dirs(self.dirs_to_zip, compression_level=level)
+            self._assert_zipped()
+            sizes.append(os.path.getsize(self.dirs_to_zip[0][1]))
+        self.assertEqual(sorted(sizes, reverse=True), sizes)
+        self.assertLess(sizes[1], sizes[0])
+
+    def test_invalid_compression_level(self):
+        self.assertRaises(ValueError, archiving.zip_dirs, self.dirs_to_zip,
+                          compression_level=10)
@@ -0,0 +1,145 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import json
+import zlib
+
+import mock
+from nose.plugins.attrib import attr
+
+from manager_rest import compression, log_handlers, maintenance, metrics
+from manager_rest.test import base_test
+
+
+@attr(client_min_version=2.1,
+      client_max_version=base_test.LATEST_API_VERSION)
+class BatchTestCase(base_test.BaseServerTestCase):
+
+    def _batch(self, requests, **kwargs):
+        data = {'requests': requests}
+        data.update(kwargs)
+        response = self.post('/batch', data)
+        self.assertEqual(200, response.status_code)
+        return response.json['items']
+
+    def test_batch(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        results = self._batch([
+            {'method': 'put',
+             'path': '/deployments/dep2',
+             'body': {'blueprint_id': 'bp'}},
+            {'method': 'get', 'path': '/deployments/dep2?_include=id'},
+            {'method': 'get', 'path': '/deployments/no-such-deployment'},
+            {'method': 'get', 'path': '/blueprints'}
+        ])
+        self.assertEqual([201, 200, 404, 200],
+                         [r['status_code'] for r in results])
+        self.assertEqual('dep2', results[0]['response']['id'])
+        self.assertEqual({'id': 'dep2'}, results[1]['response'])
+        self.assertEqual('not_found_error',
+                         results[2]['response']['error_code'])
+        self.assertEqual(['bp'], [b['id'] for b in
+                                  results[3]['response']['items']])
+        self.assertEqual('PUT', results[0]['method'])
+        self.assertEqual('/deployments/dep2', results[0]['path'])
+
+    def test_batch_stop_on_error(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        results = self._batch([
+            {'method': 'get', 'path': '/deployments/no-such-deployment'},
+            {'method': 'put',
+             'path': '/deployments/dep2',
+             'body': {'blueprint_id': 'bp'}}
+        ], stop_on_error=True)
+        self.assertEqual([404], [r['status_code'] for r in results])
+        self.assertEqual(404, self.get('/deployments/dep2').status_code)
+
+    def test_batch_unknown_path(self):
+        results = self._batch([{'method': 'get', 'path': '/no-such-thing'}])
+        self.assertEqual(404, results[0]['status_code'])
+
+    def test_batch_cannot_be_nested(self):
+        results = self._batch([{'method': 'post',
+                                'path': '/batch',
+                                'body': {'requests': []}}])
+        self.assertEqual(400, results[0]['status_code'])
+
+    def test_batch_invalid_request(self):
+        response = self.post('/batch', {'requests': [{'method': 'get'}]})
+        self.assertEqual(400, response.status_code)
+        response = self.post('/batch', {'requests': ['get']})
+        self.assertEqual(400, response.status_code)
+
+
+@attr(client_min_version=2.1,
+      client_max_version=base_test.LATEST_API_VERSION)
+class BatchRequestHooksTestCase(base_test.BaseServerTestCase):
+
+    def setUp(self):
+        super(BatchRequestHooksTestCase, self).setUp()
+        metrics.registry.reset()
+
+    def create_configuration(self):
+        test_config = super(BatchRequestHooksTestCase,
+                            self).create_configuration()
+        test_config.metrics_enabled = True
+        return test_config
+
+    def _batch(self, requests, headers=None):
+        response = self.app.post(self._version_url('/batch'),
+                                 content_type='application/json',
+                                 data=json.dumps({'requests': requests}),
+                                 headers=headers)
+        self.assertEqual(200, response.status_code)
+        data = response.data
+        if response.headers.get('Content-Encoding') == 'gzip':
+            data = zlib.decompress(data, compression.GZIP_WBITS)
+        return json.loads(data)['items']
+
+    def test_batch_requests_recorded(self):
+        self._batch([{'method': 'get', 'path': '/blueprints'},
+                     {'method': 'get', 'path': '/blueprints/no-such-bp'}])
+
+        lines = self.app.get(
+            self._version_url('/metrics')).data.splitlines()
+        self.assertIn('manager_rest_request_duration_seconds_count'
+                      '{endpoint="v2.1/blueprints",method="GET",'
+                      'status="200"} 1', lines)
+        self.assertIn(
+            'manager_rest_request_duration_seconds_count'
+            '{endpoint="v2.1/blueprints/<string:blueprint_id>",'
+            'method="GET",status="404"} 1', lines)
+
+        log_handlers.flush()
+        with open(self.rest_service_log) as f:
+            log = f.read()
+        self.assertIn('path: {0}'.format(
+            self._version_url('/blueprints/no-such-bp')), log)
+        self.assertIn('status: 404 NOT FOUND', log)
+
+    def test_maintenance_state_read_once(self):
+        with mock.patch.object(maintenance, 'get_maintenance_state',
+                               wraps=maintenance.get_maintenance_state) \
+                as get_maintenance_state:
+            self._batch([{'method': 'get', 'path': '/blueprints'}] * 3)
+        self.assertEqual(1, get_maintenance_state.call_count)
+
+    def test_batch_items_not_compressed(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        results = self._batch(
+            [{'method': 'get', 'path': '/blueprints'}],
+            headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(['bp'], [b['id'] for b in
+                                  results[0]['response']['items']])
@@ -0,0 +1,155 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import shutil
+import hashlib
+import tempfile
+import unittest
+
+from nose.plugins.attrib import attr
+
+from manager_rest import blob_store, config
+from manager_rest.test import base_test
+
+
+def _write(file_path, content):
+    if not os.path.isdir(os.path.dirname(file_path)):
+        os.makedirs(os.path.dirname(file_path))
+    with open(file_path, 'w') as f:
+        f.write(content)
+
+
+class BlobStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = blob_store.BlobStore(os.path.join(self.root, 'blobs'))
+
+    def test_identical_files_stored_once(self):
+        paths = [os.path.join(self.root, 'bp{0}'.format(i), 'script.sh')
+                 for i in range(3)]
+        for file_path in paths:
+            _write(file_path, 'echo hello')
+        _write(os.path.join(self.root, 'bp0', 'other.sh'), 'echo other')
+        self.store.add_tree(os.path.join(self.root, 'bp0'))
+        self.store.add_file(paths[1])
+        self.store.add_file(paths[2],
+                            digest=hashlib.sha256('echo hello').hexdigest())
+
+        self.assertTrue(os.path.samefile(paths[0], paths[1]))
+        self.assertTrue(os.path.samefile(paths[0], paths[2]))
+        self.assertEqual(4, os.stat(paths[0]).st_nlink)
+        self.assertFalse(os.path.samefile(
+            paths[0], os.path.join(self.root, 'bp0', 'other.sh')))
+        with open(paths[2]) as f:
+            self.assertEqual('echo hello', f.read())
+
+    def test_stored_files_are_read_only(self):
+        file_path = os.path.join(self.root, 'bp', 'script.sh')
+        _write(file_path, 'echo hello')
+        self.store.add_file(file_path)
+        self.assertFalse(os.stat(file_path).st_mode & 0222)
+
+    def test_add_file_twice(self):
+        file_path = os.path.join(self.root, 'bp', 'script.sh')
+        _write(file_path, 'echo hello')
+        digest = self.store.add_file(file_path)
+        self.assertEqual(digest, self.store.add_file(file_path))
+        self.assertEqual(2, os.stat(file_path).st_nlink)
+
+    def test_symlinks_not_stored(self):
+        file_path = os.path.join(self.root, 'bp', 'script.sh')
+        _write(file_path, 'echo hello')
+        link_path = os.path.join(self.root, 'bp', 'link.sh')
+        os.symlink(file_path, link_path)
+        self.assertIsNone(self.store.add_file(link_path))
+        self.assertTrue(os.path.islink(link_path))
+
+    def test_collect_garbage(self):
+        paths = [os.path.join(self.root, 'bp{0}'.format(i), 'script.sh')
+                 for i in range(2)]
+        for file_path in paths:
+            _write(file_path, 'echo hello')
+            self.store.add_file(file_path)
+
+        shutil.rmtree(os.path.dirname(paths[0]))
+        self.assertEqual(0, self.store.collect_garbage())
+        shutil.rmtree(os.path.dirname(paths[1]))
+        self.assertEqual(1, self.store.collect_garbage())
+
+    def test_remove_tree(self):
+        # a file linked twice from within a directory, and once from another
+        paths = [os.path.join(self.root, 'bp{0}'.format(i), name)
+                 for i in range(2) for name in ('script.sh', 'copy.sh')]
+        for file_path in paths:
+            _write(file_path, 'echo hello')
+        _write(os.path.join(self.root, 'bp0', 'other.sh'), 'echo other')
+        self.store.add_tree(os.path.join(self.root, 'bp0'))
+        self.store.add_tree(os.path.join(self.root, 'bp1'))
+        # unreferenced blobs of other directories aren't looked at
+        unrelated_path = os.path.join(self.root, 'unrelated.sh')
+        _write(unrelated_path, 'echo unrelated')
+        self.store.add_file(unrelated_path)
+        os.remove(unrelated_path)
+
+        self.assertEqual(1, self.store.remove_tree(
+            os.path.join(self.root, 'bp0')))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'bp0')))
+        self.assertEqual(3, os.stat(paths[2]).st_nlink)
+        self.assertEqual(1, self.store.remove_tree(
+            os.path.join(self.root, 'bp1')))
+        self.assertEqual(1, self.store.collect_garbage())
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class BlueprintFilesDeduplicationTestCase(base_test.BaseServerTestCase):
+
+    def _blueprint_file(self, blueprint_id, file_name):
+        return os.path.join(self.tmpdir,
+                            config.instance().file_server_blueprints_folder,
+                            blueprint_id, file_name)
+
+    def _uploaded_archive(self, blueprint_id):
+        uploaded_dir = os.path.join(
+            self.tmpdir,
+            config.instance().file_server_uploaded_blueprints_folder,
+            blueprint_id)
+        return os.path.join(uploaded_dir, os.listdir(uploaded_dir)[0])
+
+    def _blobs(self):
+        blobs_dir = os.path.join(self.tmpdir,
+                                 config.instance().file_server_blobs_folder)
+        return [blob for blob_dir in os.listdir(blobs_dir)
+                for blob in os.listdir(os.path.join(blobs_dir, blob_dir))]
+
+    def test_blueprint_files_deduplicated(self):
+        resource_path, archive_path, query_params = \
+            self.put_blueprint_args(blueprint_id='bp1')
+        self.put_file(resource_path, archive_path, query_params)
+        self.put_file(resource_path.replace('bp1', 'bp2'), archive_path,
+                      query_params)
+        self.assertTrue(os.path.samefile(
+            self._blueprint_file('bp1', 'blueprint.yaml'),
+            self._blueprint_file('bp2', 'blueprint.yaml')))
+        self.assertTrue(os.path.samefile(self._uploaded_archive('bp1'),
+                                         self._uploaded_archive('bp2')))
+
+        blobs = self._blobs()
+        self.delete('/blueprints/bp1')
+        self.assertEqual(sorted(blobs), sorted(self._blobs()))
+        self.delete('/blueprints/bp2')
+        self.assertEqual([], self._blobs())
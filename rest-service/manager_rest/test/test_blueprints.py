@@ -14,11 +14,15 @@
 #  * limitations under the License.
 
 import os
-import tempfile
+import hashlib
 
+import mock
 from nose.plugins.attrib import attr
 
 from manager_rest import archiving
+from manager_rest import log_handlers
+from manager_rest import manager_exceptions
+from manager_rest import process_pool
 from manager_rest.file_server import FileServer
 from manager_rest.test import base_test
 from cloudify_rest_client.exceptions import CloudifyClientError
@@ -190,7 +194,7 @@ class BlueprintsTestCase(base_test.BaseServerTestCase):
         self._test_put_blueprint_archive(archiving.make_tarbz2file, 'tar.bz2')
 
     def test_put_unsupported_archive_blueprint(self):
-        archive_path = tempfile.mkstemp()[1]
+        archive_path = base_test.create_temp_file()
         with open(archive_path, 'w') as f:
             f.write('this is not a valid archive obviously')
 
@@ -272,6 +276,17 @@ class BlueprintsTestCase(base_test.BaseServerTestCase):
         self.assertEqual(blueprint_id, response.id)
         self.assertEqual(main_file_name, response.main_file_name)
 
+    def test_put_blueprint_archive_digest_logged(self):
+        resource_path, archive_path, _ = self.put_blueprint_args()
+        with open(archive_path, 'rb') as f:
+            archive_digest = hashlib.sha256(f.read()).hexdigest()
+        self.assertEqual(201,
+                         self.put_file(resource_path,
+                                       archive_path).status_code)
+        log_handlers.flush()
+        with open(self.rest_service_log) as f:
+            self.assertIn('(sha256: {0})'.format(archive_digest), f.read())
+
     def _test_put_blueprint_archive(self, archive_func, archive_type):
         blueprint_id = 'new_blueprint_id'
         put_blueprints_response = self.put_file(
@@ -288,3 +303,33 @@ class BlueprintsTestCase(base_test.BaseServerTestCase):
                         response.headers['Content-Disposition'])
         self.assertTrue(archive_filename in
                         response.headers['X-Accel-Redirect'])
+
+    def test_put_blueprint_parsing_limit_exceeded(self):
+        with mock.patch('manager_rest.process_pool.apply',
+                        side_effect=process_pool.TaskTimeoutError(
+                            'task timed out')):
+            response = self.put_file(*self.put_blueprint_args(
+                blueprint_id='bp'))
+        # a blueprint too costly to parse isn't reported as invalid
+        self.assertEqual(
+            manager_exceptions.ProcessingLimitExceededError.ERROR_CODE,
+            response.json['error_code'])
+        self.assertIn('task timed out', response.json['message'])
+        self.assertEqual(0, len(self.client.blueprints.list()))
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class BlueprintUploadSizeLimitTestCase(base_test.BaseServerTestCase):
+
+    def create_configuration(self):
+        test_config = super(BlueprintUploadSizeLimitTestCase, self).\
+            create_configuration()
+        test_config.upload_max_sizes = {'blueprint': 100}
+        return test_config
+
+    def test_put_blueprint_too_large(self):
+        response = self.put_file(*self.put_blueprint_args())
+        self.assertEqual(413, response.status_code)
+        self.assertEqual(manager_exceptions.PayloadTooLargeError.ERROR_CODE,
+                         response.json['error_code'])
+        self.assertEqual(0, len(self.client.blueprints.list()))
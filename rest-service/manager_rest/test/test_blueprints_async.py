@@ -0,0 +1,163 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+import mock
+from nose.plugins.attrib import attr
+
+from manager_rest import background, config, models, storage_manager
+from manager_rest.test import base_test
+
+
+class MockWorkerPool(object):
+    """Keeps the submitted work until it's explicitly run"""
+
+    def __init__(self):
+        self.work = []
+
+    def submit(self, func, *args, **kwargs):
+        self.work.append((func, args, kwargs))
+
+    def run(self):
+        while self.work:
+            func, args, kwargs = self.work.pop(0)
+            func(*args, **kwargs)
+
+
+class WorkerPoolTestCase(unittest.TestCase):
+
+    def test_submitted_work_runs(self):
+        pool = background.WorkerPool(2)
+        results = []
+        lock = threading.Lock()
+
+        def work(i):
+            with lock:
+                results.append(i)
+
+        for i in range(10):
+            pool.submit(work, i)
+        pool.join()
+        self.assertEqual(range(10), sorted(results))
+
+    def test_failed_work_doesnt_stop_workers(self):
+        pool = background.WorkerPool(1)
+        results = []
+
+        def fail():
+            raise RuntimeError('failed')
+
+        pool.submit(fail)
+        pool.submit(results.append, 'done')
+        pool.join()
+        self.assertEqual(['done'], results)
+
+
+@attr(client_min_version=2.1, client_max_version=base_test.LATEST_API_VERSION)
+class AsyncBlueprintUploadTestCase(base_test.BaseServerTestCase):
+
+    def setUp(self):
+        super(AsyncBlueprintUploadTestCase, self).setUp()
+        self.worker_pool = MockWorkerPool()
+        patcher = mock.patch('manager_rest.background.get_worker_pool',
+                             return_value=self.worker_pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _put_blueprint_async(self, blueprint_id, blueprint_file_name=None):
+        resource_path, archive_path, query_params = self.put_blueprint_args(
+            blueprint_file_name=blueprint_file_name,
+            blueprint_id=blueprint_id)
+        query_params['async'] = 'true'
+        return self.put_file(resource_path, archive_path, query_params)
+
+    def test_async_upload(self):
+        response = self._put_blueprint_async('bp')
+        self.assertEqual(202, response.status_code)
+        self.assertEqual('bp', response.json['id'])
+        self.assertEqual(models.BlueprintState.UPLOADING,
+                         response.json['status'])
+        self.assertIsNone(response.json['plan'])
+
+        self.worker_pool.run()
+        blueprint = self.get('/blueprints/bp').json
+        self.assertEqual(models.BlueprintState.UPLOADED, blueprint['status'])
+        self.assertIsNone(blueprint['error'])
+        self.assertEqual('blueprint.yaml', blueprint['main_file_name'])
+        self.assertIn('nodes', blueprint['plan'])
+        self.assertEqual(200, self.app.get(self._version_url(
+            '/blueprints/bp/archive')).status_code)
+
+    def test_failed_async_upload(self):
+        self._put_blueprint_async('bp', blueprint_file_name='missing.yaml')
+        self.worker_pool.run()
+        blueprint = self.get('/blueprints/bp').json
+        self.assertEqual(models.BlueprintState.FAILED, blueprint['status'])
+        self.assertIn('missing.yaml', blueprint['error'])
+
+        # failed uploads can be deleted, to be uploaded again
+        response = self.delete('/blueprints/bp')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(404, self.get('/blueprints/bp').status_code)
+
+    def test_deployment_of_uploading_blueprint(self):
+        self._put_blueprint_async('bp')
+        response = self.put('/deployments/dep', {'blueprint_id': 'bp'})
+        self.assertEqual(409, response.status_code)
+
+        self.worker_pool.run()
+        response = self.put('/deployments/dep', {'blueprint_id': 'bp'})
+        self.assertEqual(201, response.status_code)
+
+    def test_delete_uploading_blueprint(self):
+        self._put_blueprint_async('bp')
+        response = self.delete('/blueprints/bp')
+        self.assertEqual(409, response.status_code)
+
+    def test_lost_upload(self):
+        self._put_blueprint_async('bp')
+        # the worker process running the upload is lost, and the upload
+        # makes no further progress
+        self.worker_pool.work = []
+        self.assertEqual(409, self.delete('/blueprints/bp').status_code)
+
+        timeout = config.instance().blueprint_upload_timeout
+        updated_at = datetime.now() - timedelta(seconds=timeout + 1)
+        storage_manager._get_instance().update_blueprint(
+            'bp', {'updated_at': str(updated_at)})
+        blueprint = self.get('/blueprints/bp').json
+        self.assertEqual(models.BlueprintState.FAILED, blueprint['status'])
+        self.assertIn('no progress', blueprint['error'])
+
+        response = self.delete('/blueprints/bp')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(404, self.get('/blueprints/bp').status_code)
+
+    def test_lost_upload_deleted(self):
+        self._put_blueprint_async('bp')
+        self.worker_pool.work = []
+        updated_at = datetime.now() - timedelta(days=1)
+        storage_manager._get_instance().update_blueprint(
+            'bp', {'updated_at': str(updated_at)})
+        self.assertEqual(200, self.delete('/blueprints/bp').status_code)
+
+    def test_sync_upload_status(self):
+        response = self.put_file(*self.put_blueprint_args(blueprint_id='bp'))
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(models.BlueprintState.UPLOADED,
+                         response.json['status'])
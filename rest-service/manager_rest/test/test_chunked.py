@@ -0,0 +1,50 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import unittest
+from StringIO import StringIO
+
+from manager_rest import chunked
+
+
+class ShortReadsStream(object):
+    """A stream returning at most max_read bytes per read, like a socket
+    the data is still arriving on
+    """
+
+    def __init__(self, data, max_read):
+        self._stream = StringIO(data)
+        self._max_read = max_read
+
+    def read(self, size):
+        return self._stream.read(min(size, self._max_read))
+
+
+class ChunkedDecodeTestCase(unittest.TestCase):
+
+    def test_decode_reads_until_end_of_stream(self):
+        data = 'x' * 100000
+        buffers = list(chunked.decode(ShortReadsStream(data, 1000),
+                                      buffer_size=8192))
+        self.assertEqual(data, ''.join(buffers))
+        self.assertEqual(100, len(buffers))
+
+    def test_decode_buffer_size(self):
+        data = 'x' * 1000
+        buffers = list(chunked.decode(StringIO(data), buffer_size=300))
+        self.assertEqual([300, 300, 300, 100], [len(b) for b in buffers])
+
+    def test_decode_empty_stream(self):
+        self.assertEqual([], list(chunked.decode(StringIO(''))))
@@ -0,0 +1,115 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import threading
+import unittest
+
+from nose.plugins.attrib import attr
+
+from manager_rest import coalescing
+from manager_rest.test import base_test
+
+
+class SingleFlightTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.single_flight = coalescing.SingleFlight()
+        self.leader_started = threading.Event()
+        self.leader_may_finish = threading.Event()
+        self.calls = []
+
+    def _leader_call(self, result=None, exception=None):
+        def call():
+            self.calls.append('leader')
+            self.leader_started.set()
+            self.leader_may_finish.wait(5)
+            if exception is not None:
+                raise exception
+            return result
+        return call
+
+    def _follower_call(self):
+        self.calls.append('follower')
+        return 'follower result'
+
+    def _run(self, leader_call, is_shareable=None):
+        results = {}
+
+        def run(name, func):
+            try:
+                results[name] = self.single_flight.do(
+                    'key', func, is_shareable=is_shareable, timeout=5)
+            except Exception, e:
+                results[name] = e
+
+        leader = threading.Thread(target=run, args=('leader', leader_call))
+        leader.start()
+        self.leader_started.wait(5)
+        followers = [threading.Thread(target=run,
+                                      args=(i, self._follower_call))
+                     for i in range(3)]
+        for follower in followers:
+            follower.start()
+        self.leader_may_finish.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        return results
+
+    def test_followers_share_result(self):
+        results = self._run(self._leader_call(result='leader result'))
+        self.assertEqual(['leader'], self.calls)
+        self.assertEqual(set(['leader result']), set(results.values()))
+
+    def test_followers_share_exception(self):
+        error = RuntimeError('failed')
+        results = self._run(self._leader_call(exception=error))
+        self.assertEqual(['leader'], self.calls)
+        self.assertEqual([error] * 4, results.values())
+
+    def test_unshareable_result(self):
+        results = self._run(self._leader_call(result='leader result'),
+                            is_shareable=lambda result: False)
+        self.assertEqual(4, len(self.calls))
+        self.assertEqual('leader result', results.pop('leader'))
+        self.assertEqual(set(['follower result']), set(results.values()))
+
+    def test_results_not_cached(self):
+        self.assertEqual(1, self.single_flight.do('key', lambda: 1))
+        self.assertEqual(2, self.single_flight.do('key', lambda: 2))
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class CoalescedRequestsTestCase(base_test.BaseServerTestCase):
+
+    def create_configuration(self):
+        test_config = super(CoalescedRequestsTestCase,
+                            self).create_configuration()
+        test_config.coalescing_enabled = True
+        return test_config
+
+    def test_get_coalesced_resources(self):
+        (blueprint_id, deployment_id, _, _) = self.put_deployment(
+            deployment_id='d1')
+        self.assertEqual(
+            blueprint_id, self.get('/blueprints/{0}'.format(
+                blueprint_id)).json['id'])
+        self.assertEqual(
+            deployment_id, self.get('/deployments/{0}'.format(
+                deployment_id)).json['id'])
+        self.assertEqual(
+            deployment_id, self.get('/deployments/{0}/outputs'.format(
+                deployment_id)).json['deployment_id'])
+        self.assertEqual(
+            404, self.get('/deployments/no-such-deployment').status_code)
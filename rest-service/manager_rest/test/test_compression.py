@@ -0,0 +1,85 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import json
+import zlib
+
+from nose.plugins.attrib import attr
+
+from manager_rest import compression
+from manager_rest.test import base_test
+
+GZIP_HEADERS = {'Accept-Encoding': 'gzip, deflate'}
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class CompressionTestCase(base_test.BaseServerTestCase):
+
+    def _get(self, resource_path, headers=None):
+        return self.app.get(self._version_url(resource_path), headers=headers)
+
+    def _gunzip(self, data):
+        return json.loads(zlib.decompress(data, compression.GZIP_WBITS))
+
+    def test_blueprint_compressed(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        plain = self._get('/blueprints/bp')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+        compressed = self._get('/blueprints/bp', headers=GZIP_HEADERS)
+        self.assertEqual(200, compressed.status_code)
+        self.assertEqual('gzip', compressed.headers['Content-Encoding'])
+        self.assertIn('Accept-Encoding', compressed.headers['Vary'])
+        self.assertLess(len(compressed.data), len(plain.data))
+        self.assertEqual(json.loads(plain.data),
+                         self._gunzip(compressed.data))
+
+    def test_small_response_not_compressed(self):
+        response = self._get('/version', headers=GZIP_HEADERS)
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('Content-Encoding', response.headers)
+        json.loads(response.data)
+
+    def test_identity_only_not_compressed(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        response = self._get('/blueprints/bp',
+                             headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_streamed_list_compressed(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        response = self._get('/deployments', headers=GZIP_HEADERS)
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+        self.assertNotIn('Content-Length', response.headers)
+        body = self._gunzip(response.data)
+        if isinstance(body, dict):
+            body = body['items']
+        self.assertEqual(['dep'], [d['id'] for d in body])
+
+    def test_compressed_etag_still_matches(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        response = self._get('/blueprints/bp', headers=GZIP_HEADERS)
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        headers = dict(GZIP_HEADERS)
+        headers['If-None-Match'] = etag
+        response = self._get('/blueprints/bp', headers=headers)
+        self.assertEqual(304, response.status_code)
+
+    def test_gzip_iter(self):
+        chunks = ['{"items": [', '1, 2', ', 3]}']
+        compressed = ''.join(compression.gzip_iter(iter(chunks), 6))
+        self.assertEqual({'items': [1, 2, 3]}, self._gunzip(compressed))
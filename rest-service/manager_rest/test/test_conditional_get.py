@@ -0,0 +1,126 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import unittest
+
+import mock
+from nose.plugins.attrib import attr
+
+from manager_rest import etags, models
+from manager_rest.test import base_test
+
+
+def _execution(status, error=''):
+    return models.Execution(id='exec', status=status, deployment_id='dep',
+                            workflow_id='install', blueprint_id='bp',
+                            created_at='now', error=error, parameters={},
+                            is_system_workflow=False)
+
+
+class ListVersionTestCase(unittest.TestCase):
+
+    def test_items_not_serialized(self):
+        with mock.patch.object(models.Execution, 'to_dict') as to_dict:
+            version = etags.list_version([_execution('started')],
+                                         {'pagination': {'total': 1}})
+            self.assertEqual(0, to_dict.call_count)
+        self.assertNotEqual(version, etags.list_version(
+            [_execution('terminated')], {'pagination': {'total': 1}}))
+        self.assertNotEqual(version, etags.list_version(
+            [_execution('started')], {'pagination': {'total': 2}}))
+
+    def test_projected_version_fields(self):
+        # without its version field, an item's projected content is used
+        projected = _execution(None)
+        version = etags.list_version([projected])
+        projected.error = 'failed'
+        self.assertNotEqual(version, etags.list_version([projected]))
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class ConditionalGetTestCase(base_test.BaseServerTestCase):
+
+    def _conditional_get(self, resource_path, etag, query_params=None):
+        return self.app.get(
+            self._version_url(resource_path),
+            headers={'If-None-Match': etag},
+            query_string=base_test.build_query_string(query_params))
+
+    def _assert_not_modified(self, resource_path, query_params=None):
+        response = self.get(resource_path, query_params=query_params)
+        self.assertEqual(200, response.status_code)
+        etag = response.headers['ETag']
+        self.assertTrue(etag)
+
+        response = self._conditional_get(resource_path, etag, query_params)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response.headers['ETag'])
+        self.assertEqual('', response.data)
+        return etag
+
+    def test_blueprint_not_modified(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        self._assert_not_modified('/blueprints/bp')
+
+    def test_deployment_not_modified(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        self._assert_not_modified('/deployments/dep')
+
+    def test_etag_depends_on_projection(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        etag = self._assert_not_modified('/deployments/dep')
+        response = self._conditional_get('/deployments/dep', etag,
+                                         query_params={'_include': 'id'})
+        self.assertEqual(200, response.status_code)
+
+    def test_node_instance_modified(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        node_instance = self.client.node_instances.list(
+            deployment_id='dep')[0]
+        resource_path = '/node-instances/{0}'.format(node_instance.id)
+        etag = self._assert_not_modified(resource_path)
+
+        self.client.node_instances.update(node_instance.id,
+                                          state='started',
+                                          version=0)
+        response = self._conditional_get(resource_path, etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers['ETag'])
+
+    def test_list_not_modified(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        etag = self._assert_not_modified('/deployments')
+
+        self.put_deployment(blueprint_id='bp2', deployment_id='dep2')
+        response = self._conditional_get('/deployments', etag)
+        self.assertEqual(200, response.status_code)
+
+    def test_list_modified(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        node_instance = self.client.node_instances.list(
+            deployment_id='dep')[0]
+        etag = self._assert_not_modified('/node-instances')
+
+        self.client.node_instances.update(node_instance.id,
+                                          state='started',
+                                          version=0)
+        response = self._conditional_get('/node-instances', etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers['ETag'])
+
+    def test_non_matching_etag(self):
+        self.put_deployment(blueprint_id='bp', deployment_id='dep')
+        response = self._conditional_get('/blueprints/bp', '"nope"')
+        self.assertEqual(200, response.status_code)
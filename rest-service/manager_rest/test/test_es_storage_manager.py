@@ -0,0 +1,128 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import json
+import unittest
+
+import mock
+
+from manager_rest import compression, models
+from manager_rest.es_storage_manager import ESStorageManager
+
+PLAN = {
+    'nodes': [{'id': 'node{0}'.format(i), 'properties': {'port': i}}
+              for i in range(100)],
+    'workflow_plugins_to_install': [{'name': 'workflow-plugin'}],
+    'deployment_plugins_to_install': []
+}
+
+
+class MockElasticsearch(object):
+    """Stores documents of a single type, honouring _source filtering"""
+
+    def __init__(self):
+        self.docs = {}
+
+    @staticmethod
+    def _filter_source(source, fields):
+        if fields is None or fields is True:
+            return dict(source)
+        return {field: source[field] for field in fields if field in source}
+
+    def create(self, index, doc_type, id, body, **kwargs):
+        # what would be sent to elasticsearch
+        self.docs[id] = json.loads(json.dumps(body))
+
+    def update(self, index, doc_type, id, body, **kwargs):
+        self.docs[id].update(json.loads(json.dumps(body['doc'])))
+
+    def get(self, index, doc_type, id, _source=None):
+        return {'_id': id,
+                '_source': self._filter_source(self.docs[id], _source)}
+
+    def search(self, index, doc_type, body, _source):
+        hits = [{'_id': doc_id,
+                 '_source': self._filter_source(doc, _source)}
+                for doc_id, doc in self.docs.iteritems()]
+        return {'hits': {'hits': hits, 'total': len(hits)}}
+
+
+class CompressedPlanStorageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.es = MockElasticsearch()
+        patcher = mock.patch.object(ESStorageManager, '_connection',
+                                    new=self.es)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sm = ESStorageManager('localhost', 9200)
+
+    def _put_blueprint(self, plan):
+        self.sm.put_blueprint('bp', models.BlueprintState(
+            id='bp', plan=plan, description=None, created_at='now',
+            updated_at='now', main_file_name='blueprint.yaml'))
+
+    def test_plan_stored_compressed(self):
+        self._put_blueprint(PLAN)
+        doc = self.es.docs['bp']
+        self.assertNotIn('plan', doc)
+        self.assertEqual(PLAN, compression.decompress_json(
+            doc['compressed_plan']))
+        self.assertLess(len(doc['compressed_plan']), len(json.dumps(PLAN)))
+
+        blueprint = self.sm.get_blueprint('bp')
+        self.assertEqual(PLAN, blueprint.plan)
+        self.assertEqual(PLAN, self.sm.blueprints_list().items[0].plan)
+
+    def test_plan_decompressed_on_access(self):
+        self._put_blueprint(PLAN)
+        blueprint = self.sm.get_blueprint('bp')
+        with mock.patch('manager_rest.compression.decompress_json',
+                        wraps=compression.decompress_json) as decompress:
+            self.assertEqual(
+                [{'name': 'workflow-plugin'}],
+                blueprint.get_plan_value('workflow_plugins_to_install'))
+            self.assertEqual(0, decompress.call_count)
+            self.assertEqual(PLAN['nodes'], blueprint.plan['nodes'])
+            self.assertEqual(PLAN['nodes'], blueprint.plan['nodes'])
+            self.assertEqual(1, decompress.call_count)
+
+    def test_include(self):
+        self._put_blueprint(PLAN)
+        blueprint = self.sm.get_blueprint('bp', include=['id', 'plan'])
+        self.assertEqual(PLAN, blueprint.plan)
+        blueprint = self.sm.get_blueprint('bp', include=['id'])
+        self.assertEqual('bp', blueprint.id)
+        self.assertIsNone(blueprint.plan)
+
+    def test_update_plan(self):
+        self._put_blueprint(None)
+        self.assertNotIn('compressed_plan', self.es.docs['bp'])
+        self.assertIsNone(self.sm.get_blueprint('bp').plan)
+        self.sm.update_blueprint('bp', {'plan': PLAN})
+        self.assertEqual(PLAN, self.sm.get_blueprint('bp').plan)
+
+    def test_uncompressed_plan(self):
+        # as stored before plans were compressed
+        self.es.docs['bp'] = {
+            'id': 'bp', 'plan': PLAN, 'description': None,
+            'created_at': 'now', 'updated_at': 'now',
+            'main_file_name': 'blueprint.yaml'
+        }
+        blueprint = self.sm.get_blueprint('bp', include=['id', 'plan'])
+        self.assertEqual(PLAN, blueprint.plan)
+        self.assertEqual(
+            [{'name': 'workflow-plugin'}],
+            blueprint.get_plan_value('workflow_plugins_to_install'))
@@ -57,6 +57,40 @@ class ExecutionsTestCase(BaseServerTestCase):
 
         return execution
 
+    def test_execute_without_blueprint(self):
+        (blueprint_id, deployment_id, blueprint_response,
+         deployment_response) = self.put_deployment(self.DEPLOYMENT_ID)
+        sm = storage_manager._get_instance()
+        deployment = sm.get_deployment(deployment_id)
+        self.assertEquals(
+            sm.get_blueprint(blueprint_id).plan['workflow_plugins_to_install'],
+            deployment.workflow_plugins_to_install)
+
+        with mock.patch.object(type(sm), 'get_blueprint',
+                               side_effect=AssertionError('blueprint read')):
+            execution = self.client.executions.start(deployment_id, 'install')
+        self.assertEquals('terminated',
+                          self.client.executions.get(execution.id).status)
+
+    def test_execute_migrates_deployment_plugins(self):
+        (blueprint_id, deployment_id, blueprint_response,
+         deployment_response) = self.put_deployment(self.DEPLOYMENT_ID)
+        sm = storage_manager._get_instance()
+        plan = sm.get_blueprint(blueprint_id).plan
+        # as stored before the plugins were copied onto deployments
+        sm.update_deployment(deployment_id, {
+            'workflow_plugins_to_install': None,
+            'deployment_plugins_to_install': None})
+
+        execution = self.client.executions.start(deployment_id, 'install')
+        self.assertEquals('terminated',
+                          self.client.executions.get(execution.id).status)
+        deployment = sm.get_deployment(deployment_id)
+        self.assertEquals(plan['workflow_plugins_to_install'],
+                          deployment.workflow_plugins_to_install)
+        self.assertEquals(plan['deployment_plugins_to_install'],
+                          deployment.deployment_plugins_to_install)
+
     def test_list_system_executions(self):
         (blueprint_id, deployment_id, blueprint_response,
          deployment_response) = self.put_deployment(self.DEPLOYMENT_ID)
@@ -13,18 +13,37 @@
 #  * See the License for the specific language governing permissions and
 #  * limitations under the License.
 
+import os
+import shutil
+import tempfile
+import unittest
+
 import mock
+import requests
 from nose.plugins.attrib import attr
 
+from manager_rest import config, import_resolver
 from manager_rest.test import base_test
 from cloudify_rest_client.exceptions import CloudifyClientError
 from dsl_parser import constants
+from dsl_parser.exceptions import DSLParsingLogicException
 from dsl_parser.utils import ResolverInstantiationError
 
+TYPES_URL = 'http://www.example.com/spec/types.yaml'
+
 
 @attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
 class UploadBlueprtinsWithImportResolverTests(base_test.BaseServerTestCase):
 
+    def create_configuration(self):
+        test_config = super(UploadBlueprtinsWithImportResolverTests,
+                            self).create_configuration()
+        # the parser is mocked, so its results mustn't be cached, and it
+        # must be called in this process
+        test_config.dsl_parse_cache_max_size = 0
+        test_config.parser_processes = 0
+        return test_config
+
     def _create_resolver_section(self, resolver_impl=None, resolver_params=[]):
         resolver_section = {}
         if resolver_impl:
@@ -100,3 +119,132 @@ class UploadBlueprtinsWithImportResolverTests(base_test.BaseServerTestCase):
                 self.fail('CloudifyClientError expected')
             except CloudifyClientError, ex:
                 self.assertIn(err_msg, str(ex))
+
+
+class CachingImportResolverTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        patcher = mock.patch('requests.get')
+        self.mock_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_resolver(self, **kwargs):
+        return import_resolver.CachingImportResolver(
+            cache_dir=self.cache_dir, **kwargs)
+
+    def _response(self, status_code, text=u'', headers=None):
+        return mock.Mock(status_code=status_code, text=text,
+                         headers=headers or {})
+
+    def test_import_cached_and_revalidated(self):
+        resolver = self._create_resolver()
+        self.mock_get.return_value = self._response(
+            200, u'types', headers={'ETag': '"v1"'})
+        self.assertEqual(u'types', resolver.fetch_import(TYPES_URL))
+
+        self.mock_get.return_value = self._response(304)
+        self.assertEqual(u'types', resolver.fetch_import(TYPES_URL))
+        self.assertEqual({'If-None-Match': '"v1"'},
+                         self.mock_get.call_args[1]['headers'])
+
+        self.mock_get.return_value = self._response(
+            200, u'new types', headers={'ETag': '"v2"'})
+        self.assertEqual(u'new types', resolver.fetch_import(TYPES_URL))
+
+    def test_offline_fallback(self):
+        resolver = self._create_resolver()
+        self.mock_get.return_value = self._response(200, u'types')
+        resolver.fetch_import(TYPES_URL)
+
+        self.mock_get.side_effect = requests.ConnectionError('offline')
+        self.assertEqual(u'types', resolver.fetch_import(TYPES_URL))
+        self.mock_get.side_effect = None
+        self.mock_get.return_value = self._response(503)
+        self.assertEqual(u'types', resolver.fetch_import(TYPES_URL))
+
+        resolver = self._create_resolver(offline_fallback=False)
+        self.assertRaises(DSLParsingLogicException,
+                          resolver.fetch_import, TYPES_URL)
+
+    def test_failed_import_not_cached(self):
+        resolver = self._create_resolver()
+        self.mock_get.return_value = self._response(404)
+        self.assertRaises(DSLParsingLogicException,
+                          resolver.fetch_import, TYPES_URL)
+        self.mock_get.side_effect = requests.ConnectionError('offline')
+        self.assertRaises(DSLParsingLogicException,
+                          resolver.fetch_import, TYPES_URL)
+
+    def test_rules(self):
+        mirror_url = 'http://mirror/spec/types.yaml'
+        resolver = self._create_resolver(
+            rules=[{'http://www.example.com/': 'http://mirror/'}])
+        self.mock_get.side_effect = lambda url, **kwargs: \
+            self._response(200, u'types') if url == mirror_url \
+            else self._response(404)
+        self.assertEqual(u'types', resolver.fetch_import(TYPES_URL))
+        self.assertEqual([mirror_url],
+                         [c[0][0] for c in self.mock_get.call_args_list])
+
+    def test_warmup(self):
+        types_file = os.path.join(self.cache_dir, 'types.yaml')
+        with open(types_file, 'w') as f:
+            f.write('warmed up types')
+        resolver = self._create_resolver(warmup={TYPES_URL: types_file})
+        self.mock_get.side_effect = requests.ConnectionError('offline')
+        self.assertEqual(u'warmed up types',
+                         resolver.fetch_import(TYPES_URL))
+        self.assertIn('If-Modified-Since',
+                      self.mock_get.call_args[1]['headers'])
+
+    def test_warmup_urls(self):
+        self.mock_get.return_value = self._response(200, u'types')
+        with mock.patch('manager_rest.background.get_worker_pool') as \
+                get_worker_pool:
+            get_worker_pool.return_value.submit.side_effect = \
+                lambda func, *args: func(*args)
+            self._create_resolver(warmup_urls=[TYPES_URL])
+            self.assertEqual([TYPES_URL],
+                             [c[0][0] for c in self.mock_get.call_args_list])
+
+            # cached imports aren't fetched again
+            resolver = self._create_resolver(warmup_urls=[TYPES_URL])
+            self.assertEqual(1, self.mock_get.call_count)
+
+        self.mock_get.side_effect = requests.ConnectionError('offline')
+        self.assertEqual(u'types', resolver.fetch_import(TYPES_URL))
+
+    def test_default_warmup(self):
+        types_file = os.path.join(self.cache_dir, 'resources',
+                                  import_resolver.TYPES_RESOURCE_PATH)
+        os.makedirs(os.path.dirname(types_file))
+        with open(types_file, 'w') as f:
+            f.write('manager types')
+        with mock.patch.object(config.instance(), '_file_server_root',
+                               os.path.join(self.cache_dir, 'resources')), \
+                mock.patch('manager_rest.import_resolver.get_version',
+                           return_value='3.4.0-m3'):
+            resolver = self._create_resolver()
+        self.mock_get.side_effect = requests.ConnectionError('offline')
+        self.assertEqual(u'manager types', resolver.fetch_import(
+            'http://www.getcloudify.org/spec/cloudify/3.4m3/types.yaml'))
+
+    def test_types_spec_version(self):
+        self.assertEqual('3.4', import_resolver.get_types_spec_version(
+            '3.4.0'))
+        self.assertEqual('3.4m3', import_resolver.get_types_spec_version(
+            '3.4.0-m3'))
+        self.assertEqual('3.3.1', import_resolver.get_types_spec_version(
+            '3.3.1'))
+
+    def test_cache_dir_owned_by_another_user(self):
+        with mock.patch('os.getuid', return_value=os.getuid() + 1):
+            resolver = self._create_resolver()
+        self.mock_get.return_value = self._response(200, u'types')
+        self.assertEqual(u'types', resolver.fetch_import(TYPES_URL))
+        self.assertEqual([], os.listdir(self.cache_dir))
+        self.mock_get.side_effect = requests.ConnectionError('offline')
+        self.assertRaises(DSLParsingLogicException,
+                          resolver.fetch_import, TYPES_URL)
@@ -0,0 +1,63 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+#
+
+import json
+
+from nose.plugins.attrib import attr
+
+from manager_rest import streaming
+from manager_rest.test import base_test
+from manager_rest.test.base_list_test import BaseListTest
+
+
+@attr(client_min_version=2, client_max_version=base_test.LATEST_API_VERSION)
+class ListStreamingTestCase(BaseListTest):
+
+    def test_list_response_is_streamed(self):
+        self._put_n_deployments(id_prefix='test', number_of_deployments=2)
+        response = self.app.get(self._version_url('/node-instances'))
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual('application/json', response.mimetype)
+        body = json.loads(response.data)
+        self.assertEqual(4, len(body['items']))
+        self.assertEqual(4, body['metadata']['pagination']['total'])
+
+    def test_streamed_list_with_include(self):
+        self._put_n_deployments(id_prefix='test', number_of_deployments=1)
+        response = self.get('/node-instances',
+                            query_params={'_include': 'id,state'})
+        for node_instance in response.json['items']:
+            self.assertEqual({'id', 'state'}, set(node_instance.keys()))
+
+    def test_stream_json_list(self):
+        items = [{'id': str(i)} for i in range(100)]
+        chunks = list(streaming.stream_json_list(list(items),
+                                                 metadata={'a': 1},
+                                                 chunk_size=128))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual({'items': items, 'metadata': {'a': 1}},
+                         json.loads(''.join(chunks)))
+
+    def test_stream_json_list_without_envelope(self):
+        body = ''.join(streaming.stream_json_list(
+            [1, 2, 3], serialize_item=lambda item: item * 2, envelope=False))
+        self.assertEqual([2, 4, 6], json.loads(body))
+
+    def test_iter_list_items_releases_items(self):
+        items = [1, 2, 3]
+        self.assertEqual([1, 2, 3], list(streaming.iter_list_items(items)))
+        self.assertEqual([], items)
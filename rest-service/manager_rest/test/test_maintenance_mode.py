@@ -202,6 +202,28 @@ class MaintenanceModeTest(BaseServerTestCase):
                           blueprint_id='b1',
                           deployment_id='d1')
 
+    def test_activation_finishes_when_executions_end(self):
+        execution = self._start_maintenance_transition_mode()
+        self.client.executions.update(execution.id, 'terminated')
+        response = self.client.maintenance_mode.status()
+        self.assertEqual(MAINTENANCE_MODE_ACTIVE, response.status)
+
+    def test_maintenance_state_changed_externally(self):
+        self._activate_maintenance_mode()
+        maintenance_file = os.path.join(self.maintenance_mode_dir,
+                                        MAINTENANCE_MODE_STATUS_FILE)
+        # simulates another rest service worker deactivating maintenance
+        # mode, after this worker cached the state
+        os.remove(maintenance_file)
+        self.client.blueprints.list()
+        response = self.client.maintenance_mode.status()
+        self.assertEqual(NOT_IN_MAINTENANCE_MODE, response.status)
+
+        with open(maintenance_file, 'w') as f:
+            f.write(MAINTENANCE_MODE_ACTIVE)
+        self.assertRaises(exceptions.MaintenanceModeActiveError,
+                          self.client.blueprints.list)
+
     def _activate_maintenance_mode(self):
         self.client.maintenance_mode.activate()
         self.client.maintenance_mode.status()
@@ -218,6 +240,7 @@ class MaintenanceModeTest(BaseServerTestCase):
         self.client.maintenance_mode.activate()
         response = self.client.maintenance_mode.status()
         self.assertEqual(ACTIVATING_MAINTENANCE_MODE, response.status)
+        return execution
 
     def _activate_and_deactivate_maintenance_mode(self):
         self._activate_maintenance_mode()
@@ -0,0 +1,174 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from nose.plugins.attrib import attr
+
+from manager_rest import metrics
+from manager_rest.test import base_test
+
+
+@attr(client_min_version=2.1,
+      client_max_version=base_test.LATEST_API_VERSION)
+class MetricsTestCase(base_test.BaseServerTestCase):
+
+    def setUp(self):
+        super(MetricsTestCase, self).setUp()
+        metrics.registry.reset()
+
+    def create_configuration(self):
+        test_config = super(MetricsTestCase, self).create_configuration()
+        test_config.metrics_enabled = True
+        return test_config
+
+    def _get_metrics(self):
+        response = self.app.get(self._version_url('/metrics'))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(metrics.PROMETHEUS_CONTENT_TYPE,
+                         response.headers['Content-Type'])
+        return response.data.splitlines()
+
+    def test_request_metrics(self):
+        self.client.blueprints.list()
+        self.assertEqual(404, self.get('/blueprints/no-such-bp').status_code)
+
+        lines = self._get_metrics()
+        self.assertIn('# TYPE manager_rest_request_duration_seconds '
+                      'histogram', lines)
+        list_labels = 'endpoint="v2.1/blueprints",method="GET",status="200"'
+        self.assertIn('manager_rest_request_duration_seconds_count'
+                      '{{{0}}} 1'.format(list_labels), lines)
+        self.assertIn('manager_rest_request_duration_seconds_bucket'
+                      '{{{0},le="+Inf"}} 1'.format(list_labels), lines)
+        self.assertIn(
+            'manager_rest_request_duration_seconds_count'
+            '{endpoint="v2.1/blueprints/<string:blueprint_id>",'
+            'method="GET",status="404"} 1', lines)
+
+    def test_storage_metrics(self):
+        self.client.blueprints.list()
+        lines = self._get_metrics()
+        self.assertIn('manager_rest_request_storage_calls_total'
+                      '{endpoint="v2.1/blueprints",method="GET"} 1.0', lines)
+        self.assertIn('manager_rest_storage_call_duration_seconds_count'
+                      '{operation="blueprints_list"} 1', lines)
+
+    def test_upload_metrics(self):
+        self.put_file(*self.put_blueprint_args())
+        lines = self._get_metrics()
+        self.assertIn('manager_rest_upload_duration_seconds_count'
+                      '{kind="blueprint"} 1', lines)
+        self.assertTrue([line for line in lines if line.startswith(
+            'manager_rest_upload_bytes_total{kind="blueprint"} ')])
+
+    def test_histogram(self):
+        histogram = metrics.Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+        self.assertEqual([2, 1, 1], histogram.counts)
+        self.assertEqual(4, histogram.count)
+        self.assertAlmostEqual(2.65, histogram.sum)
+
+
+@attr(client_min_version=2.1,
+      client_max_version=base_test.LATEST_API_VERSION)
+class MetricsDisabledTestCase(base_test.BaseServerTestCase):
+
+    def test_metrics_disabled(self):
+        response = self.app.get(self._version_url('/metrics'))
+        self.assertEqual(404, response.status_code)
+
+
+class MetricsAggregationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir)
+
+    def _registry(self):
+        registry = metrics.MetricsRegistry()
+        registry.configure(self.metrics_dir)
+        return registry
+
+    def _observe_request(self, registry, status=200):
+        registry.observe_request('v2.1/blueprints', 'GET', status, 0.01,
+                                 storage_calls=1, storage_duration=0.005)
+
+    def _simulate_other_worker(self, registry, pid):
+        # the registry's file is renamed, as if it was written by another
+        # worker process
+        registry.flush(force=True)
+        os.rename(registry._file_path(os.getpid()),
+                  registry._file_path(pid))
+
+    def test_workers_metrics_aggregated(self):
+        other_worker = self._registry()
+        self._observe_request(other_worker)
+        self._observe_request(other_worker, status=404)
+        self._simulate_other_worker(other_worker, os.getppid())
+
+        registry = self._registry()
+        self._observe_request(registry)
+        lines = registry.to_prometheus().splitlines()
+        labels = 'endpoint="v2.1/blueprints",method="GET"'
+        self.assertIn('manager_rest_request_duration_seconds_count'
+                      '{{{0},status="200"}} 2'.format(labels), lines)
+        self.assertIn('manager_rest_request_duration_seconds_count'
+                      '{{{0},status="404"}} 1'.format(labels), lines)
+        self.assertIn('manager_rest_request_storage_calls_total'
+                      '{{{0}}} 3.0'.format(labels), lines)
+
+    def test_exited_workers_metrics_removed(self):
+        exited_worker = subprocess.Popen(['true'])
+        exited_worker.wait()
+        other_worker = self._registry()
+        self._observe_request(other_worker)
+        self._simulate_other_worker(other_worker, exited_worker.pid)
+
+        registry = self._registry()
+        self.assertNotIn('manager_rest_request_duration_seconds_count'
+                         '{endpoint="v2.1/blueprints",method="GET",'
+                         'status="200"} 1',
+                         registry.to_prometheus().splitlines())
+        self.assertFalse(os.path.exists(
+            registry._file_path(exited_worker.pid)))
+
+    def test_replacing_worker_continues_counters(self):
+        registry = self._registry()
+        self._observe_request(registry)
+        registry.flush(force=True)
+
+        # a new process with the same pid starts from the file's metrics
+        replacing_worker = self._registry()
+        self._observe_request(replacing_worker)
+        self.assertIn('manager_rest_request_duration_seconds_count'
+                      '{endpoint="v2.1/blueprints",method="GET",'
+                      'status="200"} 2',
+                      replacing_worker.to_prometheus().splitlines())
+
+    def test_flush_interval(self):
+        registry = self._registry()
+        self._observe_request(registry)
+        registry.flush(force=True)
+        self._observe_request(registry)
+        registry.flush()
+        state = registry._read_file(registry._file_path(os.getpid()))
+        self.assertEqual(
+            1, state['request_durations'][0][1]['count'])
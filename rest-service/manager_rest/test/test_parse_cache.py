@@ -0,0 +1,149 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import json
+import stat
+import shutil
+import tempfile
+import unittest
+
+import mock
+from nose.plugins.attrib import attr
+
+from manager_rest import parse_cache, utils
+from manager_rest.test import base_test
+
+APP_DIR_URL = 'http://localhost/app-1/'
+TYPES_URL = 'http://localhost/cloudify/types.yaml'
+
+
+class MockResolver(object):
+
+    def __init__(self, imports):
+        self.imports = imports
+
+    def fetch_import(self, import_url):
+        return self.imports[import_url]
+
+
+class ParseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.cache = parse_cache.ParseCache(self.cache_dir, 1024 * 1024)
+        self.resolver = MockResolver({
+            TYPES_URL: 'types',
+            APP_DIR_URL + 'imported.yaml': 'imported'
+        })
+        self.key = parse_cache.get_cache_key(
+            'main file', 'blueprint.yaml', 'http://localhost/', {})
+        self._put(self.key, {'nodes': []})
+
+    def _put(self, key, plan):
+        recording_resolver = parse_cache.RecordingImportResolver(
+            self.resolver)
+        for import_url in sorted(self.resolver.imports):
+            recording_resolver.fetch_import(import_url)
+        self.cache.put(key, plan, recording_resolver.imports, APP_DIR_URL)
+
+    def test_cache_hit(self):
+        self.assertEqual({'nodes': []},
+                         self.cache.get(self.key, self.resolver, APP_DIR_URL))
+
+    def test_cache_key(self):
+        self.assertNotEqual(self.key, parse_cache.get_cache_key(
+            'changed main file', 'blueprint.yaml', 'http://localhost/', {}))
+        self.assertNotEqual(self.key, parse_cache.get_cache_key(
+            'main file', 'blueprint.yaml', 'http://localhost/',
+            {'validate_definitions_version': False}))
+
+    def test_changed_import(self):
+        self.resolver.imports[TYPES_URL] = 'changed types'
+        self.assertIsNone(
+            self.cache.get(self.key, self.resolver, APP_DIR_URL))
+
+    def test_failed_import(self):
+        del self.resolver.imports[TYPES_URL]
+        self.assertIsNone(
+            self.cache.get(self.key, self.resolver, APP_DIR_URL))
+
+    def test_imports_relative_to_application_dir(self):
+        other_app_dir_url = 'http://localhost/app-2/'
+        self.resolver.imports[other_app_dir_url + 'imported.yaml'] = \
+            'imported'
+        self.assertEqual(
+            {'nodes': []},
+            self.cache.get(self.key, self.resolver, other_app_dir_url))
+        self.resolver.imports[other_app_dir_url + 'imported.yaml'] = \
+            'changed imported'
+        self.assertIsNone(
+            self.cache.get(self.key, self.resolver, other_app_dir_url))
+
+    def test_eviction(self):
+        entry_size = os.path.getsize(
+            os.path.join(self.cache_dir, self.key + '.plan'))
+        self.cache.max_size = entry_size * 2
+        os.utime(os.path.join(self.cache_dir, self.key + '.plan'), (1, 1))
+        keys = [parse_cache.get_cache_key(
+            'main file {0}'.format(i), 'blueprint.yaml',
+            'http://localhost/', {}) for i in range(2)]
+        for key in keys:
+            self._put(key, {'nodes': []})
+        self.assertIsNone(
+            self.cache.get(self.key, self.resolver, APP_DIR_URL))
+        for key in keys:
+            self.assertIsNotNone(
+                self.cache.get(key, self.resolver, APP_DIR_URL))
+
+    def test_entries_stored_as_json(self):
+        with open(os.path.join(self.cache_dir, self.key + '.plan')) as f:
+            self.assertEqual({'nodes': []}, json.load(f)['plan'])
+
+    def test_cache_dir_made_private(self):
+        os.chmod(self.cache_dir, 0777)
+        utils.create_private_dir(self.cache_dir)
+        self.assertEqual(0700, stat.S_IMODE(os.stat(self.cache_dir).st_mode))
+
+    def test_cache_dir_owned_by_another_user(self):
+        with mock.patch('os.getuid', return_value=os.getuid() + 1):
+            self.assertRaises(utils.UnsafeDirectoryError,
+                              utils.create_private_dir, self.cache_dir)
+            self.assertRaises(utils.UnsafeDirectoryError, self._put,
+                              self.key, {'nodes': []})
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class CachedBlueprintParsingTestCase(base_test.BaseServerTestCase):
+
+    def create_configuration(self):
+        test_config = super(CachedBlueprintParsingTestCase,
+                            self).create_configuration()
+        # parse_dsl's calls are counted in this process
+        test_config.parser_processes = 0
+        return test_config
+
+    def test_identical_blueprint_parsed_once(self):
+        from dsl_parser import tasks
+        with mock.patch('dsl_parser.tasks.parse_dsl',
+                        wraps=tasks.parse_dsl) as parse_dsl:
+            first = self.put_file(
+                *self.put_blueprint_args(blueprint_id='bp1')).json
+            second = self.put_file(
+                *self.put_blueprint_args(blueprint_id='bp2')).json
+        self.assertEqual(1, parse_dsl.call_count)
+        self.assertEqual('bp2', second['id'])
+        self.assertEqual(first['plan'], second['plan'])
@@ -0,0 +1,116 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import time
+import unittest
+
+from dsl_parser.exceptions import DSLParsingLogicException
+
+from manager_rest import config, process_pool
+
+
+def _add(a, b):
+    return a + b
+
+
+def _get_pid():
+    return os.getpid()
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+
+
+def _allocate(size):
+    return len(' ' * size)
+
+
+def _raise_parsing_error():
+    raise DSLParsingLogicException(13, 'failed parsing')
+
+
+class ProcessPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = process_pool.ProcessPool(
+            1, timeout=1, memory_limit=1024 * 1024 * 1024)
+        self.addCleanup(self.pool.stop)
+
+    def test_apply(self):
+        self.assertEqual(3, self.pool.apply(_add, 1, b=2))
+        pid = self.pool.apply(_get_pid)
+        self.assertNotEqual(os.getpid(), pid)
+        # workers are reused
+        self.assertEqual(pid, self.pool.apply(_get_pid))
+
+    def test_exception(self):
+        try:
+            self.pool.apply(_raise_parsing_error)
+            self.fail('Expected a DSLParsingLogicException')
+        except DSLParsingLogicException, e:
+            self.assertEqual(13, e.err_code)
+            self.assertEqual('failed parsing', str(e))
+
+    def test_timeout(self):
+        pid = self.pool.apply(_get_pid)
+        self.assertRaises(process_pool.TaskTimeoutError,
+                          self.pool.apply, _sleep, 5)
+        # the worker is replaced
+        self.assertNotEqual(pid, self.pool.apply(_get_pid))
+
+    def test_memory_limit(self):
+        pid = self.pool.apply(_get_pid)
+        self.assertRaises(process_pool.TaskMemoryLimitError,
+                          self.pool.apply, _allocate, 2 * 1024 * 1024 * 1024)
+        self.assertNotEqual(pid, self.pool.apply(_get_pid))
+        self.assertEqual(1024, self.pool.apply(_allocate, 1024))
+
+    def test_unpicklable_task(self):
+        self.assertRaises(process_pool.UnpicklableTaskError,
+                          self.pool.apply, _add, 1, lambda: 2)
+
+    def test_stopped_pool_stops_returned_workers(self):
+        worker = process_pool._Worker(None)
+        self.pool.stop()
+        self.pool._return_worker(worker)
+        self.assertFalse(worker.process.is_alive())
+
+
+class ProcessPoolResetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        original_config = config.instance()
+        self.addCleanup(config.reset, original_config)
+        self.addCleanup(process_pool.reset)
+
+    def _reset_config(self, timeout):
+        test_config = config.Config()
+        test_config.parser_processes = 1
+        test_config.parser_process_timeout = timeout
+        config.reset(test_config)
+        process_pool.reset()
+
+    def test_reset(self):
+        self._reset_config(timeout=10)
+        pool = process_pool.get_process_pool()
+        pid = process_pool.apply(_get_pid)
+        self.assertEqual(10, pool.timeout)
+
+        self._reset_config(timeout=20)
+        self.assertEqual(20, process_pool.get_process_pool().timeout)
+        # the previous pool's workers are stopped
+        self.assertEqual([], pool._idle_workers)
+        self.assertNotEqual(pid, process_pool.apply(_get_pid))
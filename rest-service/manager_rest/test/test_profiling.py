@@ -0,0 +1,127 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import json
+import shutil
+import tempfile
+import unittest
+
+from nose.plugins.attrib import attr
+
+from manager_rest import config, profiling
+from manager_rest.test import base_test
+
+PROFILING_TOKEN = 'profile-me'
+
+
+@attr(client_min_version=2.1,
+      client_max_version=base_test.LATEST_API_VERSION)
+class ProfilingTestCase(base_test.BaseServerTestCase):
+
+    def setUp(self):
+        super(ProfilingTestCase, self).setUp()
+        profiling.store.clear()
+
+    def create_configuration(self):
+        test_config = super(ProfilingTestCase, self).create_configuration()
+        test_config.profiling_token = PROFILING_TOKEN
+        test_config.profiling_top_n = 2
+        return test_config
+
+    def _profiled_get(self, resource_path, token=PROFILING_TOKEN):
+        return self.get(resource_path,
+                        headers={profiling.PROFILE_HEADER: token})
+
+    def _list_profiles(self, endpoint=None):
+        query_params = {'endpoint': endpoint} if endpoint else None
+        response = self.get('/profiles', query_params=query_params)
+        self.assertEqual(200, response.status_code)
+        return response.json
+
+    def test_profiled_request(self):
+        self._profiled_get('/blueprints')
+        profiles = self._list_profiles()
+        self.assertEqual(1, len(profiles))
+        self.assertEqual('v2.1/blueprints', profiles[0]['endpoint'])
+        self.assertEqual('GET', profiles[0]['method'])
+        self.assertIn('cumulative', profiles[0]['stats'])
+        self.assertGreater(profiles[0]['duration'], 0)
+
+    def test_request_not_profiled(self):
+        self.get('/blueprints')
+        self._profiled_get('/blueprints', token='wrong-token')
+        self.assertEqual([], self._list_profiles())
+
+    def test_top_profiles_kept_per_endpoint(self):
+        for _ in range(4):
+            self._profiled_get('/blueprints')
+        self._profiled_get('/deployments')
+        self.assertEqual(3, len(self._list_profiles()))
+        profiles = self._list_profiles(endpoint='v2.1/blueprints')
+        self.assertEqual(2, len(profiles))
+        self.assertGreaterEqual(profiles[0]['duration'],
+                                profiles[1]['duration'])
+
+    def test_profiling_enabled_at_runtime(self):
+        config.instance().profiling_token = None
+        self._profiled_get('/blueprints')
+        self.assertEqual([], self._list_profiles())
+        config.instance().profiling_token = PROFILING_TOKEN
+        self._profiled_get('/blueprints')
+        self.assertEqual(1, len(self._list_profiles()))
+
+    def test_delete_profiles(self):
+        self._profiled_get('/blueprints')
+        response = self.app.delete(self._version_url('/profiles'))
+        self.assertEqual(1, len(json.loads(response.data)))
+        self.assertEqual([], self._list_profiles())
+
+
+class ProfileStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.profiles_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiles_dir)
+
+    def _add(self, store, endpoint, duration, top_n=2):
+        store.add(profiling.RequestProfile(endpoint=endpoint,
+                                           method='GET',
+                                           path='/' + endpoint,
+                                           duration=duration,
+                                           stats=''),
+                  top_n)
+
+    def test_profiles_shared_between_workers(self):
+        # each worker process has a store of its own
+        worker_store = profiling.ProfileStore(self.profiles_dir)
+        other_worker_store = profiling.ProfileStore(self.profiles_dir)
+        self._add(worker_store, 'blueprints', 0.5)
+        self._add(other_worker_store, 'blueprints', 1.5)
+        self._add(other_worker_store, 'deployments', 1.0)
+        self.assertEqual([1.5, 1.0, 0.5],
+                         [p.duration for p in worker_store.list()])
+        worker_store.clear('blueprints')
+        self.assertEqual(['deployments'],
+                         [p.endpoint for p in other_worker_store.list()])
+
+    def test_slowest_profiles_kept(self):
+        store = profiling.ProfileStore(self.profiles_dir)
+        for duration in (0.3, 2.0, 0.1, 1.0):
+            self._add(store, 'blueprints', duration)
+        self.assertEqual([2.0, 1.0],
+                         [p.duration for p in store.list('blueprints')])
+        self.assertFalse(store.is_kept('blueprints', 0.5, top_n=2))
+        self.assertTrue(store.is_kept('blueprints', 1.5, top_n=2))
+        self.assertTrue(store.is_kept('deployments', 0.1, top_n=2))
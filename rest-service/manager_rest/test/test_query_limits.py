@@ -0,0 +1,130 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import unittest
+
+from nose.plugins.attrib import attr
+
+from manager_rest import manager_exceptions
+from manager_rest import query_limits
+from manager_rest.manager_elasticsearch import ManagerElasticsearch
+from manager_rest.test import base_test
+
+LIMITS = dict(query_limits.DEFAULT_LIMITS,
+              max_size=100,
+              max_result_window=1000,
+              timeout_ms=5000,
+              terminate_after=10000,
+              max_aggregations=2,
+              max_aggregation_size=50)
+
+
+class QueryLimitsTestCase(unittest.TestCase):
+
+    def _assert_rejected(self, body):
+        self.assertRaises(manager_exceptions.QueryNotAllowedError,
+                          query_limits.apply_limits, body, LIMITS)
+
+    def test_limits_added(self):
+        body = {'query': {'match_all': {}}}
+        applied = query_limits.apply_limits(body, LIMITS)
+        self.assertEqual('5000ms', body['timeout'])
+        self.assertEqual(10000, body['terminate_after'])
+        self.assertEqual({'max_size': 100,
+                          'max_result_window': 1000,
+                          'timeout': '5000ms',
+                          'terminate_after': 10000}, applied)
+
+    def test_limits_lowered(self):
+        body = {'size': 500, 'timeout': '1m', 'terminate_after': 20000}
+        query_limits.apply_limits(body, LIMITS)
+        self.assertEqual(100, body['size'])
+        self.assertEqual('5000ms', body['timeout'])
+        self.assertEqual(10000, body['terminate_after'])
+
+    def test_stricter_client_limits_kept(self):
+        body = {'size': 5, 'timeout': '2s', 'terminate_after': 10}
+        query_limits.apply_limits(body, LIMITS)
+        self.assertEqual(5, body['size'])
+        self.assertEqual('2000ms', body['timeout'])
+        self.assertEqual(10, body['terminate_after'])
+
+    def test_deep_paging_rejected(self):
+        self._assert_rejected({'from': 990, 'size': 20})
+
+    def test_invalid_values_rejected(self):
+        self._assert_rejected({'size': 'many'})
+        self._assert_rejected({'timeout': 'forever'})
+        self._assert_rejected([{'query': {}}])
+
+    def test_scripts_rejected(self):
+        self._assert_rejected({'script_fields': {'f': {'script': '1'}}})
+        self._assert_rejected({'query': {'filtered': {'filter': {
+            'script': {'script': 'doc["a"].value > 1'}}}}})
+
+    def test_leading_wildcards_rejected(self):
+        self._assert_rejected({'query': {'wildcard': {'id': '*abc'}}})
+        self._assert_rejected(
+            {'query': {'wildcard': {'id': {'value': '?abc'}}}})
+        self._assert_rejected(
+            {'query': {'query_string': {'query': 'id:*abc'}}})
+        self._assert_rejected({'query': {'regexp': {'id': '.*abc'}}})
+        query_limits.apply_limits(
+            {'query': {'query_string': {'query': 'id:abc*'}}}, LIMITS)
+        query_limits.apply_limits(
+            {'query': {'wildcard': {'id': '*abc'}}},
+            dict(LIMITS, allow_leading_wildcards=True))
+
+    def test_aggregations_limited(self):
+        query_limits.apply_limits(
+            {'aggs': {'a': {'terms': {'field': 'x', 'size': 10}}}}, LIMITS)
+        self._assert_rejected(
+            {'aggs': {'a': {'terms': {'field': 'x', 'size': 0}}}})
+        self._assert_rejected(
+            {'aggs': {'a': {'terms': {'field': 'x', 'size': 51}}}})
+        self._assert_rejected(
+            {'aggs': {'a': {'terms': {'field': 'x'},
+                            'aggs': {'b': {'terms': {'field': 'y'}},
+                                     'c': {'terms': {'field': 'z'}}}}}})
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class SearchQueryLimitsTestCase(base_test.BaseServerTestCase):
+
+    def test_search_query_rejected(self):
+        response = self.post('/search', {'script_fields': {
+            'f': {'script': '1'}}})
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(manager_exceptions.QueryNotAllowedError.ERROR_CODE,
+                         response.json['error_code'])
+
+    def test_applied_limits_reported(self):
+        queries = []
+
+        def mock_search(index, body=None, **kwargs):
+            queries.append(body)
+            return {'hits': {'hits': [], 'total': 0}}
+        original_search = ManagerElasticsearch.search
+        ManagerElasticsearch.search = staticmethod(mock_search)
+        self.addCleanup(setattr, ManagerElasticsearch, 'search',
+                        staticmethod(original_search))
+
+        response = self.post('/search', {'size': 10 ** 6})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            query_limits.DEFAULT_LIMITS['max_size'], queries[0]['size'])
+        self.assertEqual(
+            '{0}ms'.format(query_limits.DEFAULT_LIMITS['timeout_ms']),
+            response.json['query_limits']['timeout'])
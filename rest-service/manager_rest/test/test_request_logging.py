@@ -0,0 +1,55 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import logging
+
+from nose.plugins.attrib import attr
+
+from manager_rest import config
+from manager_rest import log_handlers
+from manager_rest.test import base_test
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class RequestLoggingTestCase(base_test.BaseServerTestCase):
+
+    def _count_logged_requests(self):
+        log_handlers.flush()
+        with open(self.rest_service_log) as f:
+            return f.read().count('\nRequest (')
+
+    def test_requests_logged(self):
+        self.get('/blueprints/no-such-blueprint')
+        log_handlers.flush()
+        with open(self.rest_service_log) as f:
+            log = f.read()
+        self.assertIn('path: {0}'.format(
+            self._version_url('/blueprints/no-such-blueprint')), log)
+        self.assertIn('status: 404 NOT FOUND', log)
+
+    def test_requests_not_sampled(self):
+        logged_requests = self._count_logged_requests()
+        config.instance().rest_service_log_requests_sample_rate = 0
+        self.get('/blueprints')
+        self.assertEqual(logged_requests, self._count_logged_requests())
+
+    def test_requests_not_logged_above_debug(self):
+        logged_requests = self._count_logged_requests()
+        logger = logging.getLogger('manager-rest')
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        self.addCleanup(logger.setLevel, level)
+        self.get('/blueprints')
+        self.assertEqual(logged_requests, self._count_logged_requests())
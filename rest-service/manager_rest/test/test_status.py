@@ -13,8 +13,11 @@
 #  * See the License for the specific language governing permissions and
 #  * limitations under the License.
 
+import threading
+
 from nose.plugins.attrib import attr
 
+from manager_rest import service_status
 from manager_rest.test import base_test
 
 
@@ -28,3 +31,60 @@ class StatusTestCase(base_test.BaseServerTestCase):
     def test_get_services(self):
         result = self.get('/status')
         self.assertEqual(type(result.json['services']), list)
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class ServiceStatusCacheTestCase(base_test.BaseServerTestCase):
+
+    SERVICES = {'service1': 'Service 1', 'service2': 'Service 2'}
+
+    def setUp(self):
+        super(ServiceStatusCacheTestCase, self).setUp()
+        self.cache = service_status.ServiceStatusCache()
+        self.queries = []
+
+    def _get_service(self, service_id, display_name):
+        self.queries.append(service_id)
+        return {'display_name': display_name,
+                'instances': [{'state': 'running'}]}
+
+    def test_cached(self):
+        services = self.cache.get_services(
+            self.SERVICES, self._get_service, ttl=60, timeout=5)
+        self.assertEqual(['Service 1', 'Service 2'],
+                         sorted(s['display_name'] for s in services))
+        for service in services:
+            self.assertGreaterEqual(service['age'], 0)
+        self.cache.get_services(
+            self.SERVICES, self._get_service, ttl=60, timeout=5)
+        self.assertEqual(['service1', 'service2'], sorted(self.queries))
+
+    def test_expired(self):
+        self.cache.get_services(
+            self.SERVICES, self._get_service, ttl=0, timeout=5)
+        self.cache.get_services(
+            self.SERVICES, self._get_service, ttl=0, timeout=5)
+        self.assertEqual(4, len(self.queries))
+
+    def test_missing_service_omitted(self):
+        services = self.cache.get_services(
+            self.SERVICES, lambda *_: None, ttl=60, timeout=5)
+        self.assertEqual([], services)
+
+    def test_slow_service(self):
+        done = threading.Event()
+
+        def get_slow_service(service_id, display_name):
+            done.wait(5)
+            return self._get_service(service_id, display_name)
+
+        services = self.cache.get_services(
+            {'slow': 'Slow'}, get_slow_service, ttl=60, timeout=0.1)
+        self.assertEqual([{'display_name': 'Slow',
+                           'instances': [],
+                           'age': None}], services)
+        done.set()
+        services = self.cache.get_services(
+            {'slow': 'Slow'}, get_slow_service, ttl=60, timeout=5)
+        self.assertEqual([{'state': 'running'}], services[0]['instances'])
+        self.assertEqual(['slow'], self.queries)
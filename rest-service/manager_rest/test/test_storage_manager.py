@@ -125,10 +125,12 @@ class StorageManagerTests(base_test.BaseServerTestCase):
                                 policy_types={},
                                 policy_triggers={},
                                 groups={},
-                                outputs={})
+                                outputs={},
+                                workflow_plugins_to_install=[],
+                                deployment_plugins_to_install=[])
 
         serialized_dep = dep.to_dict()
-        self.assertEquals(11, len(serialized_dep))
+        self.assertEquals(13, len(serialized_dep))
         self.assertEquals(dep.id, serialized_dep['id'])
         self.assertEquals(dep.created_at, serialized_dep['created_at'])
         self.assertEquals(dep.updated_at, serialized_dep['updated_at'])
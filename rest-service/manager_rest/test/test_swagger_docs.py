@@ -0,0 +1,41 @@
+#########
+# Copyright (c) 2016 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import json
+
+from nose.plugins.attrib import attr
+
+from manager_rest.test import base_test
+
+
+@attr(client_min_version=1, client_max_version=base_test.LATEST_API_VERSION)
+class SwaggerDocsTestCase(base_test.BaseServerTestCase):
+
+    def test_docs_not_in_app_routes(self):
+        rules = [rule.rule for rule in
+                 self.app.application.url_map.iter_rules()]
+        self.assertFalse([rule for rule in rules if 'help' in rule])
+
+    def test_resource_docs(self):
+        response = self.app.get(self._version_url('/blueprints.help.json'))
+        self.assertEqual(200, response.status_code)
+        docs = json.loads(response.data)
+        self.assertEqual(self._version_url('/blueprints'), docs['path'])
+        self.assertIn('get', [op['method'] for op in docs['operations']])
+
+    def test_resource_docs_html(self):
+        response = self.app.get(self._version_url('/blueprints.help.html'))
+        self.assertEqual(200, response.status_code)
+        self.assertIn('text/html', response.headers['Content-Type'])
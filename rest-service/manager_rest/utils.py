@@ -13,7 +13,9 @@
 #  * See the License for the specific language governing permissions and
 #  * limitations under the License.
 
+import os
 import sys
+import stat
 import logging
 import shutil
 import importlib
@@ -22,8 +24,11 @@ import StringIO
 import errno
 from os import path
 from os import makedirs
+from flask import request
 from flask.ext.restful import abort
 
+SHARED_STATE_ENVIRON_KEY = 'manager_rest.shared_state'
+
 
 def setup_logger(logger_name, logger_level=logging.DEBUG, handlers=None,
                  remove_existing_handlers=True):
@@ -142,3 +147,39 @@ def mkdirs(folder_path):
             pass
         else:
             raise
+
+
+class UnsafeDirectoryError(Exception):
+    pass
+
+
+def create_private_dir(dir_path):
+    """Create a directory which only the rest service's user can access,
+    for files whose contents it trusts (e.g. cached parse results).
+
+    An existing directory is only used if it's owned by that user, and is
+    made private if it isn't already.
+
+    :raises UnsafeDirectoryError: if the directory is owned by another user
+                                  (or isn't a directory)
+    """
+    try:
+        makedirs(dir_path, 0700)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise
+    st = os.lstat(dir_path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise UnsafeDirectoryError(
+            '{0} is not a directory owned by the rest service\'s user'
+            .format(dir_path))
+    if stat.S_IMODE(st.st_mode) & 0077:
+        os.chmod(dir_path, 0700)
+
+
+def get_shared_request_state():
+    """State of the current request which is shared with the requests of
+    a batch sent in it, for work which needn't be repeated for each of
+    them (e.g. authenticating the credentials they all carry)
+    """
+    return request.environ.setdefault(SHARED_STATE_ENVIRON_KEY, {})
@@ -24,6 +24,12 @@ BLUEPRINT_SCHEMA = {
         'properties': {
             'plan': {
                 'enabled': False
+            },
+            'compressed_plan': {
+                'type': 'binary'
+            },
+            'plan_summary': {
+                'enabled': False
             }
         }
     }
@@ -37,6 +43,12 @@ DEPLOYMENT_SCHEMA = {
             },
             'workflows': {
                 'enabled': False
+            },
+            'workflow_plugins_to_install': {
+                'enabled': False
+            },
+            'deployment_plugins_to_install': {
+                'enabled': False
             }
         }
     }
@@ -15,6 +15,7 @@
 
 
 import json
+import errno
 import tempfile
 import shutil
 import zipfile
@@ -56,6 +57,7 @@ _INFLUXDB_DUMP_CMD = ('curl -s -G "http://localhost:8086/db/cloudify/series'
 _INFLUXDB_RESTORE_CMD = ('cat {0} | while read -r line; do curl -X POST '
                          '-d "[${{line}}]" "http://localhost:8086/db/cloudify/'
                          'series?u=root&p=root" ;done')
+_STAGING_DIR = 'snapshots-staging'
 _STORAGE_INDEX_NAME = 'cloudify_storage'
 _EVENTS_INDEX_NAME = 'cloudify_events'
 
@@ -135,7 +137,7 @@ def _copy_data(archive_root, config, to_archive=True):
 
         # copy data
         if os.path.isfile(p1):
-            shutil.copy(p1, p2)
+            _link_or_copy(p1, p2)
         else:
             if not os.path.exists(p2):
                 os.makedirs(p2)
@@ -149,9 +151,56 @@ def _copy_data(archive_root, config, to_archive=True):
                 # we are ok with not copying it.
                 if not os.path.exists(d):
                     if os.path.isdir(s):
-                        shutil.copytree(s, d)
+                        _link_tree(s, d)
                     else:
-                        shutil.copy2(s, d)
+                        _link_or_copy(s, d)
+
+
+def _link_or_copy(src, dst):
+    """Hard link src to dst, or copy it if it can't be linked (e.g. when
+    it's on another file system).
+
+    The file server's files are stored once, as hard links to its blob
+    store, and are never modified in place, so they can be shared with the
+    snapshot rather than copied.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _link_tree(src, dst):
+    os.makedirs(dst)
+    for item in os.listdir(src):
+        s = os.path.join(src, item)
+        d = os.path.join(dst, item)
+        if os.path.islink(s):
+            os.symlink(os.readlink(s), d)
+        elif os.path.isdir(s):
+            _link_tree(s, d)
+        else:
+            _link_or_copy(s, d)
+    shutil.copystat(src, dst)
+
+
+def _create_staging_dir(config):
+    """Create a private directory to stage a snapshot's data in.
+
+    The data includes the storage dump and the agents' keys, so it's kept
+    out of the file server root, which is served publicly. By default it's
+    next to it, so that it's on the same file system, and the file server's
+    files can be linked rather than copied.
+    """
+    staging_root = config.snapshots_staging_dir or os.path.join(
+        os.path.dirname(os.path.normpath(config.file_server_root)),
+        _STAGING_DIR)
+    try:
+        os.makedirs(staging_root, 0700)
+    except OSError, e:
+        if e.errno != errno.EEXIST:
+            raise
+    return tempfile.mkdtemp('-snapshot-data', dir=staging_root)
 
 
 def _create_es_client(config):
@@ -171,7 +220,7 @@ def _get_manager_version(client=None):
 
 
 def _create(snapshot_id, config, include_metrics, include_credentials, **kw):
-    tempdir = tempfile.mkdtemp('-snapshot-data')
+    tempdir = _create_staging_dir(config)
 
     snapshots_dir = os.path.join(
         config.file_server_root,
@@ -642,7 +691,7 @@ def restore(snapshot_id, recreate_deployments_envs, config, force, **kwargs):
 
     _assert_clean_elasticsearch(log_warning=force)
 
-    tempdir = tempfile.mkdtemp('-snapshot-data')
+    tempdir = _create_staging_dir(config)
 
     try:
         file_server_root = config.file_server_root